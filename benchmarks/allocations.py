@@ -0,0 +1,103 @@
+"""
+Objects allocated by the parse engines per character of croco code.
+
+Counts the Indexer objects built during a parse (the engines advance on plain int offsets, an Indexer is only
+built at the API boundary and for the error messages), the peak of the memory allocated, and the time.
+
+The "before" rows emulate the engines advancing on Indexers: each match of a leaf struct (Str, Lexed or a fused one)
+and each try of a Not built the Indexer after it, one is built next to the int offset (the Indexers of the operators
+matched by Operators are left out). The compiled engine doesn't run the structs, and the time of these rows includes
+the emulation, so they only give the Indexers and the peak.
+
+    python benchmarks/allocations.py [file.crc] [repeat]
+"""
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+sys.setrecursionlimit(10_000)
+
+from parser_v2 import Indexer
+from parser_v2.parser import ENGINES
+from parser_v2.struct import BasicStruct, Str, Not, Lexed
+from croco.parser.syntax import crocoparser
+
+
+@contextmanager
+def indexer_advances():
+    """Build an Indexer for each advance of a leaf struct, as the engines did before the int offsets"""
+    run = BasicStruct._run
+
+    def indexed_run(self, namespace, index, code):
+        obj, end = run(self, namespace, index, code)
+        matched = obj is not None and (self.regex is not None or isinstance(self, (Str, Lexed)))
+        if matched or (self.regex is None and isinstance(self, Not)):  # Not built the Indexer after it at each try
+            Indexer(code, end, namespace.lines)
+        return obj, end
+    BasicStruct._run = indexed_run
+    try:
+        yield
+    finally:
+        BasicStruct._run = run
+
+
+def count_indexers(code, engine):
+    """The number of Indexers built by the parse"""
+    count = 0
+    init = Indexer.__init__
+
+    def counting_init(self, *args, **kwargs):
+        nonlocal count
+        count += 1
+        init(self, *args, **kwargs)
+    Indexer.__init__ = counting_init
+    try:
+        crocoparser.parse(code, engine=engine)
+    finally:
+        Indexer.__init__ = init
+    return count
+
+
+def peak(code, engine):
+    """The peak of the memory allocated by the parse and the tree, in bytes"""
+    tracemalloc.start()
+    tree = crocoparser.parse(code, engine=engine)
+    _, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return peak_size
+
+
+def best_time(code, engine, runs=5):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        crocoparser.parse(code, engine=engine)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parents[1] / "examples" / "dichtomic_research.crc"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    code = path.read_text() * repeat
+    print(f"{path.name} x{repeat}: {len(code)} characters")
+    print(f"{'engine':>12}  {'layout':>7}  {'Indexers/char':>13}  {'peak KB':>9}  {'us/char':>8}")
+    for engine in ENGINES:
+        crocoparser.parse(code, engine=engine)  # Compile the grammar out of the measures
+        if engine != "compiled":
+            with indexer_advances():
+                indexers = count_indexers(code, engine) / len(code)
+                size = peak(code, engine) / 1024
+            print(f"{engine:>12}  {'before':>7}  {indexers:13.3f}  {size:9.1f}  {'-':>8}")
+        indexers = count_indexers(code, engine) / len(code)
+        size = peak(code, engine) / 1024
+        elapsed = best_time(code, engine) / len(code) * 1e6
+        print(f"{engine:>12}  {'after':>7}  {indexers:13.3f}  {size:9.1f}  {elapsed:8.3f}")
+
+
+if __name__ == '__main__':
+    main()
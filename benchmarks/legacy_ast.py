@@ -0,0 +1,74 @@
+"""
+Trees of the legacy parser: built as AST (the fields in a dict) or as the slotted Node classes generated
+for each SequenceStruct. Measures the time of the parse that builds the tree, its memory, and the time to walk it.
+
+    python benchmarks/legacy_ast.py [items]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from parser import *
+from parser.structure import Char, FirstStruct, SequenceStruct, StructGetter, saved_as
+
+
+def get_parser(node):
+    """A grammar of nested pairs: (name: value, ...) where a value is a number or a list"""
+    parser = Parser()
+    number = saved_as(Repeat(Char(DIGITS), MINI1.count), "digits")
+    name = saved_as(Repeat(Char(LETTERS), MINI1.count), "letters")
+    value = FirstStruct(SequenceStruct(number, node=node),
+                        SequenceStruct("(", saved_as(StructGetter("pairs"), "pairs"), ")", node=node))
+    pair = SequenceStruct(saved_as(SequenceStruct(name, node=node), "name"), ":", saved_as(value, "value"),
+                          Char(",") * (0, 1), sep=" ", node=node)
+    Structure(Repeat(pair, MINI0.count), "pairs", parser=parser)
+    parser.majorstruct = SequenceStruct(saved_as(StructGetter("pairs"), "pairs"), node=node)
+    return parser
+
+
+def walk(tree) -> int:
+    """The number of pairs of the tree, reading all their fields"""
+    count = 0
+    for pair in tree.pairs:
+        count += 1 + len("".join(pair.name.letters))
+        value = pair.value
+        if hasattr(value, "pairs"):
+            count += walk(value)
+        else:
+            count += len("".join(value.digits))
+    return count
+
+
+def source(items):
+    inner = ", ".join(["x: 1, y: 22, z: (a: 3, b: 4)"] * 3)
+    return ", ".join([f"key: 12, sub: ({inner})"] * (items // 17))
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    code = source(items)
+    print(f"{len(code)} characters")
+    print(f"{'nodes':>6}  {'parse ms':>9}  {'tree KB':>9}  {'walk ms':>8}")
+    for label, node in (("AST", ast.AST), ("Node", None)):
+        parser = get_parser(node)
+        start = time.perf_counter()
+        tree, used = parser.parse(code)
+        parse = time.perf_counter() - start
+        assert used == len(code)
+        del tree
+        tracemalloc.start()
+        tree, _ = parser.parse(code)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        for _ in range(5):
+            count = walk(tree)
+        elapsed = (time.perf_counter() - start) / 5
+        print(f"{label:>6}  {parse * 1000:9.1f}  {size / 1024:9.1f}  {elapsed * 1000:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
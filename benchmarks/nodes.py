@@ -0,0 +1,69 @@
+"""
+Memory of the croco syntax trees: the number of nodes and the bytes they take per KB of source,
+and the time of the passes reading them (first_pass, then the generation of the instructions).
+
+    python benchmarks/nodes.py [file.crc] [repeat]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+sys.setrecursionlimit(10_000)
+
+import code_creator
+from croco.parser import first_pass
+from croco.parser.lexer import tokens_for
+from croco.parser.stmt import Statement
+from croco.parser.syntax import crocoparser
+
+
+def count_nodes(node, seen) -> int:
+    """The nodes reachable from node, through the slots of the nodes (and their __dict__ if they have one)"""
+    if id(node) in seen:
+        return 0
+    seen.add(id(node))
+    if isinstance(node, Statement):
+        children = [getattr(node, name, None)
+                    for cls in type(node).__mro__ for name in cls.__dict__.get("__slots__", ())]
+        children += getattr(node, "__dict__", {}).values()
+        count = 1
+    elif isinstance(node, (list, tuple)):
+        children, count = node, 0
+    else:
+        return 0
+    return count + sum(count_nodes(child, seen) for child in children)
+
+
+def parse(code):
+    return crocoparser.parse(code, namespace={"tokens": tokens_for(code)})
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parents[1] / "examples" / "dichtomic_research.crc"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    code = "\n".join([path.read_text()] * repeat)
+    kb = len(code) / 1024
+    parse(code)  # Build the grammar out of the measures
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tree = parse(code)
+    size = tracemalloc.get_traced_memory()[0] - before  # The parse temporaries are freed, the tree is kept
+    tracemalloc.stop()
+    nodes = count_nodes(tree, set())
+    best = float("inf")
+    for _ in range(5):
+        tree = parse(code)
+        start = time.perf_counter()
+        first_pass.first_pass(tree, "bench").to_stmt_code(code_creator.CodeGenerator(1, filename="bench"))
+        best = min(best, time.perf_counter() - start)
+    print(f"{path.name} x{repeat}: {len(code)} characters, {nodes} nodes")
+    print(f"nodes per KB:  {nodes / kb:8.1f}")
+    print(f"bytes per KB:  {size / kb:8.0f}")
+    print(f"bytes per node:{size / nodes:8.1f}")
+    print(f"passes:        {best * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
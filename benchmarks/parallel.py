@@ -0,0 +1,42 @@
+"""
+Time of the parse of a big croco source in this process, and by chunks on several processes (see parallel).
+
+    python benchmarks/parallel.py [file.crc] [repeat] [jobs...]
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+sys.setrecursionlimit(10_000)
+
+from croco.parser.lexer import tokens_for
+from croco.parser.parallel import parse_parallel
+from croco.parser.syntax import crocoparser
+
+
+def best_time(parse, runs=3):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parents[1] / "examples" / "dichtomic_research.crc"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    jobs = [int(n) for n in sys.argv[3:]] or sorted({2, os.cpu_count() or 1})
+    code = (path.read_text() + "\n") * repeat
+    print(f"{path.name} x{repeat}: {len(code)} characters, {os.cpu_count()} CPUs")
+    serial = best_time(lambda: crocoparser.parse(code, namespace={"tokens": tokens_for(code)}))
+    print(f"{'serial':>12}: {serial * 1000:8.1f} ms")
+    for n in jobs:
+        elapsed = best_time(lambda: parse_parallel(code, jobs=n))
+        print(f"{f'jobs={n}':>12}: {elapsed * 1000:8.1f} ms  (x{serial / elapsed:.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Time from the launch of `python -m croco script.crc` to the first executed Croco bytecode.
+
+The script's first statement prints the time it runs at, compared to the time the process was launched.
+The launch of an empty Python process is measured as well, for reference.
+
+    python benchmarks/startup.py [runs]
+"""
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parents[1]
+SCRIPT = "print(__import__(\"time\").time())\n"  # Croco has no import statement
+
+
+def launch(args, cwd) -> tuple[float, float]:
+    """The time until the first line printed by the process (its clock if it printed one), and until its end"""
+    start = time.time()
+    output = subprocess.run([sys.executable, *args], cwd=cwd, capture_output=True, text=True, check=True).stdout
+    end = time.time()
+    first = float(output.splitlines()[-1]) if args[0] == "-m" else end
+    return first - start, end - start
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as directory:
+        script = Path(directory) / "script.crc"
+        script.write_text(SCRIPT)
+        launch(["-m", "croco", str(script)], ROOT)  # Warm the bytecode caches
+        python = [launch(["-c", "pass"], ROOT)[1] for _ in range(runs)]
+        croco = [launch(["-m", "croco", str(script)], ROOT) for _ in range(runs)]
+    print(f"{runs} runs, median (min) in ms")
+    print(f"python -c pass:              {statistics.median(python) * 1000:7.1f} ({min(python) * 1000:.1f})")
+    first = [run[0] for run in croco]
+    total = [run[1] for run in croco]
+    print(f"croco, first bytecode:       {statistics.median(first) * 1000:7.1f} ({min(first) * 1000:.1f})")
+    print(f"croco, whole process:        {statistics.median(total) * 1000:7.1f} ({min(total) * 1000:.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Peak memory allocated while parsing croco code, with Token and Span fragments.
+
+    python benchmarks/tokens_memory.py [file.crc] [repeat]
+"""
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+sys.setrecursionlimit(10_000)
+
+from parser_v2 import Token, Span
+from croco.parser.syntax import crocoparser
+
+
+def peak(code, token):
+    """The peak of the memory allocated by the parse and the tree, in bytes"""
+    tracemalloc.start()
+    tree = crocoparser.parse(code, token=token)
+    _, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return peak_size
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parents[1] / "examples" / "dichtomic_research.crc"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    code = path.read_text() * repeat
+    kb = len(code) / 1024
+    print(f"{path.name} x{repeat}: {kb:.1f} KB")
+    results = {token.__name__: peak(code, token) for token in (Token, Span)}
+    for name, size in results.items():
+        print(f"{name:>6}: {size / 1024:10.1f} KB peak, {size / kb / 1024:8.1f} KB per KB of source")
+    print(f"Span / Token: {results['Span'] / results['Token']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
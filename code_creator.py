@@ -1,8 +1,19 @@
+from math import copysign
 from types import CodeType
 from opcode import opmap, stack_effect, HAVE_ARGUMENT
 from functools import partial
 import contextlib
 
+def _const_key(value):
+    """What tells equal constants apart: their types (1, 1.0 and True), the sign of a zero, and the same for items"""
+    if isinstance(value, tuple):
+        return tuple, tuple(map(_const_key, value))
+    if isinstance(value, frozenset):
+        return frozenset, frozenset(map(_const_key, value))
+    if isinstance(value, float):
+        return float, value, copysign(1, value)
+    return type(value), value
+
 class Vue:
     def __init__(self, fieldname, value):
         self.fieldname = fieldname
@@ -10,9 +21,11 @@ class Vue:
 
     def get_value(self, generator: "CodeGenerator"):
         fields = getattr(generator, self.fieldname)
-        if self.value not in fields:
-            fields.append(self.value)
-        return fields.index(self.value)
+        for index, field in enumerate(fields):
+            if field is self.value or field == self.value and _const_key(field) == _const_key(self.value):
+                return index
+        fields.append(self.value)
+        return len(fields) - 1
 
 class Partial:
     def __init__(self, value=None):
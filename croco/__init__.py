@@ -1,7 +1,15 @@
-from croco.__main__ import main
-
 from croco.parser import croco_compile, run
-from croco.parser.repl import Repl
+
+def __getattr__(name):
+    # Imported when first used: running a script doesn't need the command line and the REPL modules
+    if name == "main":
+        from croco.__main__ import main
+        return main
+    if name == "Repl":
+        from croco.parser.repl import Repl
+        return Repl
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def run_repl():
+    from croco.parser.repl import Repl
     Repl().run()
@@ -1,31 +1,68 @@
-import click
+import argparse
+import os
+import sys
 
+arguments = argparse.ArgumentParser(prog="croco")
+arguments.add_argument("file", nargs="?", default=None)
+arguments.add_argument("--profile", choices=["table", "json"], default=None,
+                       help="Print the time spent in each grammar rule while parsing the file")
+arguments.add_argument("--serve", type=int, default=None, metavar="PORT",
+                       help="Serve the interactive mode to the connections on this local port")
+arguments.add_argument("--jobs", type=int, default=1, metavar="N",
+                       help="Parse the file on N processes, split between its top-level statements")
 
-@click.command()
-@click.argument("file", type=click.Path(exists=True), required=False)
-def main(file=None):
-    if file is None:
-        click.echo("Entering interactive mode")
+
+def main(args=None):
+    options = arguments.parse_args(args)
+    if options.file is not None and not os.path.exists(options.file):
+        arguments.error(f"Path {options.file!r} does not exist.")
+    try:
+        _run(options.file, options.profile, options.serve, options.jobs)
+    except (EOFError, KeyboardInterrupt):
+        print("\nAborted!", file=sys.stderr)
+        exit(1)
+    exit(0)
+
+
+def _run(file, profile, serve, jobs=1):
+    if serve is not None:
+        import asyncio
+        from croco.parser.repl import start_server
+
+        async def run_server():
+            server = await start_server(port=serve)
+            print(f"Serving the interactive mode on port {server.sockets[0].getsockname()[1]}")
+            async with server:
+                await server.serve_forever()
+
+        asyncio.run(run_server())
+    elif file is None:
+        print("Entering interactive mode")
         from croco.parser.repl import Repl
 
         Repl().run()
     else:
-        click.echo(f"Reading from file {file}")
+        print(f"Reading from file {file}")
 
         from croco.parser import run
-        import pathlib
-        path = pathlib.Path(file)
-        if not path.is_file():
-            path /= "__main__.crc"
-            if not path.is_file():
-                click.echo(f"File {file} does not exist")
+        path = file
+        if not os.path.isfile(path):
+            path = os.path.join(path, "__main__.crc")
+            if not os.path.isfile(path):
+                print(f"File {file} does not exist")
                 exit(1)
                 return
 
-        with open(file) as f:
-            run(f.read(), filename=file, mode="exec")
-
-    exit(0)
+        profiler = None
+        if profile is not None:
+            from parser_v2 import Profiler
+            profiler = Profiler()
+        from parser_v2 import ByteSource
+        try:
+            run(ByteSource.open(path), filename=path, mode="exec", profiler=profiler, jobs=jobs)
+        finally:
+            if profiler is not None:
+                print(profiler.table() if profile == "table" else profiler.to_json(indent=4), file=sys.stderr)
 
 if __name__ == '__main__':
     main()
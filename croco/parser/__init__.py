@@ -1,18 +1,43 @@
-from croco.parser import expr, stmt, blocks, encoder, first_pass
-from croco.parser.syntax import crocoparser
+from croco.parser import expr, stmt, blocks, encoder, first_pass, syntax
+from croco.parser.lexer import tokens_for
+from parser_v2 import NeedInput, line_text
 
-def croco_compile(code, filename="Unkown", mode="exec"):
+def __getattr__(name):
+    if name == "crocoparser":  # Built when first used, see syntax
+        return syntax.crocoparser
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def croco_compile(code, filename="Unkown", mode="exec", profiler=None, jobs=1):
+    """
+    :param profiler: a parser_v2.Profiler measuring the grammar rules during the parse
+    :param jobs: the number of processes parsing the code, see parallel.parse_parallel (None for one per CPU).
+        The code is parsed in this process with a profiler.
+    """
     try:
-        tokens = crocoparser(code)
+        if jobs == 1 or profiler is not None:
+            tokens = syntax.crocoparser.parse(code, namespace={"tokens": tokens_for(code)}, profiler=profiler)
+        else:
+            from croco.parser import parallel  # Imported when first used, for the startup time
+            tokens = parallel.parse_parallel(code, jobs)
         tokens = first_pass.first_pass(tokens, filename)
         return encoder.to_code(tokens, as_expr=mode == "eval")
     except SyntaxError as e:
         e.filename = filename
-        e.text = code.split("\n")[e.lineno - 1]
+        e.text = line_text(code, e.lineno)
         raise
 
-def run(code, filename="Unkown", mode="exec"):
-    code = croco_compile(code, filename, mode=mode)
+async def croco_compile_async(code, filename="Unkown", mode="exec", profiler=None):
+    """
+    croco_compile for a parser_v2.AsyncCharStream: its next input is awaited each time the parser needs more
+    """
+    while True:
+        try:
+            return croco_compile(code, filename, mode, profiler)
+        except NeedInput:
+            await code.fill()
+
+def run(code, filename="Unkown", mode="exec", profiler=None, jobs=1):
+    code = croco_compile(code, filename, mode=mode, profiler=profiler, jobs=jobs)
     # import dis, opcode
     # dis.dis(code)
     # print(code.co_code, len(code.co_code))
@@ -31,6 +56,6 @@ while True:pass
     # print(compiled.co_lnotab.hex(" "))
     # # print(compiled.co_code.hex(" "))
     # # print(len(compiled.co_code)-4)
-    lines = crocoparser(code)
+    lines = syntax.crocoparser(code)
     print(lines)
     run(code)
@@ -1,7 +1,9 @@
+from croco.parser.collections import CollectionLitteral
 from croco.parser.stmt import Statement
 
 
 class Block(Statement):
+    __slots__ = ("statements",)
     def __init__(self, statements, line):
         self.statements = statements
         super().__init__(line)
@@ -31,6 +33,7 @@ class Block(Statement):
             stmt.to_stmt_code(gen)
 
 class FlowControl(Statement):
+    __slots__ = ("block", "else_clause", "end_partial")
     def __init__(self, block, line, else_clause=None):
         self.block = block
         self.else_clause = else_clause
@@ -44,7 +47,9 @@ class FlowControl(Statement):
         return self
 
     def optimize(self):
-        self.block.optimize()
+        self.block = self.block.optimize()
+        if self.else_clause:
+            self.else_clause = self.else_clause.optimize()
         return self
 
     def to_stmt_code(self, gen):
@@ -57,6 +62,7 @@ class FlowControl(Statement):
         self.end_partial.set(gen.actual_ins_index)
 
 class _ConditionLikeFlowControl(FlowControl):
+    __slots__ = ("expr",)
     def __init__(self, expr, block, line):
         self.expr = expr
         super().__init__(block, line)
@@ -69,7 +75,12 @@ class _ConditionLikeFlowControl(FlowControl):
         self.expr.first_pass(ctx)
         return super().first_pass(ctx)
 
+    def optimize(self):
+        self.expr = self.expr.optimize()
+        return super().optimize()
+
 class If(_ConditionLikeFlowControl):
+    __slots__ = ()
     def __init__(self, expr, block, line):
         super().__init__(expr, block, line)
 
@@ -85,6 +96,7 @@ class If(_ConditionLikeFlowControl):
         super().add_else_clause(gen)
 
 class While(_ConditionLikeFlowControl):
+    __slots__ = ("start",)
     def _repr(self):
         return f"while {self.expr}: {self.block}"
 
@@ -101,6 +113,7 @@ class While(_ConditionLikeFlowControl):
             return super().first_pass(ctx)
 
 class For(FlowControl):
+    __slots__ = ("expr", "var", "start")
     def __init__(self, var, expr, block, line):
         self.expr = expr
         self.var = var
@@ -128,7 +141,15 @@ class For(FlowControl):
             self.var.first_pass(ctx)
             return super().first_pass(ctx)
 
+    def optimize(self):
+        self.var = self.var.optimize()
+        self.expr = self.expr.optimize()
+        if isinstance(self.expr, CollectionLitteral):  # Not built again by each run of the loop
+            self.expr = self.expr.iterated()
+        return super().optimize()
+
 class _FlowControlController(Statement):
+    __slots__ = ("loop",)
     def __init__(self, line):
         super().__init__(line)
 
@@ -147,6 +168,7 @@ class _FlowControlController(Statement):
         gen.line = self.line
 
 class Break(_FlowControlController):
+    __slots__ = ()
     def _repr(self):
         return "break"
 
@@ -155,6 +177,7 @@ class Break(_FlowControlController):
         gen += "JUMP_ABSOLUTE", self.loop.end_partial
 
 class Continue(_FlowControlController):
+    __slots__ = ()
     def _repr(self):
         return "continue"
 
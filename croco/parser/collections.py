@@ -1,7 +1,8 @@
-from croco.parser.expr import Expr
+from croco.parser.expr import Constant, Expr
 
 
 class CollectionLitteral(Expr):
+    __slots__ = ("exprs", "ctype")
     def __init__(self, *exprs, ctype, line):
         self.exprs = exprs
         self.ctype = ctype
@@ -27,6 +28,23 @@ class CollectionLitteral(Expr):
         for expr in self.exprs:
             expr.first_pass(ctx)
 
+    def optimize(self):
+        """A tuple of constants is a constant"""
+        self.exprs = tuple(expr.optimize() for expr in self.exprs)
+        if self.ctype == "tuple" and self._is_constant():
+            return Constant(tuple(expr.value for expr in self.exprs), self.line)
+        return self
+
+    def iterated(self) -> Expr:
+        """The expression to iterate on instead: a list or a set of constants is a tuple or a frozenset constant"""
+        if self.ctype in ("list", "set") and self._is_constant():
+            values = [expr.value for expr in self.exprs]
+            return Constant(tuple(values) if self.ctype == "list" else frozenset(values), self.line)
+        return self
+
+    def _is_constant(self):
+        return all(isinstance(expr, Constant) for expr in self.exprs)
+
     def store(self, gen):
         raise NotImplementedError()
 
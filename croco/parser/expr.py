@@ -1,11 +1,14 @@
 from opcode import cmp_op
 
 from code_creator import CodeGenerator
+from parser_v2 import join
 
 from croco.parser.stmt import Statement
 from croco.parser.consts import OP_TO_NAME
+from croco.parser.folding import NOT_FOLDED, fold_binary, fold_comparison
 
 class Expr(Statement):
+    __slots__ = ()
     def to_expr_code(self, gen: CodeGenerator):
         gen.line = self.line
 
@@ -17,6 +20,7 @@ class Expr(Statement):
         raise NotImplementedError()
 
 class Constant(Expr):
+    __slots__ = ("value",)
     def __init__(self, value, line):
         self.value = value
         super(Constant, self).__init__(line)
@@ -32,27 +36,44 @@ class Constant(Expr):
         raise SyntaxError("Cannot assign to a constant")
 
 class Int(Constant):
+    __slots__ = ()
     @classmethod
     def from_toks(cls, toklist):
-        return cls(int("".join(toklist)), toklist[0].start_line)
+        return cls(int(join(toklist)), toklist[0].start_line)
+
+    @classmethod
+    def from_token(cls, token):
+        return cls(int(str(token)), token.start_line)
 
 class Float(Constant):
+    __slots__ = ()
     @classmethod
     def from_toks(cls, toklist):
         match toklist:
             case [left, "." as p, right]:
-                return cls(float("".join(left) + "." + "".join(right)), p.start_line)
+                return cls(float(join(left) + "." + join(right)), p.start_line)
             case ["." as p, right]:
-                return cls(float("." + "".join(right)), p.start_line)
+                return cls(float("." + join(right)), p.start_line)
             case _:
                 raise SyntaxError("Invalid float literal")
 
+    @classmethod
+    def from_token(cls, token):
+        return cls(float(str(token)), token.start_line)
+
 class String(Constant):
+    __slots__ = ()
     @classmethod
     def from_toks(cls, toklist):
-        return cls("".join(toklist[1]), toklist[0].start_line)
+        return cls(join(toklist[1]), toklist[0].start_line)
+
+    @classmethod
+    def from_token(cls, token):
+        """A String from the token of the string with its quotes"""
+        return cls(str(token)[1:-1], token.start_line)
 
 class VarName(Expr):
+    __slots__ = ("name", "ctx")
     def __init__(self, name, line):
         self.name = name
         super().__init__(line)
@@ -62,7 +83,11 @@ class VarName(Expr):
 
     @classmethod
     def from_toks(cls, toklist):
-        return cls(toklist[0]+"".join(toklist[1]), toklist[0].start_line)
+        return cls(join([toklist[0], *toklist[1]]), toklist[0].start_line)
+
+    @classmethod
+    def from_token(cls, token):
+        return cls(str(token), token.start_line)
 
     def first_pass(self, ctx):
         self.ctx = ctx
@@ -82,6 +107,7 @@ class VarName(Expr):
             gen += "STORE_NAME", gen.name(self.name)
 
 class Op(Expr):
+    __slots__ = ("left", "right", "op")
     _show_clsname_in_repr = False
 
     def __init__(self, left, right, op, line):
@@ -96,12 +122,21 @@ class Op(Expr):
         if not after:
             return first
         op, second = after[0]
-        obj = cls(first, second, op, op.start_line)
+        obj = cls(first, second, str(op), op.start_line)
         return cls.from_toks([obj, after[1:]])
 
     def _repr(self):
         return f"{self.left} {self.op} {self.right}"
 
+    def optimize(self):
+        self.left = self.left.optimize()
+        self.right = self.right.optimize()
+        if isinstance(self.left, Constant) and isinstance(self.right, Constant):
+            value = fold_binary(self.op, self.left.value, self.right.value)
+            if value is not NOT_FOLDED:
+                return Constant(value, self.line)
+        return self
+
     def to_expr_code(self, gen: CodeGenerator):
         super().to_expr_code(gen)
         self.left.to_expr_code(gen)
@@ -117,6 +152,7 @@ class Op(Expr):
         return super().first_pass(ctx)
 
 class CmpOp(Expr):
+    __slots__ = ("parts", "ops")
     def __init__(self, parts, ops, line):
         super().__init__(line)
         self.parts: list[Expr] = parts
@@ -131,6 +167,14 @@ class CmpOp(Expr):
     def _repr(self):
         return str(self.parts[0]) + "".join(f" {op} {part}" for op, part in zip(self.ops, self.parts[1:]))
 
+    def optimize(self):
+        self.parts = [part.optimize() for part in self.parts]
+        if all(isinstance(part, Constant) for part in self.parts):
+            value = fold_comparison([part.value for part in self.parts], self.ops)
+            if value is not NOT_FOLDED:
+                return Constant(value, self.line)
+        return self
+
     @classmethod
     def from_toks(cls, toklist):
         if not toklist[1]:
@@ -138,7 +182,7 @@ class CmpOp(Expr):
         parts = [toklist[0]]
         ops = []
         for op, part in toklist[1]:
-            ops.append(op)
+            ops.append(str(op))
             parts.append(part)
         return cls(parts, ops, toklist[0].line)
 
@@ -167,6 +211,7 @@ class CmpOp(Expr):
 
 
 class SecondLevel(Expr):
+    __slots__ = ("obj",)
     def __init__(self, line, obj=None):
         self.obj = obj
         super().__init__(line)
@@ -182,7 +227,12 @@ class SecondLevel(Expr):
         self.obj.first_pass(ctx)
         return super().first_pass(ctx)
 
+    def optimize(self):
+        self.obj = self.obj.optimize()
+        return self
+
 class GetAttr(SecondLevel):
+    __slots__ = ("attr",)
     def __init__(self, obj, attr, line):
         self.attr = attr
         super().__init__(line, obj)
@@ -203,6 +253,7 @@ class GetAttr(SecondLevel):
         gen += "STORE_ATTR", gen.name(self.attr)
 
 class GetItem(SecondLevel):
+    __slots__ = ("index",)
     def __init__(self, obj, index, line):
         self.index = index
         super().__init__(line, obj)
@@ -228,7 +279,12 @@ class GetItem(SecondLevel):
         self.index.first_pass(ctx)
         return super().first_pass(ctx)
 
+    def optimize(self):
+        self.index = self.index.optimize()
+        return super().optimize()
+
 class Call(SecondLevel):
+    __slots__ = ("args",)
     def __init__(self, obj, args, line):
         self.args = args
         super().__init__(line, obj)
@@ -253,3 +309,7 @@ class Call(SecondLevel):
         for arg in self.args:
             arg.first_pass(ctx)
         return super().first_pass(ctx)
+
+    def optimize(self):
+        self.args = [arg.optimize() for arg in self.args]
+        return super().optimize()
@@ -0,0 +1,92 @@
+"""
+Constant folding: the operations on constants computed at compile time (see the optimize methods of the nodes).
+
+An operation is only folded when computing it gives what the program would compute: not when it raises
+(1 / 0 still raises when it runs), nor when its value would be too big to be stored in the code
+(the limits are the ones of CPython's own folding).
+"""
+import operator
+
+MAX_INT_SIZE = 128  # Bits
+MAX_COLLECTION_SIZE = 256
+MAX_STR_SIZE = 4096
+
+NOT_FOLDED = object()
+
+BINARY = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "//": operator.floordiv,
+    "%": operator.mod,
+    "**": operator.pow,
+    "<<": operator.lshift,
+    ">>": operator.rshift,
+    "&": operator.and_,
+    "^": operator.xor,
+    "|": operator.or_,
+    "@": operator.matmul,
+}
+
+COMPARISONS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def _is_int(value):
+    return isinstance(value, int)
+
+
+def _small_repeat(sequence, count) -> bool:
+    """If sequence * count is small enough"""
+    if not _is_int(count) or count <= 0:
+        return True
+    if isinstance(sequence, (str, bytes)):
+        return len(sequence) * count <= MAX_STR_SIZE
+    if isinstance(sequence, (tuple, frozenset)):
+        return len(sequence) * count <= MAX_COLLECTION_SIZE
+    return True
+
+
+def _small_enough(op, left, right) -> bool:
+    """If the result of left op right can be computed without building a huge value"""
+    if op == "*":
+        if _is_int(left) and _is_int(right):
+            return not left or not right or left.bit_length() + right.bit_length() <= MAX_INT_SIZE
+        return _small_repeat(left, right) and _small_repeat(right, left)
+    if op == "**" and _is_int(left) and _is_int(right):
+        return not left or right <= 0 or left.bit_length() * right <= MAX_INT_SIZE
+    if op == "<<" and _is_int(left) and _is_int(right):
+        return right < 0 or not left or right <= MAX_INT_SIZE and left.bit_length() <= MAX_INT_SIZE - right
+    if op == "%" and isinstance(left, (str, bytes)):  # Formatting, not folded by CPython either
+        return False
+    return True
+
+
+def fold_binary(op: str, left, right):
+    """The value of left op right, or NOT_FOLDED if it must be computed when the code runs"""
+    if not _small_enough(op, left, right):
+        return NOT_FOLDED
+    try:
+        return BINARY[op](left, right)
+    except Exception:  # Raised again when the code runs
+        return NOT_FOLDED
+
+
+def fold_comparison(values: list, ops: list[str]):
+    """The value of the chain of comparisons values[0] ops[0] values[1] ..., or NOT_FOLDED"""
+    result = True
+    try:
+        for left, op, right in zip(values, ops, values[1:]):
+            result = COMPARISONS[op](left, right)
+            if not result:
+                break
+    except Exception:
+        return NOT_FOLDED
+    return result
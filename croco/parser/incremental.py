@@ -0,0 +1,148 @@
+"""
+Incremental parsing of croco sources.
+
+The top level of a source is a sequence of items: the lines, and the flow controls with their blocks.
+An IncrementalParse keeps the offsets of these items. After an edit, only the items around the edit are parsed
+again, until an item ends where an item of the previous parse started after the edit: from there the previous
+items are reused, their nodes are moved to their new lines.
+
+An item can look at the first line of the next one (an if looks for its elif and else), so the item before
+is parsed again too when the edit is on the first line of an item. The nodes of the reused items are shifted
+in place, only when the edit added or removed lines: a tree returned before must not be used after an edit.
+The items are parsed with the tokens of the source (see lexer), which are read again only around the edit too.
+"""
+from functools import cache
+
+from parser_v2 import Indexer, Span
+from parser_v2.token import LineIndex
+
+from croco.parser import blocks, stmt
+from croco.parser.lexer import tokens_for
+from croco.parser.syntax import crocoparser
+
+
+class Item:
+    """An item of the top level: its offsets, and the statements it gives"""
+    __slots__ = ("start", "end", "statements", "_nodes")
+
+    def __init__(self, start, end, statements):
+        self.start = start
+        self.end = end
+        self.statements = statements
+        self._nodes = None
+
+    def shift_lines(self, delta):
+        """Move the nodes of the item by delta lines"""
+        if self._nodes is None:
+            self._nodes = []
+            _collect_nodes(self.statements, self._nodes, set())
+        for node in self._nodes:
+            node.line += delta
+
+    def __repr__(self):
+        return f"Item({self.start}, {self.end}, {self.statements!r})"
+
+
+@cache
+def _slots(cls) -> tuple[str, ...]:
+    """The attributes of a node class, declared by its __slots__ and the ones of its bases"""
+    return tuple(name for base in cls.__mro__ for name in base.__dict__.get("__slots__", ()))
+
+
+def _collect_nodes(node, nodes, seen):
+    """Add to nodes the nodes contained by node (itself included) that have a line"""
+    if id(node) in seen:
+        return
+    seen.add(id(node))
+    if isinstance(node, stmt.Statement):
+        nodes.append(node)
+        children = [getattr(node, name, None) for name in _slots(type(node))]
+    elif isinstance(node, (list, tuple)):
+        children = node
+    else:
+        return
+    for child in children:
+        _collect_nodes(child, nodes, seen)
+
+
+class IncrementalParse:
+    """The parse of a croco source, that can be updated after an edit"""
+    def __init__(self, code: str):
+        self.code = code
+        self.lines = LineIndex(code)
+        self.tokens = tokens_for(code)
+        self.items = self._parse_items(0, None)
+
+    def _parse_item(self, offset) -> Item:
+        index = Indexer(self.code, token=Span, lines=self.lines) + offset
+        statements, end = crocoparser.parse_prefix(self.code, crocoparser.BLOCK_ITEM, {"tokens": self.tokens},
+                                                   index=index)
+        if statements is None or (end == offset and end != len(self.code)):
+            e = SyntaxError(f"Unexpected token {self.code[index]!r}, line {index.line}, column {index.column}")
+            e.lineno = index.line + 1
+            raise e
+        return Item(offset, end.i, statements or [])
+
+    def _parse_items(self, offset, stop) -> list[Item]:
+        """
+        Parse the items from offset until the end of the code, or until an item ends at an offset for which
+        stop(offset) is true
+        """
+        items = []
+        while offset < len(self.code) or not items and not offset:
+            item = self._parse_item(offset)
+            items.append(item)
+            offset = item.end
+            if stop is not None and stop(offset):
+                break
+        return items
+
+    @property
+    def block(self) -> blocks.Block:
+        """The tree of the source, as given by crocoparser"""
+        return blocks.Block.from_toks([item.statements for item in self.items])
+
+    def edit(self, start: int, end: int, text: str) -> blocks.Block:
+        """
+        Replace code[start:end] by text, and update the tree
+        :return: the new tree
+        """
+        old_items = self.items
+        delta = len(text) - (end - start)
+        line_delta = text.count("\n") - self.code.count("\n", start, end)
+        # The first item touching the edit, or the one before if the edit is on its first line
+        first = 0
+        while first < len(old_items) and old_items[first].end < start:
+            first += 1
+        if first and (first == len(old_items) or "\n" not in self.code[old_items[first].start:start]):
+            first -= 1
+        starts = {item.start: k for k, item in enumerate(old_items) if item.start > end}
+
+        previous = self.code, self.lines, self.tokens
+        self.code = self.code[:start] + text + self.code[end:]
+        self.lines = self.lines.edited(self.code, start)
+        if self.tokens is None:  # The previous source couldn't be tokenized
+            self.tokens = tokens_for(self.code)
+        else:
+            try:
+                self.tokens = self.tokens.edited(self.code, start, end, len(text))
+            except SyntaxError:
+                self.tokens = None
+        offset = old_items[first].start if old_items else 0
+        try:
+            items = self._parse_items(offset, lambda offset: offset >= start + len(text)
+                                      and offset - delta in starts)
+        except BaseException:
+            self.code, self.lines, self.tokens = previous
+            raise
+        reused = old_items[starts[items[-1].end - delta]:] if items[-1].end < len(self.code) else []
+        for item in reused:
+            item.start += delta
+            item.end += delta
+            if line_delta:
+                item.shift_lines(line_delta)
+        self.items = old_items[:first] + items + reused
+        return self.block
+
+    def __repr__(self):
+        return f"IncrementalParse(items={len(self.items)}, length={len(self.code)})"
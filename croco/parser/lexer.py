@@ -0,0 +1,391 @@
+"""
+The tokenizer of croco.
+
+tokenize reads a source once, from the start to the end, and gives its Tokens: the kind and the offsets
+of each token, kept in compact arrays. The kinds are the ones of Python's tokenize: NAME, NUMBER, STRING and OP
+for the fragments of the code, NEWLINE at the end of each logical line, INDENT and DEDENT when the indentation
+of the logical lines changes (one per unit of indentation, 4 spaces or a tab, counted like the grammar does),
+COMMENT, and NL for the other line breaks (empty and comment lines, inside brackets).
+The spaces and the line continuations are not tokens.
+
+The sources tokenize doesn't accept (an unknown character, an unclosed quote or bracket) raise a SyntaxError,
+the grammar gives the error of the code when it is parsed by characters.
+
+The Tokens can be given to crocoparser as its "tokens" variable: its spaces, names, numbers, strings
+and indentations are then read from them (see parser_v2.Lexed) instead of being matched character by character.
+After an edit of the source, Tokens.edited only reads the lines around the edit again.
+Tokens.top_level gives the starts of the top-level statements, where a big source is split to be parsed
+on several processes (see parallel).
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+import re
+
+from parser_v2 import ByteSource, Span
+from parser_v2.token import LineIndex
+
+NAME, NUMBER, STRING, OP, NEWLINE, INDENT, DEDENT, COMMENT, NL = range(9)
+KIND_NAMES = ("NAME", "NUMBER", "STRING", "OP", "NEWLINE", "INDENT", "DEDENT", "COMMENT", "NL")
+
+_PATTERN = r"""
+    (?P<SPACES>[ \t]+)
+  | (?P<NAME>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<NUMBER>[0-9]+\.[0-9]*|\.[0-9]+|[0-9]+)
+  | (?P<OP>\*\*=?|//=?|<<=?|>>=?|[-+*/%@&|^<>=!]=?|[()\[\]{},.:;~])
+  | (?P<NEWLINE>\n)
+  | (?P<COMMENT>\#[^\n]*)
+  | (?P<STRING>'[^']*'|"[^"]*")
+  | (?P<CONTINUATION>\\\n)
+"""
+_TOKEN = re.compile(_PATTERN, re.VERBOSE)
+_BYTES_TOKEN = re.compile(_PATTERN.encode(), re.VERBOSE)  # For the bytes of a ByteSource
+_KINDS = {"NAME": NAME, "NUMBER": NUMBER, "OP": OP, "COMMENT": COMMENT, "STRING": STRING}
+_OPENING = frozenset(["(", "[", "{", b"(", b"[", b"{"])
+_CLOSING = frozenset([")", "]", "}", b")", b"]", b"}"])
+
+
+def _int_array(values=()):
+    return array("q", values)
+
+
+class Tokens:
+    """
+    The tokens of a source: the token k is of the kind kinds[k] and covers code[tokens.start(k):tokens.end(k)].
+    The zero-width DEDENT tokens are before the first token of their line.
+    The indentation of each line starting outside brackets is kept too, see indents.
+
+    The offsets of the tokens after the last edit (from split, and from line_split for the lines) are stored
+    from the end of the source: they don't change when an edit before them changes the length of the source,
+    so an edit only converts the offsets between it and the previous one.
+    """
+    __slots__ = ("code", "length", "kinds", "starts", "ends", "split",
+                 "line_starts", "line_units", "line_ends", "line_levels", "line_split", "lines")
+
+    def __init__(self, code):
+        self.code = code
+        self.length = len(code)
+        self.kinds = array("B")
+        self.starts = _int_array()
+        self.ends = _int_array()
+        self.line_starts = _int_array()
+        self.line_units = _int_array()
+        self.line_ends = _int_array()
+        self.line_levels = _int_array()  # The units of the logical lines before the line
+        self.split = self.line_split = None  # None while they are all stored from the start
+        self.lines = LineIndex(code)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def start(self, k) -> int:
+        return self.starts[k] if self.split is None or k < self.split else self.starts[k] + self.length
+
+    def end(self, k) -> int:
+        return self.ends[k] if self.split is None or k < self.split else self.ends[k] + self.length
+
+    def __getitem__(self, k) -> tuple[int, int, int]:
+        """The kind, start and end of the token k"""
+        return self.kinds[k], self.start(k), self.end(k)
+
+    def span(self, k) -> Span:
+        start = self.start(k)
+        return Span(self.code, start, self.end(k) - start, lines=self.lines)
+
+    def text(self, k) -> str:
+        return self.code[self.start(k):self.end(k)]
+
+    def __iter__(self):
+        """The (kind, span) of the tokens"""
+        for k in range(len(self)):
+            yield self.kinds[k], self.span(k)
+
+    def top_level(self):
+        """
+        The offsets of the lines starting a top-level statement: a logical line at the first indentation level
+        (not in brackets, a string or a line continuation). The elif and else lines belong to the statement before,
+        like the line after a flow control without its indented block.
+        """
+        level, line_start, colon = 0, True, False
+        for k in range(len(self)):
+            kind = self.kinds[k]
+            if kind == INDENT:
+                level += 1
+            elif kind == DEDENT:
+                level -= 1
+            elif kind == NEWLINE:
+                line_start = True
+            elif kind not in (NL, COMMENT):
+                if line_start and not level and not colon and self.text(k) not in ("elif", "else"):
+                    line = _search(bisect_right, self.line_starts, self.line_split, self.start(k), self.length) - 1
+                    yield self._line_offset(self.line_starts, line)
+                line_start = False
+                colon = kind == OP and self.text(k) == ":"
+
+    def indents(self):
+        """The (start, units, end) of the indentation of the lines starting outside brackets"""
+        for k in range(len(self.line_starts)):
+            yield self._line_offset(self.line_starts, k), self.line_units[k], self._line_offset(self.line_ends, k)
+
+    def _line_offset(self, values, k):
+        return values[k] if self.line_split is None or k < self.line_split else values[k] + self.length
+
+    def _bisect(self, bisect, offset):
+        """bisect (bisect_left or bisect_right) of offset in the starts"""
+        return _search(bisect, self.starts, self.split, offset, self.length)
+
+    def at(self, offset) -> int:
+        """The index of the token covering offset (the next one if offset is between two tokens)"""
+        k = self._bisect(bisect_right, offset) - 1
+        if k >= 0 and self.end(k) > offset:
+            return k
+        return k + 1
+
+    # The matches of the structs of the grammar, see parser_v2.Lexed
+
+    def _token_at(self, offset, kind):
+        """The end of the token of this kind starting at offset, False if another one starts there, else None"""
+        k = self._bisect(bisect_right, offset) - 1
+        if k < 0:
+            return None
+        end = self.end(k)
+        if self.start(k) != offset or end == offset:
+            return None
+        return end if self.kinds[k] == kind else False
+
+    def name(self, offset):
+        return self._token_at(offset, NAME)
+
+    def string(self, offset):
+        return self._token_at(offset, STRING)
+
+    def integer(self, offset):
+        end = self._token_at(offset, NUMBER)
+        if end and self.code.find(".", offset, end) != -1:  # The digits before the dot are an integer
+            return None
+        return end
+
+    def floating(self, offset):
+        end = self._token_at(offset, NUMBER)
+        if end and self.code.find(".", offset, end) == -1:
+            return False
+        return end
+
+    def _skip(self, offset, skipped):
+        k = self._bisect(bisect_left, offset)
+        if k and self.end(k - 1) > offset:  # Inside a token
+            return None
+        kinds, n = self.kinds, len(self.kinds)
+        while k < n and kinds[k] in skipped:
+            k += 1
+        return self.start(k) if k < n else self.length
+
+    def inline_spaces(self, offset):
+        """The end of the spaces, line continuations and indentation at offset"""
+        return self._skip(offset, (INDENT, DEDENT))
+
+    def multiline_spaces(self, offset):
+        """The end of the spaces, line breaks and comments at offset, inside brackets"""
+        return self._skip(offset, (COMMENT, NL))
+
+    def _line(self, offset) -> int:
+        """The index of the line starting at offset, -1 if there is none"""
+        k = _search(bisect_left, self.line_starts, self.line_split, offset, self.length)
+        if k == len(self.line_starts) or self._line_offset(self.line_starts, k) != offset:
+            return -1
+        return k
+
+    def indentation(self, offset, units):
+        """The end of the indentation of the line starting at offset if it has these units, False if it has less"""
+        k = self._line(offset)
+        if k < 0:
+            return None
+        if self.line_units[k] == units:
+            return self._line_offset(self.line_ends, k)
+        return False if self.line_units[k] < units else None  # Too many units, the grammar raises the error
+
+    def edited(self, code, start: int, end: int, length: int) -> "Tokens":
+        """
+        The tokens of code, the source with its characters from start to end replaced by length characters.
+        The tokens are read again from the line of the edit, until a line starting like a line of the
+        previous source: from there its tokens are kept. Raises a SyntaxError like tokenize.
+        """
+        delta = length - (end - start)
+        line = _search(bisect_right, self.line_starts, self.line_split, start, self.length) - 1  # The first is 0
+        restart, levels = self._line_offset(self.line_starts, line), self.line_levels[line]
+        tokens = Tokens(code)
+        k = self._bisect(bisect_left, restart)
+        _extend_absolute(tokens.starts, self.starts, 0, k, self.split, self.length)
+        _extend_absolute(tokens.ends, self.ends, 0, k, self.split, self.length)
+        tokens.kinds = self.kinds[:k]
+        _extend_absolute(tokens.line_starts, self.line_starts, 0, line, self.line_split, self.length)
+        _extend_absolute(tokens.line_ends, self.line_ends, 0, line, self.line_split, self.length)
+        tokens.line_units, tokens.line_levels = self.line_units[:line], self.line_levels[:line]
+
+        def resync(offset, offset_levels):
+            if offset < start + length:
+                return False
+            old = self._line(offset - delta)
+            return old >= 0 and self.line_levels[old] == offset_levels
+
+        stop = _scan(tokens, restart, levels, resync)
+        if stop is not None:  # The next tokens are the ones of the previous source, kept from the end
+            tokens.split, tokens.line_split = len(tokens.kinds), len(tokens.line_starts)
+            k = self._bisect(bisect_left, stop - delta)
+            line = self._line(stop - delta)
+            tokens.kinds += self.kinds[k:]
+            _extend_relative(tokens.starts, self.starts, k, self.split, self.length)
+            _extend_relative(tokens.ends, self.ends, k, self.split, self.length)
+            _extend_relative(tokens.line_starts, self.line_starts, line, self.line_split, self.length)
+            _extend_relative(tokens.line_ends, self.line_ends, line, self.line_split, self.length)
+            tokens.line_units += self.line_units[line:]
+            tokens.line_levels += self.line_levels[line:]
+        return tokens
+
+    def __repr__(self):
+        return f"Tokens({len(self)} tokens, {len(self.line_starts)} lines)"
+
+
+def _search(bisect, values, split, offset, length) -> int:
+    """bisect of offset in values (starts or line starts), stored from the end from split"""
+    if split is None:
+        return bisect(values, offset)
+    k = bisect(values, offset, 0, split)
+    return k if k < split else bisect(values, offset - length, split)
+
+
+def _extend_absolute(target, values, first, stop, split, length):
+    """Add values[first:stop] to target, the ones stored from the end (from split) being converted"""
+    if split is None or stop <= split:
+        target += values[first:stop]
+    else:
+        target += values[first:split]
+        target += _int_array(map(length.__add__, values[split:stop]))
+
+
+def _extend_relative(target, values, first, split, length):
+    """Add values[first:] to target, stored from the end (the ones stored from the start being converted)"""
+    if split is not None and first >= split:
+        target += values[first:]
+    else:
+        target += _int_array(map((-length).__add__, values[first:split]))
+        if split is not None:
+            target += values[split:]
+
+
+def _error(tokens, message, offset):
+    line = tokens.lines.line(offset)
+    e = SyntaxError(f"{message} line {line + 1}")
+    e.lineno = line + 1
+    return e
+
+
+def _scan(tokens, pos, levels, stop=None):
+    """
+    Add to tokens the tokens of its code from pos, a line start outside brackets after logical lines
+    indented by levels units. Stops at the first line start for which stop(offset, levels) is true,
+    and returns its offset (None if it read until the end).
+    """
+    code = tokens.code
+    source, pattern = (code.data, _BYTES_TOKEN) if isinstance(code, ByteSource) else (code, _TOKEN)
+    four, tab, newline, comment = ("    ", "\t", "\n", "#") if isinstance(source, str) else (b"    ", b"\t", b"\n", b"#")
+    kinds, starts, ends = tokens.kinds, tokens.starts, tokens.ends
+    add_kind, add_start, add_end = kinds.append, starts.append, ends.append
+    length = len(source)
+    match = pattern.match
+    depth = 0  # The brackets opened
+    logical = False  # If the current line has tokens
+    line_start = True
+    while True:
+        if line_start:
+            if stop is not None and stop(pos, levels):
+                return pos
+            units, units_start, unit_ends = 0, pos, []
+            while True:
+                if source[pos:pos + 4] == four:  # Sliced, a mmap has no startswith
+                    pos += 4
+                elif source[pos:pos + 1] == tab:
+                    pos += 1
+                else:
+                    break
+                units += 1
+                unit_ends.append(pos)
+            tokens.line_starts.append(units_start)
+            tokens.line_units.append(units)
+            tokens.line_ends.append(pos)
+            tokens.line_levels.append(levels)
+            content = pos
+            while source[content:content + 1] in (b" ", b"\t", " ", "\t"):
+                content += 1
+            if content < length and source[content:content + 1] not in (newline, comment):
+                if units > levels:
+                    for unit_start, unit_end in zip([units_start, *unit_ends][levels:], unit_ends[levels:]):
+                        add_kind(INDENT)
+                        add_start(unit_start)
+                        add_end(unit_end)
+                for _ in range(levels - units):
+                    add_kind(DEDENT)
+                    add_start(units_start)
+                    add_end(units_start)
+                levels = units
+            line_start = False
+        if pos >= length:
+            break
+        m = match(source, pos)
+        if m is None:
+            if source[pos:pos + 1] in ("'", '"', b"'", b'"'):
+                raise _error(tokens, "Unclosed quote", pos)
+            raise _error(tokens, f"Unexpected character {code[pos]!r}", pos)
+        group = m.lastgroup
+        end = m.end()
+        if group == "SPACES":
+            pos = end
+            continue
+        if group == "NEWLINE":
+            add_kind(NEWLINE if logical and not depth else NL)
+            logical = False
+            line_start = not depth
+        elif group == "CONTINUATION":
+            if depth:
+                raise _error(tokens, "Unexpected line continuation in brackets", pos)
+            pos = end
+            continue
+        else:
+            kind = _KINDS[group]
+            if kind == OP:
+                char = source[pos:end]
+                if char in _OPENING:
+                    depth += 1
+                elif char in _CLOSING:
+                    if not depth:
+                        raise _error(tokens, f"Unmatched {code[pos]!r}", pos)
+                    depth -= 1
+            if kind != COMMENT:
+                logical = True
+            add_kind(kind)
+        add_start(pos)
+        add_end(end)
+        pos = end
+    if depth:
+        raise _error(tokens, "Unclosed bracket at the end of the code,", pos)
+    for _ in range(levels):
+        add_kind(DEDENT)
+        add_start(length)
+        add_end(length)
+    return None
+
+
+def tokenize(code) -> Tokens:
+    """The Tokens of code, a str or a ByteSource"""
+    tokens = Tokens(code)
+    _scan(tokens, 0, 0)
+    return tokens
+
+
+def tokens_for(code) -> Tokens | None:
+    """The Tokens to parse code with, None if it can't be tokenized (it is then parsed by characters)"""
+    if not isinstance(code, (str, ByteSource)):  # A CharStream is only read as the parse needs it
+        return None
+    try:
+        return tokenize(code)
+    except SyntaxError:
+        return None
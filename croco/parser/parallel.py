@@ -0,0 +1,61 @@
+"""
+Parsing of a big source on several processes.
+
+The source is tokenized once to find its top-level statements (see Tokens.top_level). The chunks of statements
+between them don't depend on each other for the grammar: they are parsed in a ProcessPoolExecutor, and the
+statements of their Blocks joined in one Block. A chunk counts its lines from its first line in the source,
+so the line numbers are the ones of a parse of the whole source.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import os
+
+from croco.parser import blocks, syntax
+from croco.parser.lexer import tokens_for
+from parser_v2 import Indexer, Span
+from parser_v2.token import LineIndex
+
+MIN_CHUNK = 1 << 16  # The characters under which a chunk is not worth sending to a process
+CHUNKS_PER_JOB = 4  # Smaller chunks, for the processes to finish together
+
+
+def chunks(tokens, count, min_chunk=MIN_CHUNK) -> list[tuple[int, int]]:
+    """The (start, end) of at most count chunks of top-level statements of about the same size"""
+    length = len(tokens.code)
+    size = max(length // count, min_chunk)
+    bounds = [0]
+    for offset in tokens.top_level():
+        if offset - bounds[-1] >= size and length - offset >= min_chunk:
+            bounds.append(offset)
+    bounds.append(length)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _parse_chunk(code, first_line, engine):
+    lines = LineIndex(code, first_line)
+    return syntax.crocoparser.parse(code, namespace={"tokens": tokens_for(code)},
+                                    index=Indexer(code, 0, lines, Span), engine=engine)
+
+
+def parse_parallel(code, jobs=None, engine=None, min_chunk=MIN_CHUNK) -> blocks.Block:
+    """
+    The Block of code (a str or a ByteSource) parsed by chunks on several processes.
+    A source too small to be split is parsed in this process.
+    A SyntaxError is the one of the parse of the whole source.
+    :param jobs: the number of processes, os.cpu_count() by default
+    :param min_chunk: the characters of the smallest chunk parsed by a process
+    """
+    jobs = jobs or os.cpu_count() or 1
+    tokens = tokens_for(code)
+    parser = syntax.crocoparser  # Built before the processes are forked, for them to not build it again
+    parts = [] if tokens is None or jobs < 2 else chunks(tokens, jobs * CHUNKS_PER_JOB, min_chunk)
+    if len(parts) < 2:
+        return parser.parse(code, namespace={"tokens": tokens}, engine=engine)
+    texts = [code[start:end] for start, end in parts]
+    first_lines = [tokens.lines.line(start) for start, _ in parts]
+    try:
+        with ProcessPoolExecutor(min(jobs, len(parts))) as executor:
+            results = list(executor.map(_parse_chunk, texts, first_lines, repeat(engine)))
+    except SyntaxError:  # Its line is not pickled: the error is given again by the parse of the whole source
+        return parser.parse(code, namespace={"tokens": tokens}, engine=engine)
+    return blocks.Block.from_toks([block.statements for block in results])
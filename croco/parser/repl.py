@@ -2,12 +2,15 @@
 Interactive REPL for Croco.
 """
 
+import asyncio
+import io
 import traceback
 import time
+from contextlib import redirect_stdout, redirect_stderr
 
-from parser_v2 import CharStream
+from parser_v2 import CharStream, AsyncCharStream
 
-from croco.parser import croco_compile
+from croco.parser import croco_compile, croco_compile_async
 import linecache
 
 
@@ -30,20 +33,28 @@ class Repl:
                 code = croco_compile(stream, filename="<repl>", mode="eval")
             except SyntaxError as e:
                 self.add_in_cache(stream)
-                traceback.print_exc()
-                time.sleep(0.1)
+                self.print_exc()
                 continue
             self.add_in_cache(stream)
-            try:
-                res = eval(code, self.globals)
-            except SystemExit:
+            if not self.execute(code):
                 break
-            except BaseException:
-                traceback.print_exc()
-                time.sleep(0.1)
-            else:
-                if res is not None:
-                    print(res)
+
+    def execute(self, code) -> bool:
+        """Evaluate the code and print its result, return False if it exited"""
+        try:
+            res = eval(code, self.globals)
+        except SystemExit:
+            return False
+        except BaseException:
+            self.print_exc()
+        else:
+            if res is not None:
+                print(res)
+        return True
+
+    def print_exc(self):
+        traceback.print_exc()
+        time.sleep(0.1)
 
     def ask_input(self):
         s = input(self.next_prefix)
@@ -53,5 +64,63 @@ class Repl:
         return s + "\n"
 
 
+class AsyncRepl(Repl):
+    """
+    A Repl talking through asyncio streams, its run and ask_input are coroutines:
+    one event loop can serve many of them (see start_server).
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        super().__init__()
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    async def run(self):
+        while not self.closed:
+            stream = AsyncCharStream(self.ask_input)
+            self.next_prefix = ">>> "
+            output = io.StringIO()
+            try:
+                code = await croco_compile_async(stream, filename="<repl>", mode="eval")
+            except SyntaxError as e:
+                if self.closed:
+                    break
+                code, error = None, e
+            # The evaluation doesn't await, the other sessions don't write to the redirected output meanwhile
+            with redirect_stdout(output), redirect_stderr(output):
+                self.add_in_cache(stream)
+                if code is None:
+                    traceback.print_exception(type(error), error, error.__traceback__)
+                elif not self.execute(code):
+                    self.closed = True
+            self.writer.write(output.getvalue().encode())
+        await self.writer.drain()
+
+    def print_exc(self):
+        traceback.print_exc()
+
+    async def ask_input(self):
+        self.writer.write(self.next_prefix.encode())
+        await self.writer.drain()
+        self.next_prefix = "... "
+        line = await self.reader.readline()
+        self.closed = not line
+        line = line.decode().rstrip("\r\n")
+        if not line:
+            return None
+        return line + "\n"
+
+
+async def start_server(host="localhost", port=0) -> asyncio.AbstractServer:
+    """Start serving a new AsyncRepl to each connection on host and port"""
+    async def session(reader, writer):
+        try:
+            await AsyncRepl(reader, writer).run()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(session, host, port)
+
+
 if __name__ == '__main__':
     Repl().run()
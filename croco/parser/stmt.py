@@ -5,12 +5,13 @@ from croco.parser.consts import OP_TO_NAME
 
 
 class Statement:
+    # The nodes declare their attributes, the ones set by the passes too (filename, ctx, end_partial...)
+    __slots__ = ("line", "filename")
     _show_clsname_in_repr = True
 
-    filename = None
-
     def __init__(self, line):
         self.line = line
+        self.filename = None
 
     def _repr(self):
         return "???"
@@ -32,6 +33,7 @@ class Statement:
         return self
 
 class Affectation(Statement):
+    __slots__ = ("variable", "value", "inplace_op")
     _show_clsname_in_repr = False
 
     def __init__(self, variable, value, line, inplace_op=None):
@@ -55,7 +57,7 @@ class Affectation(Statement):
             case [var, [], "=" as eq, _, value]:
                 return cls(var, value, eq.start_line)
             case [var, [inplace_op], "=" as eq, _, value]:
-                return cls(var, value, eq.start_line, inplace_op=inplace_op)
+                return cls(var, value, eq.start_line, inplace_op=str(inplace_op))
             case _:
                 raise SyntaxError("Invalid affectation " + str(toklist))
 
@@ -68,6 +70,11 @@ class Affectation(Statement):
             self.value.to_expr_code(gen)
         self.variable.store(gen)
 
+    def optimize(self):
+        self.variable = self.variable.optimize()
+        self.value = self.value.optimize()
+        return self
+
     def first_pass(self, ctx: FirstPassCtx):
         if isinstance(self.variable, expr.VarName):
             ctx.vars.add(self.variable.name)
@@ -76,6 +83,7 @@ class Affectation(Statement):
 
 
 class Pass(Statement):
+    __slots__ = ()
     def _repr(self):
         return "pass"
 
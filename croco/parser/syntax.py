@@ -1,4 +1,5 @@
 from croco.parser import expr, stmt, blocks, collections
+from croco.parser.lexer import Tokens
 
 import parser_v2 as P
 
@@ -47,6 +48,7 @@ def _bracketed(value, brackets="()", indexes=(1,)):
 
     return P.Sequence(
         P.SaveAs(brackets[0], "bracket_opening"),
+        P.CUT,
         P.UNS(
             value,
             SPACES=P.Var("MULTILINE_SPACES"),
@@ -58,18 +60,16 @@ def _spacable(v):
     """An expression that can be surrounded by spaces"""
     return P.Sequence(P.Var("SPACES"), v, P.Var("SPACES")).set_factory(lambda v: v, indexes=[1])
 
-def _operator(ops, sup, factory=expr.Op.from_toks):
-    return (sup + (
-            P.SaveAs(P.Any(*ops), "last_op") + sup.expect("Expected expression after operator {ns[last_op]} line {i.line}")
-    ) * P.REPEAT).set_factory(factory)
-
-
 def get_parser():
     # Spaces
     NEWLINE = P.Str("\n")
-    INLINE_SPACES = P.Any(*" \t", "\\\n") * P.REPEAT
+    # The lexical structs are read from the tokens given to the parse, if any (see lexer)
+    INLINE_SPACES = P.Lexed(Tokens.inline_spaces, (P.Any(*" \t", "\\\n") * P.REPEAT).set_factory(lambda v: ""),
+                            factory=lambda tok: "")
     COMMENT = P.Str("#") + P.Not(P.END | NEWLINE) * P.REPEAT
-    MULTILINE_SPACES = (P.Any(*" \t\n\r", COMMENT) * P.REPEAT).set_factory(lambda v: "")
+    MULTILINE_SPACES = P.Lexed(Tokens.multiline_spaces,
+                               (P.Any(*" \t\n\r", COMMENT) * P.REPEAT).set_factory(lambda v: ""),
+                               factory=lambda tok: "")
 
     SPACES = INLINE_SPACES  # Default in program; multiline in brackets
 
@@ -80,19 +80,20 @@ def get_parser():
 
     # Constants
     _DIGIT = P.Any(*DIGITS)
-    INT = (_DIGIT * P.MINI_1).set_factory(expr.Int.from_toks)
-    FLOAT = ((_DIGIT * P.MINI_1 + "." + _DIGIT * P.REPEAT)
-             | ("." + _DIGIT * P.MINI_1)).set_factory(expr.Float.from_toks, )
-    STRING = P.Sequence(
+    INT = P.Lexed(Tokens.integer, (_DIGIT * P.MINI_1).set_factory(expr.Int.from_toks), factory=expr.Int.from_token)
+    FLOAT = P.Lexed(Tokens.floating, ((_DIGIT * P.MINI_1 + "." + _DIGIT * P.REPEAT)
+                                      | ("." + _DIGIT * P.MINI_1)).set_factory(expr.Float.from_toks),
+                    factory=expr.Float.from_token)
+    STRING = P.Lexed(Tokens.string, P.Sequence(
         P.SaveAs(P.Any(*"'\""), "quote_char"),
         ~(P.Var("quote_char")) * P.REPEAT,
         P.Var("quote_char").expect("Unclosed quote '{ns[quote_char]}'"),
-        factory=expr.String.from_toks)
+        factory=expr.String.from_toks), factory=expr.String.from_token)
     CONSTANT = FLOAT | INT | STRING
 
     # Varnames
-    IDENTIFIER = (P.Any(*LETTERS) + P.Any(*LETTERS, *DIGITS) * P.REPEAT).set_factory(
-        expr.VarName.from_toks)
+    IDENTIFIER = P.Lexed(Tokens.name, (P.Any(*LETTERS) + P.Any(*LETTERS, *DIGITS) * P.REPEAT).set_factory(
+        expr.VarName.from_toks), factory=expr.VarName.from_token)
     SPACED_IDENTIFIER = _spacable(IDENTIFIER)  # With some spaces around
 
     COLL_LITERALS = P.Any(*[
@@ -114,17 +115,19 @@ def get_parser():
     SECOND_LEVEL = (FIRST_LEVEL + _spacable(GETATTR | CALL | GETITEM) * P.REPEAT).set_factory(_convert_second_level)
 
     # Third level is the operators, in order of priority
-    EXPONENT = _operator(["**"], SECOND_LEVEL)
-    MULTIPLICATION = _operator(["*", "//", "/", "%"], EXPONENT)
-    ADDITION = _operator("+-", MULTIPLICATION)
-    BINSHIFTS = _operator(["<<", ">>"], ADDITION)
-    BINAND = _operator("&", BINSHIFTS)
-    BINXOR = _operator("^", BINAND)
-    BINOR = _operator("|", BINXOR)
-    COMPARISON = _operator(("<=", "<", ">=", ">", "!=", "=="), BINOR, factory=expr.CmpOp.from_toks)
-
-    TUPLE_EXPR = (COMPARISON + (P.Str(",") + COMPARISON) * P.REPEAT).set_factory(collections.get_tuple)
-    BASE_EXPR = COMPARISON
+    OPERATION = P.Operators(SECOND_LEVEL, [
+        (["**"], expr.Op.from_toks),
+        (["*", "//", "/", "%"], expr.Op.from_toks),
+        ("+-", expr.Op.from_toks),
+        (["<<", ">>"], expr.Op.from_toks),
+        ("&", expr.Op.from_toks),
+        ("^", expr.Op.from_toks),
+        ("|", expr.Op.from_toks),
+        (["<=", "<", ">=", ">", "!=", "=="], expr.CmpOp.from_toks),
+    ], message="Expected expression after operator {op} line {i.line}")
+
+    TUPLE_EXPR = (OPERATION + (P.Str(",") + OPERATION) * P.REPEAT).set_factory(collections.get_tuple)
+    BASE_EXPR = OPERATION
 
     EXPECTED_EXPR = TUPLE_EXPR.expect("expected an expression")
 
@@ -147,10 +150,10 @@ def get_parser():
     # Blocks
     indent = 0
     _INDENT_CHARS = P.Any(" "*4, "\t")
-    INDENT = (P.Repeat(
+    INDENT = P.Lexed(Tokens.indentation, (P.Repeat(
         _INDENT_CHARS, mini=P.Var("indent"), maxi=P.Var("indent")
     ) + P.Not(_INDENT_CHARS, increment=0).expect("Too many indentations line {line} col {col}", etype=IndentationError)
-              ).set_factory(lambda v: "")
+              ).set_factory(lambda v: ""), factory=lambda tok: "", args=[P.Var("indent")])
 
 
     END_OF_LINE = (P.Str(";") * P.OPT + (P.END | NEWLINE)).set_factory(lambda v: ...)
@@ -168,7 +171,7 @@ def get_parser():
     ELSE = P.Sequence("else", factory=lambda toklist: blocks.FlowControl(None, toklist[0].start_line))
 
     def _make_flowcontrol(line):
-        return (INDENT + line + ":" + INLINE_SPACES * P.REPEAT +  (
+        return (INDENT + line + P.CUT + ":" + INLINE_SPACES * P.REPEAT +  (
                 (P.Repeat(STATEMENT, join=";", mini=1) + END_OF_LINE)
                 | NEWLINE + P.UNS(P.Var("BLOCK").expect("Expected a block, line {line}"),
                                       indent=P.Var("indent").add(1)))
@@ -178,10 +181,17 @@ def get_parser():
                     + _make_flowcontrol(ELIF) * P.REPEAT
                     + _make_flowcontrol(ELSE) * P.OPT).set_factory(_add_elses)
 
-    BLOCK = ((EMPTY_LINE | LINE | FLOW_CONTROL) * P.MINI_1).set_factory(blocks.Block.from_toks)
+    BLOCK_ITEM = EMPTY_LINE | LINE | FLOW_CONTROL  # A line, or a flow control with its block
+    BLOCK = (BLOCK_ITEM * P.MINI_1).set_factory(blocks.Block.from_toks)
 
     # Parser creation
-    return type("CrocoParser", (P.Parser,), locals(), start=BLOCK)
+    return type("CrocoParser", (P.Parser,), locals(), start=BLOCK, token=P.Span)
 
 
-crocoparser = get_parser()
+def __getattr__(name):
+    """crocoparser is built when first used, importing the package doesn't build the grammar"""
+    if name == "crocoparser":
+        global crocoparser
+        crocoparser = get_parser()
+        return crocoparser
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
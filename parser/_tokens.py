@@ -1,3 +1,6 @@
+from array import array
+import re
+
 
 class CharToken:
     def __init__(self, char, isescaped=False):
@@ -11,17 +14,53 @@ class CharToken:
     def __eq__(self, other):
         return isinstance(other, CharToken) and self.char == other.char and self.isescaped == other.isescaped
 
-def tokennify(string, escape_chars):
-    tokens: list[CharToken] = []
+class CharTokens:
+    """
+    The tokens of a string, stored compactly: the unescaped text, and escaped[k] is 1 if its character k was escaped.
+    Indexing gives the CharToken of a character (built when asked), slicing gives a CharTokens.
+    """
+    __slots__ = ("text", "escaped")
+
+    def __init__(self, text: str, escaped: array = None):
+        self.text = text
+        self.escaped = array("B", bytes(len(text))) if escaped is None else escaped
+
+    def __len__(self):
+        return len(self.text)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return CharTokens(self.text[i], self.escaped[i])
+        return CharToken(self.text[i], bool(self.escaped[i]))
+
+    def __iter__(self):
+        for char, isescaped in zip(self.text, self.escaped):
+            yield CharToken(char, bool(isescaped))
+
+    def __eq__(self, other):
+        if isinstance(other, CharTokens):
+            return self.text == other.text and self.escaped == other.escaped
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"CharTokens({self.text!r}, escaped={[k for k, isescaped in enumerate(self.escaped) if isescaped]})"
+
+def tokennify(string, escape_chars) -> CharTokens:
+    if not escape_chars:
+        return CharTokens(string)
+    parts = []
+    escaped = array("B")
     i = 0
-    while i < len(string):
-        char = string[i]
-        if char in escape_chars:
-            i += 1
-            if i == len(string):
-                raise Exception("Unexpected end of string with escape character")
-            tokens.append(CharToken(string[i], True))
-        else:
-            tokens.append(CharToken(char))
-        i += 1
-    return tokens
+    for match in re.finditer(f"[{''.join(map(re.escape, escape_chars))}](.?)", string, re.DOTALL):
+        if not match.group(1):
+            raise Exception("Unexpected end of string with escape character")
+        parts.append(string[i:match.start()])
+        parts.append(match.group(1))
+        escaped.frombytes(bytes(match.start() - i))
+        escaped.append(1)
+        i = match.end()
+    parts.append(string[i:])
+    escaped.frombytes(bytes(len(string) - i))
+    return CharTokens("".join(parts), escaped)
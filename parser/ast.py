@@ -1,7 +1,11 @@
+from functools import cache
+from keyword import iskeyword
 from textwrap import indent as indenter
 
 
 class AST:
+    __slots__ = ("attrs",)
+
     def __init__(self, **attrs):
         self.attrs = attrs
 
@@ -29,9 +33,56 @@ class AST:
             middle += indenter(text, indent_add) + ", " + line_change
         return f"{cls_name}{middle})"
 
+class Node(AST):
+    """
+    An AST storing its fields in slots: the fields of a subclass are its __slots__ (added to the ones of its bases).
+    A grammar can declare its node types, else a SequenceStruct generates one from its savenames (see node_class).
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = cls._fields + tuple(cls.__dict__.get("__slots__", ()))
+
+    def __init__(self, **attrs):
+        for name, value in attrs.items():
+            setattr(self, name, value)
+
+    @property
+    def attrs(self):
+        return {name: getattr(self, name) for name in self._fields if hasattr(self, name)}
+
+    def __getattr__(self, item):  # Only called for an unset field
+        raise AttributeError(item)
+
+    def __getitem__(self, item):
+        return self.attrs[item]
+
 class List(AST):
+    __slots__ = ("__items__", "_attrs")
+
     def __init__(self, items, **attrs):
-        super(List, self).__init__(**attrs, __items__=items)
+        self.__items__ = items
+        self._attrs = attrs or None  # Usually empty
+
+    @property
+    def attrs(self):
+        return {**(self._attrs or {}), "__items__": self.__items__}
 
     def __iter__(self):
         return iter(self.__items__)
+
+@cache
+def node_class(fields: tuple[str, ...]) -> type[AST]:
+    """
+    A Node class with these fields, all given to its __init__, named AST to print like one.
+    AST itself if a field can't be a slot and an argument (a keyword, or a name used by Node).
+    """
+    if not all(field.isidentifier() and not iskeyword(field) and not field.startswith("__")
+               and not hasattr(Node, field) for field in fields):
+        return AST
+    namespace = {}
+    exec(f"def __init__(self, {', '.join(fields)}):" + "".join(f"\n    self.{field} = {field}" for field in fields)
+         + "\n    pass", namespace)  # Faster than setting the fields by name in a loop
+    return type("AST", (Node,), {"__slots__": fields, "__init__": namespace["__init__"], "__module__": __name__})
@@ -1,18 +1,30 @@
-from parser._tokens import CharToken
+from parser._tokens import CharToken, CharTokens
 from parser import ast
 
+_Tokens = CharTokens | list[CharToken]
+
 class BasicStruct:
     savename = None
 
-    def extract(self, tokens: list[CharToken], struct_map) -> tuple[..., int]:
+    def extract(self, tokens: _Tokens, struct_map) -> tuple[..., int]:
         """
         Extracts the structure from the tokens.
-        :param tokens: A list of CharTokens that represent all the data that wasn't parsed yet.
+        :param tokens: The CharTokens (or a list of CharToken) that represent all the data that wasn't parsed yet.
         :param struct_map: a dict[name: Struct] that contains all the structures that are usable by name.
         :return: an ast/other if the extraction was successful, None if it wasn't.
         :return: the number of tokens that were used to extract the structure.
         """
-        raise NotImplementedError
+        return self.extract_at(tokens, 0, struct_map)
+
+    def extract_at(self, tokens: _Tokens, i: int, struct_map) -> tuple[..., int]:
+        """
+        Extracts the structure from the tokens starting at the offset i, like extract(tokens[i:], struct_map)
+        without copying the tokens: the structures pass the same list and move the offset.
+        A structure only defining extract is given the slice.
+        """
+        if type(self).extract is BasicStruct.extract:
+            raise NotImplementedError
+        return self.extract(tokens[i:], struct_map)
 
     def __add__(self, other):
         return SequenceStruct(self, cast_interface(other))
@@ -42,18 +54,22 @@ class Structure(BasicStruct):
             self.data = data
         self.savename = savename
 
-    def extract(self, tokens: list[CharToken], struct_map):
-        return self.data.extract(tokens, struct_map)
+    def extract_at(self, tokens: _Tokens, i, struct_map):
+        return self.data.extract_at(tokens, i, struct_map)
 
 
 class String(BasicStruct):
     def __init__(self, string: str):
         self.string = string
 
-    def extract(self, tokens: list[CharToken], struct_map):
-        if len(tokens) < len(self.string):
+    def extract_at(self, tokens: _Tokens, i, struct_map):
+        if isinstance(tokens, CharTokens):  # The escaped characters match too
+            if tokens.text.startswith(self.string, i):
+                return self.string, len(self.string)
             return None, 0
-        if all(tokens[i].char == char for i, char in enumerate(self.string)):
+        if len(tokens) - i < len(self.string):
+            return None, 0
+        if all(tokens[i + k].char == char for k, char in enumerate(self.string)):
             return self.string, len(self.string)
         return None, 0
 
@@ -63,39 +79,47 @@ class Char(BasicStruct):
         self.excluded = excluded
         self.noescape = noescape
 
-    def extract(self, tokens: list[CharToken], struct_map):
-        if len(tokens) < 1:
+    def extract_at(self, tokens: _Tokens, i, struct_map):
+        if len(tokens) <= i:
             return None, 0
-        token = tokens[0]
-        contained = token.char in self.chars
+        if isinstance(tokens, CharTokens):
+            char, isescaped = tokens.text[i], tokens.escaped[i]
+        else:
+            char, isescaped = tokens[i].char, tokens[i].isescaped
+        contained = char in self.chars
         excluded = self.excluded
-        escaping = (self.noescape and token.isescaped) ^ excluded
+        escaping = (self.noescape and isescaped) ^ excluded
 
         match (contained, escaping, excluded):
             case (True, False, False) | (False, False, True):
-                return token.char, 1
+                return char, 1
             case (False, _, False):
                 return None, 0
 
-        if tokens[0].char in self.chars:
+        if char in self.chars:
             if self.excluded:
-                if self.noescape and token.isescaped:
-                    return token.char, 1
+                if self.noescape and isescaped:
+                    return char, 1
                 else:
                     return None, 0
-            elif self.noescape and token.isescaped:
+            elif self.noescape and isescaped:
                 return None, 0
             else:
-                return token.char, 1
+                return char, 1
         else:
             if self.excluded:
-                return token.char, 1
+                return char, 1
             else:
                 return None, 0
 
 class SequenceStruct(BasicStruct):
-    def __init__(self, *parts: BasicStruct | str, savename=None, sep=None):
+    def __init__(self, *parts: BasicStruct | str, savename=None, sep=None, node: type[ast.AST] = None):
+        """
+        :param node: the class of the results, called with the saved parts as keywords. By default, a Node class
+            is generated from the savenames of the parts when the sequence is first extracted.
+        """
         self.savename = savename
+        self.node = node
         self.parts = []
         if sep is None:
             self.sep = None
@@ -109,33 +133,36 @@ class SequenceStruct(BasicStruct):
             else:
                 self.parts.append(cast_interface(part))
 
-    def extract(self, tokens: list[CharToken], struct_map):
+    def extract_at(self, tokens: _Tokens, start, struct_map):
         kws = {}
-        i = 0
+        i = start
         for part in self.parts:
             if self.sep is not None:
                 while True:
-                    res, sep_used = self.sep.extract(tokens[i:], struct_map)
+                    res, sep_used = self.sep.extract_at(tokens, i, struct_map)
                     if res is not None:
                         i += sep_used
                     else:
                         break
-            extracted_data, used = part.extract(tokens[i:], struct_map)
+            extracted_data, used = part.extract_at(tokens, i, struct_map)
             if extracted_data is None:
                 return None, 0
             i += used
             if savename := getattr(part, "savename", None):
                 kws[savename] = extracted_data
-        return ast.AST(**kws), i
+        if self.node is None:
+            savenames = (getattr(part, "savename", None) for part in self.parts)
+            self.node = ast.node_class(tuple(dict.fromkeys(filter(None, savenames))))
+        return self.node(**kws), i - start
 
 class FirstStruct(BasicStruct):
     def __init__(self, *parts: BasicStruct | str, savename=None):
         self.savename = savename
         self.parts = [cast_interface(part) for part in parts]
 
-    def extract(self, tokens: list[CharToken], struct_map):
+    def extract_at(self, tokens: _Tokens, i, struct_map):
         for part in self.parts:
-            extracted, used = part.extract(tokens, struct_map)
+            extracted, used = part.extract_at(tokens, i, struct_map)
             if extracted is not None:
                 return extracted, used
         return None, 0
@@ -145,8 +172,8 @@ class StructGetter(BasicStruct):
         self.savename = savename
         self.name = name
 
-    def extract(self, tokens: list[CharToken], struct_map):
-        return struct_map[self.name].extract(tokens, struct_map)
+    def extract_at(self, tokens: _Tokens, i, struct_map):
+        return struct_map[self.name].extract_at(tokens, i, struct_map)
 
 class Repeat(BasicStruct):
     def __init__(self, data: BasicStruct, mini, maxi=None, *, savename=None, kwargs=None):
@@ -164,24 +191,24 @@ class Repeat(BasicStruct):
         self.mini = mini
         self.maxi = maxi
 
-    def extract(self, tokens: list[CharToken], struct_map):
+    def extract_at(self, tokens: _Tokens, start, struct_map):
         extracted = []
-        i = 0
+        i = start
         for _ in range(self.mini):
-            extracted_data, used = self.data.extract(tokens[i:], struct_map)
+            extracted_data, used = self.data.extract_at(tokens, i, struct_map)
             if extracted_data is None:
                 return None, 0
             i += used
             extracted.append(extracted_data)
         n = 0
         while n < self.maxi - self.mini:
-            extracted_data, used = self.data.extract(tokens[i:], struct_map)
+            extracted_data, used = self.data.extract_at(tokens, i, struct_map)
             if extracted_data is None:
                 break
             i += used
             extracted.append(extracted_data)
             n += 1
-        return ast.List(extracted, **self.kwargs), i
+        return ast.List(extracted, **self.kwargs), i - start
 
 
 class _RepeatConst:
@@ -1,6 +1,11 @@
 from parser_v2.var import Var, Transformer as Trsfrm
-from parser_v2.struct import Str, Any, Seq, Sequence, Expected, Repeat, Not, UpdateNameSpace, UNS, END, SaveAs
-from parser_v2.parser import Parser, parse
-from parser_v2.token import Token, Indexer
+from parser_v2.struct import Str, Any, Seq, Sequence, Expected, Repeat, Not, UpdateNameSpace, UNS, END, SaveAs, CUT, \
+    Operators, Lexed
+from parser_v2.parser import Parser, parse, parse_file
+from parser_v2.token import Token, Span, Indexer, join, line_text
 from parser_v2.constants import *
-from parser_v2.char_stream import CharStream
+from parser_v2.char_stream import CharStream, AsyncCharStream, NeedInput
+from parser_v2.byte_source import ByteSource
+from parser_v2.memo import Memo
+from parser_v2.profiler import Profiler
+from parser_v2.scope import Scope
@@ -0,0 +1,391 @@
+"""
+Static analysis of the grammars, done when they are built.
+
+The FIRST set of a struct is the set of characters a match of this struct can start with.
+It is None when it can't be known (dynamic variables, Expected, Not ...), and a struct is nullable
+if it can match without consuming anything: such structs must always be tried.
+
+The FOLLOW set of a struct is the set of characters that can come after one of its matches,
+END_OF_INPUT ("") standing for the end of the code. It is None when unknown, and for the structs
+that are not reached from the start of the parser.
+
+The grammar entries used through Var are assumed fixed, only the dynamic variables
+(set by UpdateNameSpace or SaveAs) can change during a parse.
+
+The analysis also looks for the hazards of the grammar, see find_hazards.
+The Analysis is kept on the parser as __analysis__, its report method describes the results.
+
+The parse only needs the FIRST sets: the FOLLOW sets and the hazards are computed the first time they are asked.
+The FIRST sets the parse relies on (the dispatch tables of the Any, the first and nullable attributes of the structs)
+don't follow any Var: a struct can be shared by several grammars, and the namespace of a parse can override
+any name. They are the same for every grammar, the dispatch tables are still kept by the Analysis of each parser.
+"""
+from collections import namedtuple
+from functools import cached_property
+from weakref import WeakKeyDictionary
+
+from parser_v2.scope import Scope
+from parser_v2.struct import BasicStruct, Str, Any, Sequence, Repeat, Expected, Not, UpdateNameSpace, SaveAs, End, \
+    Operators, Lexed
+from parser_v2.var import Partial, Var
+from parser_v2 import fusion
+
+UNKNOWN = (None, True)
+END_OF_INPUT = ""
+PROBES = "a0_ (=.\n"  # The characters tried after a literal to find the alternatives it shadows
+
+
+def walk(roots, grammar=None):
+    """All the structs used by roots, following the Vars that are resolved by grammar"""
+    seen = set()
+    todo = list(roots)
+    while todo:
+        struct = todo.pop()
+        if id(struct) in seen:
+            continue
+        seen.add(id(struct))
+        yield struct
+        todo.extend(struct.children())
+        if grammar is not None and isinstance(struct, Var) and isinstance(grammar.get(struct.vname), BasicStruct):
+            todo.append(grammar[struct.vname])
+
+
+def dynamic_names(grammar: dict) -> set[str]:
+    """The names that can be rebound during a parse"""
+    names = set()
+    for struct in walk([value for value in grammar.values() if isinstance(value, BasicStruct)], grammar):
+        if isinstance(struct, UpdateNameSpace):
+            names.update(struct.ns)
+        elif isinstance(struct, SaveAs):
+            names.add(struct.vname)
+    return names
+
+
+def _first_of_str(string):
+    if not isinstance(string, str):
+        return UNKNOWN
+    if string == "":
+        return frozenset(), True
+    return frozenset(string[0]), False
+
+
+class FirstSets:
+    """FIRST sets and nullability of the structs of a grammar, computed until a fixed point is reached"""
+    def __init__(self, roots, grammar=None):
+        self.grammar = grammar or {}
+        self.dynamic = dynamic_names(self.grammar)
+        self.structs = list(walk(roots, grammar))
+        self.results = {id(struct): (frozenset(), False) for struct in self.structs}
+        changed = True
+        while changed:
+            changed = False
+            for struct in reversed(self.structs):  # The children first, to converge in fewer passes
+                result = self._compute(struct)
+                if result != self.results[id(struct)]:
+                    self.results[id(struct)] = result
+                    changed = True
+
+    def __getitem__(self, struct) -> tuple[frozenset[str] | None, bool]:
+        return self.results.get(id(struct), UNKNOWN)
+
+    def _compute(self, struct):
+        if isinstance(struct, Str):
+            if isinstance(struct.value, Partial):
+                return UNKNOWN
+            return _first_of_str(struct.value)
+        elif isinstance(struct, Any):
+            chars, nullable = set(), False
+            for value in struct.values:
+                first, value_nullable = self[value]
+                if first is None:
+                    return UNKNOWN
+                chars |= first
+                nullable |= value_nullable
+            return frozenset(chars), nullable
+        elif isinstance(struct, Sequence):
+            chars = set()
+            for position, value in enumerate(struct.values):
+                if position == struct.cut:  # Committed without consuming anything, it must be tried
+                    return UNKNOWN
+                first, nullable = self[value]
+                if first is None:
+                    return UNKNOWN
+                chars |= first
+                if not nullable:
+                    return frozenset(chars), False
+            if struct.cut is not None:
+                return UNKNOWN
+            return frozenset(chars), True
+        elif isinstance(struct, Repeat):
+            first, nullable = self[struct.struct]
+            if not (isinstance(struct.mini, int) and struct.mini > 0) or struct.maxi == 0:
+                nullable = True
+            return first, nullable
+        elif isinstance(struct, (UpdateNameSpace, SaveAs)):
+            return self[struct.struct]
+        elif isinstance(struct, Operators):
+            return self[struct.operand]
+        elif isinstance(struct, Lexed):  # It matches like its fallback
+            return self[struct.fallback]
+        elif isinstance(struct, Not):
+            return (frozenset(), True) if struct.increment == 0 else UNKNOWN
+        elif isinstance(struct, End):
+            return frozenset(), True
+        elif isinstance(struct, Var):
+            if struct.vname in self.dynamic or struct.vname not in self.grammar:
+                return UNKNOWN
+            value = self.grammar[struct.vname]
+            if isinstance(value, BasicStruct):
+                return self[value]
+            return _first_of_str(value)
+        # Expected must be tried to raise its error, other structs are unknown
+        return UNKNOWN
+
+
+def _union(a, b):
+    if a is None or b is None:
+        return None
+    return a | b
+
+
+class FollowSets:
+    """FOLLOW sets of the structs reached from start, computed until a fixed point is reached"""
+    def __init__(self, first_sets: FirstSets, start=None):
+        self.first_sets = first_sets
+        grammar = first_sets.grammar
+        reached = {id(struct) for struct in walk([start], grammar)} if isinstance(start, BasicStruct) else set()
+        self.results = {id(struct): frozenset() for struct in first_sets.structs if id(struct) in reached}
+        if isinstance(start, BasicStruct):
+            self.results[id(start)] = frozenset([END_OF_INPUT])
+        changed = True
+        while changed:
+            changed = False
+            for struct in first_sets.structs:
+                if id(struct) not in self.results:
+                    continue
+                for child, follow in self._propagate(struct, self.results[id(struct)]):
+                    if id(child) not in self.results:
+                        continue
+                    old = self.results[id(child)]
+                    new = _union(old, follow)
+                    if new != old:
+                        self.results[id(child)] = new
+                        changed = True
+
+    def __getitem__(self, struct) -> frozenset[str] | None:
+        return self.results.get(id(struct))
+
+    def _first_of_sequence(self, values, follow):
+        """The FIRST set of the values one after the other, then follow"""
+        chars = frozenset()
+        for value in values:
+            if isinstance(value, End):
+                return _union(chars, frozenset([END_OF_INPUT]))
+            first, nullable = self.first_sets[value]
+            chars = _union(chars, first)
+            if not nullable:
+                return chars
+        return _union(chars, follow)
+
+    def _propagate(self, struct, follow):
+        """The children of struct, with what follows them knowing that follow follows struct"""
+        follows = {}
+        if isinstance(struct, Sequence):
+            for k, value in enumerate(struct.values):
+                follows[id(value)] = value, _union(follows.get(id(value), (None, frozenset()))[1],
+                                                   self._first_of_sequence(struct.values[k + 1:], follow))
+        elif isinstance(struct, Repeat):
+            # An item is followed by the next one (after the join), or by what follows the Repeat
+            next_item = [struct.struct] if struct.join is None else [struct.join, struct.struct]
+            item_follow = follow if struct.maxi == 1 else _union(self._first_of_sequence(next_item, follow), follow)
+            follows[id(struct.struct)] = struct.struct, item_follow
+            if struct.join is not None:
+                follows[id(struct.join)] = struct.join, self._first_of_sequence([struct.struct], follow)
+        elif isinstance(struct, (Any, UpdateNameSpace, SaveAs, Expected)):
+            for value in (struct.values if isinstance(struct, Any) else [struct.struct]):
+                follows[id(value)] = value, follow
+        elif isinstance(struct, Lexed):
+            follows[id(struct.fallback)] = struct.fallback, follow
+        elif isinstance(struct, Operators):  # An operand is followed by an operator, or ends the struct
+            follows[id(struct.operand)] = struct.operand, _union(frozenset(struct.starts), follow)
+        elif isinstance(struct, Var) and struct.vname not in self.first_sets.dynamic:
+            value = self.first_sets.grammar.get(struct.vname)
+            if isinstance(value, BasicStruct):
+                follows[id(value)] = value, follow
+        # The body of a Not is a lookahead, the other children are not followed by the code after struct
+        for child in struct.children():
+            follows.setdefault(id(child), (child, None))
+        return follows.values()
+
+
+class Hazard(namedtuple("Hazard", ["kind", "struct", "message"])):  # Not typing.NamedTuple, slow to import
+    """
+    A construction of the grammar that probably doesn't parse what is meant:
+    its kind ("nullable-loop" or "shadowed"), its struct, and a message describing it
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.kind}: {self.message}"
+
+
+def _literals(struct, grammar):
+    """The strings struct matches if it only matches a few fixed strings, else None"""
+    if isinstance(struct, Var) and isinstance(grammar.get(struct.vname), BasicStruct):
+        return _literals(grammar[struct.vname], grammar)
+    if isinstance(struct, Str) and isinstance(struct.value, str):
+        return [struct.value]
+    elif isinstance(struct, Any):
+        literals = [_literals(value, grammar) for value in struct.values]
+        if all(literal is not None for literal in literals):
+            return [string for literal in literals for string in literal]
+    return None
+
+
+def _probe(struct, grammar, code) -> int:
+    """The length struct matches at the start of code with the default values of the grammar, -1 if none"""
+    try:
+        value, index = struct.parse(Scope(grammar), 0, code)
+    except Exception:
+        return -1
+    return -1 if value is None else index
+
+
+def find_hazards(first_sets: FirstSets, grammar: dict) -> list[Hazard]:
+    """
+    The hazards of the structs:
+    - nullable-loop: a Repeat without maximum over an item that can match nothing, it stops
+      at the first empty match
+    - shadowed: an alternative of an Any that can't match some code because an earlier literal matches the start
+      of it: Any("/", "//") never matches "//", Any("if", IDENTIFIER) cuts "iffy" after "if".
+      The literals are tried against the next alternatives followed by each of PROBES,
+      with the default values of the grammar.
+    """
+    hazards = []
+    for struct in first_sets.structs:
+        if isinstance(struct, Repeat) and not isinstance(struct.maxi, int):
+            first, nullable = first_sets[struct.struct]
+            if first is not None and nullable:
+                hazards.append(Hazard("nullable-loop", struct, f"{struct!r} repeats {struct.struct!r}, "
+                                                              f"which can match nothing"))
+        elif isinstance(struct, Any):
+            literals = [(k, string) for k, value in enumerate(struct.values)
+                        for string in _literals(value, grammar) or () if string]
+            for k, value in enumerate(struct.values):
+                later_literals = _literals(value, grammar)
+                for earlier, string in literals:
+                    if earlier >= k:
+                        continue
+                    if later_literals is not None:
+                        shadowed = [other for other in later_literals if other.startswith(string)]
+                        if not shadowed:
+                            continue
+                        example = shadowed[0]
+                    else:
+                        example = next((string + probe for probe in PROBES
+                                        if _probe(value, grammar, string + probe) > len(string)), None)
+                        if example is None:
+                            continue
+                    hazards.append(Hazard("shadowed", struct, f"in {struct!r}, {string!r} of {struct.values[earlier]!r}"
+                                                              f" is matched before {value!r} can match {example!r}"))
+                    break
+    return hazards
+
+
+class Analysis:
+    """The results of the analysis of a grammar, the FOLLOW sets and the hazards being computed when asked"""
+    def __init__(self, first_sets: FirstSets, start=None, hazards=True):
+        """
+        :param start: the struct the parses start with, for the FOLLOW sets
+        :param hazards: if the hazards are searched
+        """
+        self.first_sets = first_sets
+        self.start = start
+        self.search_hazards = hazards
+        self.dispatch = {}  # id(Any) -> its dispatch table and fallback, see build_dispatch
+
+    @cached_property
+    def follow_sets(self) -> FollowSets:
+        return FollowSets(self.first_sets, self.start)
+
+    @cached_property
+    def hazards(self) -> list[Hazard]:
+        return find_hazards(self.first_sets, self.first_sets.grammar) if self.search_hazards else []
+
+    def report(self) -> str:
+        """The hazards, and the FIRST and FOLLOW sets of the named structs"""
+        def chars(chars):
+            return "?" if chars is None else "{" + ", ".join(map(repr, sorted(chars))) + "}"
+        lines = [f"{len(self.hazards)} hazard(s)"]
+        lines += [f"  {hazard}" for hazard in self.hazards]
+        for struct in self.first_sets.structs:
+            if struct.name is None:
+                continue
+            first, nullable = self.first_sets[struct]
+            lines.append(f"{struct.name}: first={chars(first)}{' nullable' if nullable else ''}"
+                         f" follow={chars(self.follow_sets[struct])}")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"Analysis(structs={len(self.first_sets.structs)}, hazards={len(self.hazards)})"
+
+
+def build_dispatch(struct: Any, first_sets: FirstSets):
+    """
+    The table from the next character to the alternatives of struct that can match from it, and the fallback,
+    the alternatives for the other characters. The table is None if all the alternatives must be tried.
+    The alternatives that have an unknown FIRST set or that are nullable are in every entry, in their order.
+    """
+    always = []
+    by_char = {}
+    for value in struct.values:
+        first, nullable = first_sets[value]
+        if first is None or nullable:
+            always.append(value)
+            for alternatives in by_char.values():
+                alternatives.append(value)
+        else:
+            for char in first:
+                by_char.setdefault(char, always.copy()).append(value)
+    if len(always) == len(struct.values):
+        return None, tuple(struct.values)
+    return {char: tuple(alternatives) for char, alternatives in by_char.items()}, tuple(always)
+
+
+_alone = WeakKeyDictionary()  # Any -> its dispatch table and fallback, for the Any parsed without a Parser
+
+
+def dispatch_of(struct: Any, tables=None):
+    """
+    The dispatch table and the fallback of struct, from tables (the dispatch of the Analysis of a parser)
+    or, when it isn't in them, built for struct alone
+    """
+    try:
+        return tables[id(struct)]
+    except (TypeError, KeyError):
+        pass
+    try:
+        return _alone[struct]
+    except KeyError:
+        result = _alone[struct] = prepare({}, [struct]).dispatch[id(struct)]
+        return result
+
+
+def prepare(grammar: dict, roots=(), start=None, hazards=True) -> Analysis:
+    """
+    Analyse the grammar, store the FIRST sets on the structs, build the dispatch tables of all the Any it uses
+    and fuse its regular structs
+    :param start: the struct the parses start with, for the FOLLOW sets
+    :param hazards: if the hazards are searched
+    """
+    roots = [*roots, *(value for value in grammar.values() if isinstance(value, BasicStruct))]
+    first_sets = FirstSets(roots, grammar)
+    static = FirstSets(roots)  # Without the grammar, see the docstring of the module
+    result = Analysis(first_sets, start, hazards)
+    for struct in first_sets.structs:
+        struct.first, struct.nullable = static[struct]
+        struct.analysis = result
+        if isinstance(struct, Any):
+            result.dispatch[id(struct)] = build_dispatch(struct, static)
+    fusion.fuse(first_sets.structs)
+    return result
@@ -0,0 +1,71 @@
+"""
+Parsing of ASCII bytes, like the memory map of a file, without decoding them.
+"""
+import mmap
+import os
+from operator import index
+
+CHUNK = 1 << 20
+
+
+def _is_plain_ascii(data) -> bool:
+    """If data is ASCII without carriage returns, checked by chunks to not copy it at once"""
+    return all(data[i:i + CHUNK].isascii() and b"\r" not in data[i:i + CHUNK] for i in range(0, len(data), CHUNK))
+
+
+class ByteSource:
+    """
+    The text of ASCII bytes (a bytes, or the mmap of a file), usable as the code of a parse without decoding it.
+    A byte is a character, so the offsets are the same: only the fragments asked (tokens, slices) are decoded,
+    and the fused regular structs match the bytes directly.
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def open(cls, path, encoding="utf-8") -> "ByteSource | str":
+        """
+        A ByteSource of the memory map of the file at path.
+        If the file is not plain ASCII, it is read as a str, with its newlines translated like open does.
+        The map stays open while the source is used (by the Spans of a result for example), until it is closed.
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if _is_plain_ascii(data):
+                    return cls(data)
+                data.close()
+        with open(path, encoding=encoding) as f:
+            return f.read()
+
+    def close(self):
+        """Close the memory map, the source can't be read anymore"""
+        close = getattr(self.data, "close", None)  # A bytes has nothing to close
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.data[i].decode("ascii")
+        return chr(self.data[i])
+
+    def startswith(self, string, start=0):
+        start = index(start)
+        return self.data[start:start + len(string)] == string.encode()
+
+    def find(self, sub, start=0, end=None) -> int:
+        return self.data.find(sub.encode(), start, len(self.data) if end is None else end)
+
+    def __repr__(self):
+        return f"ByteSource({len(self)} bytes)"
@@ -1,50 +1,151 @@
+from bisect import bisect_right
+from operator import index
+
 
 class CharStream:
     """
     A stream of characters.
     Used for interactive mode.
     Compatible with the parser.
+    The inputs are kept as a list of chunks (the small ones merged up to chunk_size), so reading one is O(1)
+    whatever was read before. Indexing, slicing, startswith and find work on the chunks with the str methods,
+    and ask for more input only when they look past what was read (slices and find never do).
     """
+    chunk_size = 4096
+
     def __init__(self, ask_input):
         self.ask_input = ask_input
-        self.buffer = ""
+        self.chunks = []
+        self.starts = []  # The offset of each chunk
+        self.length = 0
         self.stop = False
+        self._last = 0  # The chunk of the last access, most accesses are near it
 
-    def _get(self, i):
-        while i >= len(self.buffer):
+    def _read(self, end) -> bool:
+        """Read inputs until there are end characters, return False if the input stopped before"""
+        while self.length < end:
             if self.stop:
-                return ""
-            input_value = self.ask_input()
-            if input_value is None:
-                self.stop = True
-                return ""
-            self.buffer += input_value
-        return self.buffer[i]
+                return False
+            self._append(self.ask_input())
+        return True
+
+    def _append(self, input_value):
+        """Add an input to the characters read, None stops the stream"""
+        if input_value is None:
+            self.stop = True
+            return
+        if self.chunks and len(self.chunks[-1]) + len(input_value) <= self.chunk_size:
+            self.chunks[-1] += input_value
+        elif input_value:
+            self.chunks.append(input_value)
+            self.starts.append(self.length)
+        self.length += len(input_value)
+
+    def _locate(self, i) -> int:
+        """The number of the chunk containing the offset i, which must have been read"""
+        k = self._last
+        if not (self.starts[k] <= i < self.starts[k] + len(self.chunks[k])):
+            k = self._last = bisect_right(self.starts, i) - 1
+        return k
+
+    def _slice(self, start, stop) -> str:
+        if start >= stop:
+            return ""
+        k = self._locate(start)
+        chunk, offset = self.chunks[k], start - self.starts[k]
+        if stop - self.starts[k] <= len(chunk):
+            return chunk[offset:stop - self.starts[k]]
+        parts = [chunk[offset:]]
+        while self.starts[k] + len(self.chunks[k]) < stop:
+            k += 1
+            parts.append(self.chunks[k][:stop - self.starts[k]])
+        return "".join(parts)
+
+    @property
+    def buffer(self) -> str:
+        """The characters read"""
+        if len(self.chunks) > 1:
+            self.chunks, self.starts, self._last = ["".join(self.chunks)], [0], 0
+        return self.chunks[0] if self.chunks else ""
 
     def __getitem__(self, i):
         if isinstance(i, slice):
-            return "".join(self._get(j) for j in range(*i.indices(len(self.buffer))))
-        return self._get(i)
+            start, stop, step = i.indices(self.length)
+            if step != 1:
+                return self.buffer[i]
+            return self._slice(start, stop)
+        i = index(i)
+        if i < 0:
+            return self.buffer[i]
+        if not self._read(i + 1):
+            return ""
+        k = self._locate(i)
+        return self.chunks[k][i - self.starts[k]]
 
     def __len__(self):
-        return len(self.buffer)
+        return self.length
 
     def __repr__(self):
         return f"CharStream({self.buffer!r})"
 
-    def rfind(self, char, start, end):  # Used by token.Indexer
-        self._get(end)
-        return self.buffer.rfind(char, start, end)
-
     def startswith(self, string, start):
-        for i, char in enumerate(string):
-            if self._get(start + i) != char:
-                return False
-        return True
+        start = index(start)
+        end = start + len(string)
+        read = max(min(end, self.length) - start, 0)
+        if self._slice(start, start + read) != string[:read]:
+            return False
+        if read < len(string) and not self._read(end):
+            return False
+        return self._slice(start + read, end) == string[read:]
+
+    def find(self, sub, start=0, end=None) -> int:
+        """Like str.find, in the characters read"""
+        if start > self.length:
+            return -1
+        start, end, _ = slice(start, end).indices(self.length)
+        if not sub or start >= end:
+            return start if not sub and start <= end else -1
+        k = self._locate(start)
+        while k < len(self.chunks) and self.starts[k] < end:
+            chunk_start = self.starts[k]
+            if len(sub) > 1 and start < chunk_start:  # The matches spanning the previous chunk
+                low = max(start, chunk_start - len(sub) + 1)
+                pos = self._slice(low, min(end, chunk_start + len(sub) - 1)).find(sub)
+                if pos != -1:
+                    return low + pos
+            pos = self.chunks[k].find(sub, max(start - chunk_start, 0), end - chunk_start)
+            if pos != -1:
+                return chunk_start + pos
+            k += 1
+        return -1
 
     def split(self, *args, **kwargs):
         return self.buffer.split(*args, **kwargs)
 
+class NeedInput(Exception):
+    """Raised by an AsyncCharStream when the parser looks past the characters read"""
+
+
+class AsyncCharStream(CharStream):
+    """
+    A CharStream fed by an async function, returning the next input or None at the end.
+    The parser can't wait in the middle of a parse: it raises NeedInput when it needs more characters,
+    and the parse is started again once fill has awaited the next input (see Parser.parse_async).
+    Each input is parsed again by the next attempts, so it is meant for inputs of a few lines.
+    """
+    def __init__(self, ask_input):
+        super().__init__(self._need_input)
+        self.ask_input_async = ask_input
+
+    @staticmethod
+    def _need_input():
+        raise NeedInput
+
+    async def fill(self):
+        """Await the next input"""
+        self._append(await self.ask_input_async())
+
+
 if __name__ == '__main__':
     from parser_v2.parser import Parser
     from parser_v2.struct import Repeat, Not, Str, Any, END
@@ -0,0 +1,589 @@
+"""
+Compilation of the grammars to Python code.
+
+Each struct of a Parser becomes a function doing the same work as its parse method, with its constants
+(strings, bounds, dispatch tables ...) inlined, and direct calls to the functions of the structs it uses.
+The results, the indexes and the errors are exactly the ones of the interpreted structs.
+Factories, messages and variables are still taken from the structs, so the generated code only depends
+on the shape of the grammar: it is cached on disk, keyed by the hash of this shape (see describe),
+so a grammar found in the cache is neither generated nor compiled again.
+
+The structs this module doesn't know are called through their parse method.
+DBG_MODE is ignored by the compiled code.
+"""
+import importlib.util
+import os
+import sys
+import tempfile
+from hashlib import sha256
+from pathlib import Path
+from weakref import WeakKeyDictionary
+
+from parser_v2 import analysis
+from parser_v2.struct import BasicStruct, Str, Any, Sequence, Repeat, Expected, Not, UpdateNameSpace, SaveAs, End, \
+    Cut, CutFailure, Operators, _token
+from parser_v2.token import Span
+from parser_v2.byte_source import ByteSource
+from parser_v2.var import Partial, Var
+
+VERSION = 5  # Change it when the generated code changes, to invalidate the cache
+END = "# End of the generated code\n"  # The last line of the generated modules, missing from a truncated file
+
+
+class _Writer:
+    def __init__(self):
+        self.lines = []
+        self.level = 0
+
+    def __call__(self, line):
+        self.lines.append("    " * self.level + line)
+
+    def indent(self):
+        writer = self
+
+        class _Indent:
+            def __enter__(self):
+                writer.level += 1
+
+            def __exit__(self, *_):
+                writer.level -= 1
+        return _Indent()
+
+
+def _is_plain_str(struct):
+    return type(struct) is Str and struct.factory is None and isinstance(struct.value, str)
+
+
+def _loops(struct):
+    """If struct contains a Repeat, the regular structs without one are as fast inlined"""
+    return isinstance(struct, Repeat) or any(_loops(child) for child in struct.children())
+
+
+class Generator:
+    """Generate the source of the functions for the structs of a grammar"""
+    def __init__(self, structs: list[BasicStruct], dispatch=None):
+        """:param dispatch: the dispatch tables of the Any, from the Analysis of the parser"""
+        self.structs = structs
+        self.dispatch = dispatch
+        self.ids = {id(struct): k for k, struct in enumerate(structs)}
+        self.write = _Writer()
+        self.tables = []  # lines building the dispatch tables, once all the functions exist
+
+    def ref(self, struct):
+        return f"p{self.ids[id(struct)]}"
+
+    def generate(self) -> str:
+        w = self.write
+        w('"""Generated by parser_v2.codegen, do not edit"""')
+        w("")
+        w("def build(S, BasicStruct, Span, CutFailure, ByteSource, token):")
+        with w.indent():
+            w(f"({''.join(f'S{k}, ' for k in range(len(self.structs)))}) = S")
+            for k, struct in enumerate(self.structs):
+                self.function(k, struct)
+            w("FUNCS = {%s}" % ", ".join(f"S{k}: p{k}" for k in range(len(self.structs))))
+            for line in self.tables:
+                w(line)
+            w("return FUNCS")
+        return "\n".join(w.lines) + "\n" + END
+
+    # Functions
+
+    def function(self, k, struct):
+        w = self.write
+        known = type(struct) in self.generators or isinstance(struct, Partial)
+        if not known:
+            w(f"def p{k}(ns, i, code):")
+            with w.indent():
+                w(f"return S{k}.parse(ns, i, code)")
+            return
+        name = f"p{k}"
+        if struct.name is not None:
+            w(f"def p{k}(ns, i, code):")
+            with w.indent():
+                w('memo = getattr(ns, "memo", None)')
+                w("if memo is not None:")
+                with w.indent():
+                    w(f"return memo.parse(S{k}, ns, i, code, r{k})")
+                w(f"return r{k}(ns, i, code)")
+            name = f"r{k}"
+        w(f"def {name}(ns, i, code):")
+        with w.indent():
+            if struct.regex is not None and _loops(struct):
+                w("if isinstance(code, (str, ByteSource)):")
+                with w.indent():
+                    w(f"return S{k}.regex.run(ns, i, code)")
+            if isinstance(struct, Partial):
+                self.partial(k, struct)
+            else:
+                self.generators[type(struct)](self, k, struct)
+            self.factory(k, struct)
+            w("return v, j")
+
+    def factory(self, k, struct):
+        """Apply the factory on v, the result of the _parse method"""
+        if struct.factory is None:
+            return
+        w = self.write
+        w("if v is not None:")
+        with w.indent():
+            if isinstance(struct, Sequence):
+                if struct.factory is tuple and struct.indexes == [slice(None, None, None)]:
+                    w("v = tuple(v)")
+                else:
+                    w(f"v = S{k}.factory({', '.join(f'v[{index!r}]' for index in struct.indexes)})")
+            elif isinstance(struct, Repeat):
+                if struct.pass_joiners:
+                    w(f"v = S{k}.factory(v[0], v[1])")
+                elif struct.factory is list:
+                    w("v = list(v[0])")
+                else:
+                    w(f"v = S{k}.factory(v[0])")
+            else:
+                w(f"v = S{k}.factory(v)")
+
+    def call(self, struct, result="v", index="j", start="i", namespace="ns"):
+        """Parse struct from start, setting result and index"""
+        w = self.write
+        if _is_plain_str(struct):
+            w(f"if code.startswith({struct.value!r}, {start}):")
+            with w.indent():
+                w(f"{result} = token(ns, code, {start}, {len(struct.value)})")
+                w(f"{index} = {start} + {len(struct.value)}")
+            w("else:")
+            with w.indent():
+                w(f"{result} = None")
+                if index != start:
+                    w(f"{index} = {start}")
+        else:
+            w(f"{result}, {index} = {self.ref(struct)}({namespace}, {start}, code)")
+
+    def guarded_call(self, struct, result="v", index="j", start="i"):
+        """Parse struct like call, a CutFailure being a failure"""
+        if _is_plain_str(struct):
+            return self.call(struct, result, index, start)
+        w = self.write
+        w("try:")
+        with w.indent():
+            self.call(struct, result, index, start)
+        w("except CutFailure:")
+        with w.indent():
+            w(f"{result} = None")
+
+    def value(self, k, value, attr):
+        """The expression of parser_v2.struct._get for the attribute attr of S{k}"""
+        if isinstance(value, Partial):
+            return f"S{k}.{attr}.get(ns)"
+        return repr(value) if isinstance(value, (int, str, type(None))) else f"S{k}.{attr}"
+
+    # Structs
+
+    def str_(self, k, struct):
+        w = self.write
+        if isinstance(struct.value, str):
+            string = repr(struct.value)
+        else:
+            w(f"string = {self.value(k, struct.value, 'value')}")
+            w("if isinstance(string, Span):")
+            with w.indent():
+                w("string = string.text")
+            w("if not isinstance(string, str):")
+            with w.indent():
+                w('raise TypeError(f"Expected str, got {type(string)}")')
+            string = "string"
+        w(f"if code.startswith({string}, i):")
+        with w.indent():
+            w(f"v = token(ns, code, i, len({string}))")
+            w(f"j = i + len({string})")
+        w("else:")
+        with w.indent():
+            w("return None, i")
+
+    def any_(self, k, struct):
+        w = self.write
+        dispatch, fallback = analysis.dispatch_of(struct, self.dispatch)
+        if all(_is_plain_str(value) for value in struct.values):
+            strings = [value.value for value in struct.values]
+            if all(len(string) == 1 for string in strings):
+                w("try:")
+                with w.indent():
+                    w("char = code[i]")
+                w("except IndexError:")
+                with w.indent():
+                    w("return None, i")
+                w(f"if char in {{{', '.join(map(repr, sorted(strings)))}}}:")
+                with w.indent():
+                    w("v = token(ns, code, i, 1)")
+                    w("j = i + 1")
+                w("else:")
+                with w.indent():
+                    w("return None, i")
+                return
+            if dispatch is not None:
+                table = {char: tuple(value.value for value in dispatch[char]) for char in sorted(dispatch)}
+                w("try:")
+                with w.indent():
+                    w(f"strings = {table!r}.get(code[i], {tuple(value.value for value in fallback)!r})")
+                w("except IndexError:")
+                with w.indent():
+                    w(f"strings = {tuple(value.value for value in fallback)!r}")
+            else:
+                w(f"strings = {tuple(strings)!r}")
+            w("for string in strings:")
+            with w.indent():
+                w("if code.startswith(string, i):")
+                with w.indent():
+                    w("v = token(ns, code, i, len(string))")
+                    w("j = i + len(string)")
+                    w("break")
+            w("else:")
+            with w.indent():
+                w("return None, i")
+            return
+        if dispatch is not None:
+            table = ", ".join(f"{char!r}: ({''.join(self.ref(value) + ', ' for value in dispatch[char])})"
+                              for char in sorted(dispatch))
+            self.tables.append(f"D{k} = {{{table}}}")
+            self.tables.append(f"F{k} = ({''.join(self.ref(value) + ', ' for value in fallback)})")
+            w("try:")
+            with w.indent():
+                w(f"alternatives = D{k}.get(code[i], F{k})")
+            w("except IndexError:")
+            with w.indent():
+                w(f"alternatives = F{k}")
+        else:
+            self.tables.append(f"A{k} = ({''.join(self.ref(value) + ', ' for value in struct.values)})")
+            w(f"alternatives = A{k}")
+        w("try:")
+        with w.indent():
+            w("for alternative in alternatives:")
+            with w.indent():
+                w("v, j = alternative(ns, i, code)")
+                w("if v is not None:")
+                with w.indent():
+                    w("break")
+            w("else:")
+            with w.indent():
+                w("return None, i")
+        w("except CutFailure:")
+        with w.indent():
+            w("return None, i")
+
+    def sequence(self, k, struct):
+        w = self.write
+        w("before = i")
+        names = []
+        for n, value in enumerate(struct.values):
+            if n == struct.cut:
+                self.cut()
+            self.call(value, f"v{n}", "i")
+            w(f"if v{n} is None:")
+            with w.indent():
+                w("return None, before" if struct.cut is None or n < struct.cut else f"raise CutFailure(S{k}, before)")
+            names.append(f"v{n}")
+        if struct.cut == len(struct.values):
+            self.cut()
+        w(f"v = [{', '.join(names)}]")
+        w("j = i")
+
+    def cut(self):
+        w = self.write
+        w('memo = getattr(ns, "memo", None)')
+        w("if memo is not None:")
+        with w.indent():
+            w("memo.cut(before)")
+
+    def cut_(self, k, struct):
+        w = self.write
+        w('v = ""')
+        w("j = i")
+
+    def repeat(self, k, struct):
+        w = self.write
+        mini = self.value(k, struct.mini, "mini")
+        maxi = self.value(k, struct.maxi, "maxi")
+        if isinstance(struct.mini, Partial):
+            w(f"mini = {mini}")
+            mini = "mini"
+        if isinstance(struct.maxi, Partial):
+            w(f"maxi = {maxi}")
+            maxi = "maxi"
+        if isinstance(struct.maxi, Partial) or struct.maxi == 0:
+            w("if maxi == 0:" if maxi == "maxi" else "if True:")
+            with w.indent():
+                w("v, j = ([], []), i")
+                self.factory(k, struct)
+                w("return v, j")
+        w("values = []")
+        w("joins = []")
+        if struct.join is not None:
+            w("first = True")
+        w("original = i")
+        w("while True:")
+        with w.indent():
+            w("last = i")
+            if struct.join is not None:
+                w("if not first:")
+                with w.indent():
+                    self.guarded_call(struct.join, "join", "i")
+                    w("if join is None:")
+                    with w.indent():
+                        w("break")
+                    w("joins.append(join)")
+            self.guarded_call(struct.struct, "v", "i")
+            w("if v is None:")
+            with w.indent():
+                w("i = last")
+                w("break")
+            w("values.append(v)")
+            if maxi != "None":
+                w(f"if {maxi} is not None and len(values) >= {maxi}:" if maxi == "maxi"
+                  else f"if len(values) >= {maxi}:")
+                with w.indent():
+                    w("break")
+            if struct.join is not None:
+                w("first = False")
+            if struct.maxi is None:
+                w("if i == last:")
+                with w.indent():
+                    w("break")
+        if mini != "0":
+            w(f"if len(values) < {mini}:")
+            with w.indent():
+                w("return None, original")
+        w("v = (values, joins)")
+        w("j = i")
+
+    def expected(self, k, struct):
+        w = self.write
+        w("j = i")
+        self.guarded_call(struct.struct, "v", "j")
+        w("if v is None:")
+        with w.indent():
+            w(f"raise S{k}.error(ns, j, code)")
+
+    def not_(self, k, struct):
+        w = self.write
+        self.guarded_call(struct.struct, "v", "_")
+        w(f"if v is None and i + {struct.increment} <= len(code):")
+        with w.indent():
+            if struct.increment == 0:
+                w('v = ""')
+                w("j = i")
+            else:
+                w(f"v = token(ns, code, i, {struct.increment})")
+                w(f"j = i + {struct.increment}")
+        w("else:")
+        with w.indent():
+            w("return None, i")
+
+    def update_namespace(self, k, struct):
+        w = self.write
+        values = ", ".join(f"{key!r}: {self.value(k, value, f'ns[{key!r}]')}" for key, value in struct.ns.items())
+        w(f"v, j = {self.ref(struct.struct)}(ns | {{{values}}}, i, code)")
+
+    def save_as(self, k, struct):
+        w = self.write
+        self.call(struct.struct, "v", "j")
+        w("if v is not None:")
+        with w.indent():
+            w(f"ns[{struct.vname!r}] = v")
+
+    def end(self, k, struct):
+        w = self.write
+        w("if i == len(code):")
+        with w.indent():
+            w("v = True")
+            w("j = i")
+        w("else:")
+        with w.indent():
+            w("return None, i")
+
+    def partial(self, k, struct):
+        w = self.write
+        if type(struct) is Var:
+            w("try:")
+            with w.indent():
+                w(f"value = ns[{struct.vname!r}]")
+            w("except KeyError:")
+            with w.indent():
+                w(f'raise NameError(f"{{S{k}}} : Variable {{S{k}.vname}} not found")')
+        else:
+            w(f"value = S{k}.get(ns)")
+        w("if isinstance(value, Span):")
+        with w.indent():
+            w("value = value.text")
+        w("if isinstance(value, BasicStruct):")
+        with w.indent():
+            w("function = FUNCS.get(value)")
+            w("v, j = function(ns, i, code) if function is not None else value.parse(ns, i, code)")
+        w("elif isinstance(value, str):")
+        with w.indent():
+            w("if code.startswith(value, i):")
+            with w.indent():
+                w("v = token(ns, code, i, len(value))")
+                w("j = i + len(value)")
+            w("else:")
+            with w.indent():
+                w("return None, i")
+        w("else:")
+        with w.indent():
+            w(f'raise TypeError(f"Value of {{S{k}}} cannot be used to parse")')
+
+    def operators(self, k, struct):
+        w = self.write
+        w(f"v, j = S{k}.run_steps(ns, i, code, {self.ref(struct.operand)})")
+        w("if v is None:")
+        with w.indent():
+            w("return None, i")
+
+    generators = {
+        Str: str_,
+        Any: any_,
+        Sequence: sequence,
+        Repeat: repeat,
+        Expected: expected,
+        Not: not_,
+        UpdateNameSpace: update_namespace,
+        SaveAs: save_as,
+        End: end,
+        Cut: cut_,
+        Operators: operators,
+    }
+
+
+_compiled = WeakKeyDictionary()  # parser -> CompiledGrammar
+
+
+class CompiledGrammar:
+    """The generated functions of the structs of a grammar"""
+    def __init__(self, structs, functions, source, digest):
+        self.structs = structs
+        self.functions = functions
+        self.source = source
+        self.digest = digest
+
+    def __getitem__(self, struct):
+        return self.functions[struct]
+
+    def get(self, struct, default=None):
+        return self.functions.get(struct, default)
+
+
+def describe(structs: list[BasicStruct]) -> str:
+    """
+    The shape of the grammar made of structs, what its generated code depends on: the types and the attributes
+    of the structs, the structs they use being given by their position and the functions by their type only
+    (the generated code calls them through the structs)
+    """
+    positions = {id(struct): k for k, struct in enumerate(structs)}
+    seen = set()
+
+    def shape(value):
+        if id(value) in positions:
+            return f"S{positions[id(value)]}"
+        if value is None or isinstance(value, (str, bytes, int, float, slice)):
+            return repr(value)
+        if isinstance(value, type):
+            return f"{value.__module__}.{value.__qualname__}"
+        if isinstance(value, (list, tuple)):
+            return f"[{', '.join(map(shape, value))}]"
+        if isinstance(value, (set, frozenset)):
+            return f"{{{', '.join(sorted(map(shape, value)))}}}"
+        if isinstance(value, dict):
+            return f"{{{', '.join(sorted(f'{shape(key)}: {shape(item)}' for key, item in value.items()))}}}"
+        if callable(value) and not isinstance(value, BasicStruct):
+            return type(value).__qualname__
+        if not hasattr(value, "__dict__"):
+            return repr(value)
+        if id(value) in seen:
+            return "..."
+        seen.add(id(value))
+        return f"{shape(type(value))}({shape(vars(value))})"
+
+    lines = []
+    for struct in structs:
+        # The Analysis of the parser is kept on its structs, the code only uses the dispatch tables built from them
+        attributes = {key: value for key, value in vars(struct).items() if key != "analysis"}
+        lines.append(f"{shape(type(struct))}({shape(attributes)})")
+    return "\n".join(lines)
+
+
+def default_cache_dir(parser) -> Path:
+    module = sys.modules.get(parser.__module__)
+    if getattr(module, "__file__", None):
+        return Path(module.__file__).parent / "__pycache__" / "parser_v2"
+    return Path(tempfile.gettempdir()) / "parser_v2"
+
+
+def _load(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _save(path, source):
+    """Write source to path through a temporary file of its directory, so it is never seen half written"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(prefix=f"{path.stem}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(source)
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.unlink(temp)
+        except OSError:
+            pass
+        raise
+
+
+def compile_grammar(parser, cache_dir=None) -> CompiledGrammar:
+    """
+    Generate (or load from the cache) the functions of the structs of parser.
+    :param parser: a Parser subclass
+    :param cache_dir: where the generated modules are saved, None for default_cache_dir(parser), False to not save them
+    """
+    grammar = vars(parser)
+    starter = parser.__start__
+    if isinstance(starter, str):
+        starter = getattr(parser, starter, None)
+    roots = [value for value in grammar.values() if isinstance(value, BasicStruct)]
+    if isinstance(starter, BasicStruct):
+        roots.append(starter)
+    structs = list(analysis.walk(roots, grammar))
+    digest = sha256(f"{VERSION}\n{describe(structs)}".encode()).hexdigest()[:32]
+    name = f"{parser.__name__}_{digest}"
+    module = None
+    if cache_dir is not False:
+        path = Path(cache_dir or default_cache_dir(parser)) / f"{name}.py"
+        try:
+            # A file left truncated or corrupted (by a crash, a full disk ...) is a cache miss
+            source = path.read_text()
+            if source.endswith(END):
+                module = _load(path, name)
+        except (OSError, SyntaxError, ImportError):
+            module = None
+    if module is None:
+        source = Generator(structs, parser.__analysis__.dispatch).generate()
+        if cache_dir is not False:
+            try:
+                _save(path, source)
+            except OSError:
+                pass
+        namespace = {"__name__": name}
+        exec(compile(source, f"<{name}>", "exec"), namespace)
+        build = namespace["build"]
+    else:
+        build = module.build
+    return CompiledGrammar(structs, build(structs, BasicStruct, Span, CutFailure, ByteSource, _token), source, digest)
+
+
+def get_compiled(parser) -> CompiledGrammar:
+    """The compiled grammar of parser, generated on the first call"""
+    try:
+        return _compiled[parser]
+    except KeyError:
+        compiled = _compiled[parser] = compile_grammar(parser)
+        return compiled
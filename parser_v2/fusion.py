@@ -0,0 +1,309 @@
+"""
+Fusion of the lexical structs into regular expressions.
+
+A struct is regular when it is only made of Str, Any, Sequence, Repeat, Not and End, without variables,
+CUT and with the default factories (its own factory can be anything). Such a struct is matched by one call to
+re.match instead of one parse call by character, then its value is rebuilt from the match: the factories
+receive the same values as with the interpreted structs.
+
+The expressions keep the semantic of the structs: an Any takes its first matching alternative
+and a Repeat takes as many items as it can, without backtracking. Python 3.10 re has no atomic groups,
+they are emulated by a lookahead capturing the match, followed by a backreference to it.
+Only str sources and ByteSources (as bytes, with the same offsets) are matched this way,
+a CharStream is still parsed by the structs.
+"""
+import re
+from functools import cached_property
+
+from parser_v2.struct import Str, Any, Sequence, Repeat, Not, End
+from parser_v2.token import Token
+from parser_v2.byte_source import ByteSource
+
+_DEFAULT_FACTORIES = {Str: None, Any: None, Sequence: tuple, Repeat: list, Not: None, End: None}
+
+
+def _has_default_factory(struct):
+    if struct.factory is not _DEFAULT_FACTORIES[type(struct)]:
+        return False
+    if isinstance(struct, Sequence):
+        return struct.indexes == Sequence.indexes
+    if isinstance(struct, Repeat):
+        return not struct.pass_joiners
+    return True
+
+
+def _nullable(struct):
+    """If struct can match without consuming anything, for a regular struct"""
+    if isinstance(struct, Str):
+        return struct.value == ""
+    elif isinstance(struct, Any):
+        return any(map(_nullable, struct.values))
+    elif isinstance(struct, Sequence):
+        return all(map(_nullable, struct.values))
+    elif isinstance(struct, Repeat):
+        return struct.mini == 0 or struct.maxi == 0 or _nullable(struct.struct)
+    elif isinstance(struct, Not):
+        return struct.increment == 0
+    return True  # End
+
+
+def is_regular(struct, root=True) -> bool:
+    """If struct can be matched by a regular expression"""
+    if type(struct) not in _DEFAULT_FACTORIES or not (root or _has_default_factory(struct)):
+        return False
+    if isinstance(struct, Str):
+        return isinstance(struct.value, str)
+    elif isinstance(struct, Repeat):
+        # An item matching nothing stops the loop of Repeat, but not the one of re
+        if not (isinstance(struct.mini, int) and isinstance(struct.maxi, (int, type(None)))) \
+                or _nullable(struct.struct):
+            return False
+    elif isinstance(struct, Not):
+        if not isinstance(struct.increment, int):
+            return False
+    elif isinstance(struct, Sequence):
+        if struct.cut is not None:  # A failure after it changes the alternatives tried
+            return False
+    return all(is_regular(child, root=False) for child in struct.children())
+
+
+def _single_chars(struct):
+    """The characters of an Any of one-character Strs, else None"""
+    if isinstance(struct, Any) and all(type(value) is Str and len(value.value) == 1 and _has_default_factory(value)
+                                       for value in struct.values):
+        return [value.value for value in struct.values]
+    return None
+
+
+class _Compiler:
+    def __init__(self):
+        self.groups = 0
+
+    def atomic(self, pattern):
+        self.groups += 1
+        return f"(?=(?P<g{self.groups}>{pattern}))(?P=g{self.groups})"
+
+    def __call__(self, struct) -> str:
+        if isinstance(struct, Str):
+            return re.escape(struct.value)
+        elif isinstance(struct, Any):
+            chars = _single_chars(struct)
+            if chars is not None:
+                return f"[{''.join(map(re.escape, sorted(set(chars))))}]"
+            if len(struct.values) == 1:
+                return self(struct.values[0])
+            return self.atomic("|".join(f"(?:{self(value)})" for value in struct.values))
+        elif isinstance(struct, Sequence):
+            return "".join(f"(?:{self(value)})" for value in struct.values)
+        elif isinstance(struct, Repeat):
+            if struct.maxi == 0:
+                return ""
+            if struct.join is None:
+                maxi = "" if struct.maxi is None else struct.maxi
+                return self.atomic(f"(?:{self(struct.struct)}){{{struct.mini},{maxi}}}")
+            maxi = "" if struct.maxi is None else struct.maxi - 1
+            pattern = f"(?:{self(struct.struct)})(?:(?:{self(struct.join)})(?:{self(struct.struct)}))" \
+                      f"{{{max(struct.mini - 1, 0)},{maxi}}}"  # Each group is defined once
+            return self.atomic(pattern if struct.mini > 0 else f"(?:{pattern})?")
+        elif isinstance(struct, Not):
+            return f"(?!{self(struct.struct)})" + (f".{{{struct.increment}}}" if struct.increment else "")
+        elif isinstance(struct, End):
+            return r"\Z"
+        raise TypeError(f"{struct} is not regular")
+
+
+class _Pattern:
+    """
+    A regular expression, compiled for str and for the bytes of a ByteSource when first needed:
+    building a grammar doesn't compile the expressions its parses never use
+    """
+    __slots__ = ("source", "_str", "_bytes")
+
+    def __init__(self, source):
+        self.source = source
+        self._str = self._bytes = None
+
+    def for_str(self) -> re.Pattern:
+        if self._str is None:
+            self._str = re.compile(self.source, re.DOTALL)
+        return self._str
+
+    def for_bytes(self) -> re.Pattern:
+        if self._bytes is None:  # The sources are ASCII: the non-ASCII characters of the pattern never match
+            self._bytes = re.compile(self.source.encode(), re.DOTALL)
+        return self._bytes
+
+    def match(self, code, pos):
+        if type(code) is ByteSource:
+            return self.for_bytes().match(code.data, pos)
+        return self.for_str().match(code, pos)
+
+
+def _matcher(struct):
+    """A function (offset, code) -> if struct matches there"""
+    if isinstance(struct, Str):
+        value = struct.value
+        return lambda i, code: code.startswith(value, i)
+    elif isinstance(struct, End):
+        return lambda i, code: i == len(code)
+    match = _Pattern(_Compiler()(struct)).match
+    return lambda i, code: match(code, i) is not None
+
+
+def _token_width(struct):
+    """The length of the items of a Repeat if they are all single tokens of the same length"""
+    if isinstance(struct, Str) and struct.value:
+        return len(struct.value)
+    elif isinstance(struct, Not) and struct.increment > 0:
+        return struct.increment
+    chars = _single_chars(struct)
+    return 1 if chars else None
+
+
+def _builder(struct):
+    """
+    A function (token, code, i, end) -> the result of struct._run and its end offset, when struct is known to match
+    at the offset i. token(i, length) gives the fragment of code, end is the end of the match if known.
+    The decisions depending only on the grammar are taken here, once.
+    """
+    if isinstance(struct, Str):
+        length = len(struct.value)
+
+        def build(token, code, i, end=None):
+            return token(i, length), i + length
+    elif _single_chars(struct) is not None:
+        def build(token, code, i, end=None):
+            return token(i, 1), i + 1
+    elif isinstance(struct, Any) and all(type(value) is Str and _has_default_factory(value) for value in struct.values):
+        strings = [value.value for value in struct.values]
+
+        def build(token, code, i, end=None):
+            for string in strings:
+                if code.startswith(string, i):
+                    return token(i, len(string)), i + len(string)
+            raise AssertionError(f"{struct} matched but none of its alternatives")
+    elif isinstance(struct, Any):
+        alternatives = [(_matcher(value), _builder(value)) for value in struct.values]
+
+        def build(token, code, i, end=None):
+            for matches, build_value in alternatives:
+                if matches(i, code):
+                    return build_value(token, code, i)
+            raise AssertionError(f"{struct} matched but none of its alternatives")
+    elif isinstance(struct, Sequence):
+        builders = [_builder(value) for value in struct.values]
+
+        def build(token, code, i, end=None):
+            values = []
+            for build_value in builders:
+                value, i = build_value(token, code, i)
+                values.append(value)
+            return values, i
+    elif isinstance(struct, Repeat):
+        build = _repeat_builder(struct)
+    elif isinstance(struct, Not):
+        increment = struct.increment
+
+        def build(token, code, i, end=None):
+            if increment == 0:
+                return "", i
+            return token(i, increment), i + increment
+    else:  # End
+        def build(token, code, i, end=None):
+            return True, i
+    if struct.factory is None:
+        return build
+    factory, getargs = struct.factory, struct._getargs
+
+    def build_and_create(token, code, i, end=None):
+        obj, i = build(token, code, i, end)
+        return factory(*getargs(obj)), i
+    return build_and_create
+
+
+def _repeat_builder(struct):
+    maxi, width = struct.maxi, _token_width(struct.struct)
+    if maxi == 0:
+        return lambda token, code, i, end=None: (([], []), i)
+    match = _Pattern(_Compiler()(struct)).match
+    if width is not None and struct.join is None:
+        def build(token, code, i, end=None):
+            if end is None:
+                end = match(code, i).end()
+            return ([token(j, width) for j in range(i, end, width)], []), end
+        return build
+    build_item = _builder(struct.struct)
+    if struct.join is None:
+        def build(token, code, i, end=None):
+            if end is None:
+                end = match(code, i).end()
+            values = []
+            while i < end:  # The items are not nullable
+                value, i = build_item(token, code, i)
+                values.append(value)
+            return (values, []), i
+        return build
+    join_matches, build_join = _matcher(struct.join), _builder(struct.join)
+
+    def build(token, code, i, end=None):
+        if end is None:
+            end = match(code, i).end()
+        values, joins = [], []
+        if i < end:
+            value, i = build_item(token, code, i)
+            values.append(value)
+        while i < end:
+            join, i = build_join(token, code, i)
+            joins.append(join)
+            value, i = build_item(token, code, i)
+            values.append(value)
+        if values and (maxi is None or len(values) < maxi) and join_matches(i, code):
+            joins.append(build_join(token, code, i)[0])  # Repeat keeps the join before an item that didn't match
+        return (values, joins), i
+    return build
+
+
+class Regex:
+    """
+    The regular expression of a regular struct, and the function rebuilding its value,
+    both made when the struct is first run
+    """
+    def __init__(self, struct):
+        self.struct = struct
+
+    @cached_property
+    def patterns(self) -> _Pattern:
+        return _Pattern(_Compiler()(self.struct))
+
+    @cached_property
+    def build(self):
+        return _builder(self.struct)
+
+    @property
+    def pattern(self) -> re.Pattern:
+        return self.patterns.for_str()
+
+    def run(self, namespace, index, code):
+        """The same result as struct._run, for a str or ByteSource code"""
+        if type(code) is ByteSource:
+            match = self.patterns.for_bytes().match(code.data, index)
+        else:
+            match = self.patterns.for_str().match(code, index)
+        if match is None:
+            return None, index
+        token = getattr(namespace, "token", None)
+        if token is None:  # A plain dict namespace
+
+            def token(i, length):
+                return Token(code, i, length)
+        return self.build(token, code, index, match.end())
+
+    def __repr__(self):
+        return f"Regex({self.patterns.source!r})"
+
+
+def fuse(structs):
+    """Give a Regex to the regular structs, except the Str and End that are already simple"""
+    for struct in structs:
+        if struct.regex is None and not isinstance(struct, (Str, End)) and is_regular(struct):
+            struct.regex = Regex(struct)
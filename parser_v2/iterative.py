@@ -0,0 +1,222 @@
+"""
+The iterative engine: the structs are run with an explicit stack instead of nested parse calls.
+
+Each struct with children has a generator doing the same as its _parse (and applying its factory):
+instead of calling the parse of a child, it yields (child, namespace, index, memoized) and receives its result,
+or the error it raised. run keeps the generators waiting for a child on a list, so the depth of the parsed
+code is only bounded by memory, not by the recursion limit of Python.
+The named structs are memoized (or profiled) with the enter and exit methods of the memo.
+The structs without children, the fused ones and the struct types it doesn't know are run by their _run.
+"""
+from parser_v2.byte_source import ByteSource
+from parser_v2.struct import BasicStruct, Any, Sequence, Repeat, Expected, Not, UpdateNameSpace, SaveAs, CutFailure, \
+    Operators, _get, _token
+from parser_v2.token import Span
+from parser_v2 import analysis
+from parser_v2.var import Var, Transformer
+
+
+def _created(struct, obj, index):
+    """The result of struct._run from the one of struct._parse"""
+    if obj is not None and struct.factory is not None:
+        obj = struct.factory(*struct._getargs(obj))
+    return obj, index
+
+
+def _memoized(struct, namespace, index, code, memo):
+    known, state = memo.enter(struct, namespace, index, code)
+    if known:
+        return state
+    try:
+        result = yield struct, namespace, index, False
+    except BaseException:
+        memo.abort(state)
+        raise
+    return memo.exit(state, namespace, result)
+
+
+def _any(struct, namespace, index, code):
+    try:
+        dispatch, fallback = namespace.dispatch[id(struct)]
+    except (AttributeError, TypeError, KeyError):  # Not parsed by a Parser, or not in its grammar
+        dispatch, fallback = analysis.dispatch_of(struct)
+    values = fallback
+    if dispatch is not None:
+        try:
+            values = dispatch.get(code[index], fallback)
+        except IndexError:
+            pass
+    try:
+        for value in values:
+            obj, idx = yield value, namespace, index, True
+            if obj is not None:
+                return _created(struct, obj, idx)
+    except CutFailure:  # An alternative committed, the next ones are not tried
+        pass
+    return None, index
+
+
+def _cut(namespace, index):
+    memo = getattr(namespace, "memo", None)
+    if memo is not None:
+        memo.cut(index)
+
+
+def _sequence(struct, namespace, index, code):
+    before_idx = index
+    values = []
+    for k, value in enumerate(struct.values):
+        if k == struct.cut:
+            _cut(namespace, before_idx)
+        obj, index = yield value, namespace, index, True
+        if obj is None:
+            if struct.cut is not None and k >= struct.cut:
+                raise CutFailure(struct, before_idx)
+            return None, before_idx
+        values.append(obj)
+    if struct.cut == len(values):
+        _cut(namespace, before_idx)
+    return _created(struct, values, index)
+
+
+def _repeat(struct, namespace, index, code):
+    mini = _get(struct.mini, namespace)
+    maxi = _get(struct.maxi, namespace)
+    if maxi == 0:
+        return _created(struct, ([], []), index)
+    values = []
+    joins = []
+    first = True
+    original_index = index
+    while True:
+        last_index = index
+        if not first and struct.join is not None:
+            try:
+                join, index = yield struct.join, namespace, index, True
+            except CutFailure:
+                join = None
+            if join is None:
+                break
+            joins.append(join)
+        try:
+            value, index = yield struct.struct, namespace, index, True
+        except CutFailure:
+            value = None
+        if value is None:
+            index = last_index
+            break
+        values.append(value)
+        if maxi is not None and len(values) >= maxi:
+            break
+        first = False
+        if index == last_index and struct.maxi is None:
+            break
+    if len(values) < mini:
+        return None, original_index
+    return _created(struct, (values, joins), index)
+
+
+def _expected(struct, namespace, index, code):
+    try:
+        value, index = yield struct.struct, namespace, index, True
+    except CutFailure:
+        value = None
+    if value is None:
+        raise struct.error(namespace, index, code)
+    return _created(struct, value, index)
+
+
+def _not(struct, namespace, index, code):
+    try:
+        value, _ = yield struct.struct, namespace, index, True
+    except CutFailure:
+        value = None
+    right = index + struct.increment
+    if value is None and right <= len(code):
+        if struct.increment == 0:
+            return _created(struct, "", index)
+        return _created(struct, _token(namespace, code, index, struct.increment), right)
+    return None, index
+
+
+def _update_namespace(struct, lnamespace, index, code):
+    namespace = lnamespace | {key: _get(val, lnamespace) for (key, val) in struct.ns.items()}
+    obj, index = yield struct.struct, namespace, index, True
+    return _created(struct, obj, index)
+
+
+def _save_as(struct, namespace, index, code):
+    value, index = yield struct.struct, namespace, index, True
+    if value is not None:
+        namespace[struct.vname] = value
+    return _created(struct, value, index)
+
+
+def _partial(struct, namespace, index, code):
+    value = struct.get(namespace)
+    if isinstance(value, Span):
+        value = value.text
+    if isinstance(value, str):
+        if code.startswith(value, index):
+            return _created(struct, _token(namespace, code, index, len(value)), index + len(value))
+        return None, index
+    if not isinstance(value, BasicStruct):
+        raise TypeError(f"Value of {struct} cannot be used to parse")
+    obj, index = yield value, namespace, index, True
+    return _created(struct, obj, index)
+
+
+def _operators(struct, namespace, index, code):
+    obj, index = yield from struct.steps(namespace, index, code)
+    return _created(struct, obj, index)
+
+
+STEPS = {
+    Any: _any, Sequence: _sequence, Repeat: _repeat, Expected: _expected, Not: _not,
+    UpdateNameSpace: _update_namespace, SaveAs: _save_as, Var: _partial, Transformer: _partial,
+    Operators: _operators,
+}
+
+
+def run(struct, namespace, index, code):
+    """The same as struct.parse(namespace, index, code), without nested calls"""
+    regex_source = isinstance(code, (str, ByteSource))
+    steps_of = STEPS.get
+    stack = []  # The generators waiting for the result of a child
+    push, pop = stack.append, stack.pop
+    memoized = True
+    value = error = None
+    while True:
+        if struct is not None:  # Start the child asked, it is a generator or its result is known at once
+            try:
+                memo = getattr(namespace, "memo", None) if memoized and struct.name is not None else None
+                if memo is not None:
+                    push(_memoized(struct, namespace, index, code, memo))
+                    value = None
+                elif struct.regex is not None and regex_source:
+                    value = struct.regex.run(namespace, index, code)
+                else:
+                    steps = steps_of(type(struct))
+                    if steps is None:
+                        value = struct._run(namespace, index, code)
+                    else:
+                        push(steps(struct, namespace, index, code))
+                        value = None
+            except BaseException as e:
+                error = e
+        if not stack:
+            if error is not None:
+                raise error
+            return value
+        try:
+            if error is None:
+                struct, namespace, index, memoized = stack[-1].send(value)
+            else:  # Cleared first: the generator can catch it and return, throw then raises StopIteration
+                thrown, error = error, None
+                struct, namespace, index, memoized = stack[-1].throw(thrown)
+        except StopIteration as stop:
+            pop()
+            struct, value = None, stop.value
+        except BaseException as e:
+            pop()
+            struct, error = None, e
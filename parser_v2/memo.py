@@ -0,0 +1,210 @@
+"""
+Packrat memoization.
+When a parse is memoized, the result of every named struct (the structs set as attributes of a Parser)
+is cached by offset, so backtracking never parses the same rule twice at the same place.
+That bounds the parse time linearly to the size of the input.
+
+A result can depend on the namespace (indent, quote_char, ...): the values of the dynamic
+variables (the ones set by UpdateNameSpace or SaveAs) the struct can read are part of the key.
+The variables given to the parse are not: they don't change until the table is emptied.
+The namespace is only read through Var and Transformer: a custom struct reading it directly must not be memoized.
+
+A CUT bounds the table: once a sequence is committed, the results before its start are dropped.
+They are only dropped when the table has doubled since the last pruning, so pruning stays linear.
+"""
+from weakref import WeakKeyDictionary
+
+from parser_v2.struct import BasicStruct, UpdateNameSpace, SaveAs
+from parser_v2.var import Var, Transformer
+
+_MISSING = object()
+
+
+def _freeze(value):
+    """A hashable version of a namespace value"""
+    try:
+        hash(value)
+    except TypeError:
+        return "id", id(value)
+    return value
+
+
+class Dependencies:
+    """
+    The dynamic variables each struct of a grammar reads and writes.
+    """
+    def __init__(self, grammar: dict, extra_names=()):
+        """
+        :param grammar: the namespace of the parser
+        :param extra_names: the names given to the parse, that can hide the grammar (they are resolved in grammar)
+        """
+        self.grammar = grammar
+        self.bindings = {}  # name -> expressions given by UpdateNameSpace
+        dynamic = set()
+        for struct in self._walk(value for value in grammar.values() if isinstance(value, BasicStruct)):
+            if isinstance(struct, UpdateNameSpace):
+                for key, value in struct.ns.items():
+                    self.bindings.setdefault(key, []).append(value)
+                    dynamic.add(key)
+            elif isinstance(struct, SaveAs):
+                dynamic.add(struct.vname)
+        self.dynamic = tuple(sorted(dynamic))
+        self._reads = {}
+        self._writes = {}
+
+    def _successors(self, struct, cross_uns=True):
+        if isinstance(struct, UpdateNameSpace) and not cross_uns:
+            return
+        yield from struct.children()
+        if isinstance(struct, Var):
+            value = self.grammar.get(struct.vname)
+            if isinstance(value, BasicStruct):
+                yield value
+            for value in self.bindings.get(struct.vname, ()):
+                if isinstance(value, BasicStruct):
+                    yield value
+
+    def _walk(self, roots, cross_uns=True):
+        seen = set()
+        todo = list(roots)
+        while todo:
+            struct = todo.pop()
+            if id(struct) in seen:
+                continue
+            seen.add(id(struct))
+            yield struct
+            todo.extend(self._successors(struct, cross_uns))
+
+    def reads(self, struct) -> tuple[str, ...]:
+        """The dynamic variables that can change the result of struct"""
+        reads = self._reads.get(struct)
+        if reads is not None:
+            return reads
+        names = set()
+        for sub in self._walk([struct]):
+            if isinstance(sub, Var):
+                names.add(sub.vname)
+            elif isinstance(sub, Transformer) and sub.depends is None:
+                names = set(self.dynamic)
+                break
+        reads = self._reads[struct] = tuple(name for name in self.dynamic if name in names)
+        return reads
+
+    def writes(self, struct) -> tuple[str, ...]:
+        """The variables struct can set in the namespace it is parsed with"""
+        writes = self._writes.get(struct)
+        if writes is not None:
+            return writes
+        names = {sub.vname for sub in self._walk([struct], cross_uns=False) if isinstance(sub, SaveAs)}
+        writes = self._writes[struct] = tuple(sorted(names))
+        return writes
+
+
+_dependencies_cache = WeakKeyDictionary()  # parser -> {given names: Dependencies}
+
+
+class Memo:
+    """
+    The results of the named structs during a parse.
+    The table is emptied at the end of each parse, but the hit/miss counters are kept:
+    the same Memo can be given to several parses to measure how much the cache helps.
+    """
+    def __init__(self):
+        self.table = {}
+        self.hits = 0
+        self.misses = 0
+        self.pruned = 0
+        self.dependencies = None
+        self.floor = 0  # The results before this offset are not needed anymore
+        self.kept = 0  # The size of the table after the last pruning
+
+    def start(self, parser, namespace, extra_names=()):
+        """Prepare the memo for a parse by parser with the given namespace"""
+        extra_names = frozenset(extra_names)
+        by_names = _dependencies_cache.setdefault(parser, {})
+        if extra_names not in by_names:
+            by_names[extra_names] = Dependencies(namespace, extra_names)
+        self.dependencies = by_names[extra_names]
+        self.clear()
+
+    def clear(self):
+        self.table.clear()
+        self.floor = self.kept = 0
+
+    def cut(self, offset):
+        """A sequence starting at offset is committed, the results before are dropped"""
+        self.floor = max(self.floor, offset)
+        if len(self.table) < 2 * self.kept + 64:
+            return
+        floor = self.floor
+        dead = [key for key in self.table if key[1] < floor]
+        for key in dead:
+            del self.table[key]
+        self.pruned += len(dead)
+        self.kept = len(self.table)
+
+    def parse(self, struct, namespace, index, code, run=None):
+        """
+        The result of struct, from the table or by parsing it
+        :param run: the function parsing struct and applying its factory, struct._run by default
+        """
+        known, state = self.enter(struct, namespace, index, code)
+        if known:
+            return state
+        return self.exit(state, namespace, (run or struct._run)(namespace, index, code))
+
+    def enter(self, struct, namespace, index, code):
+        """
+        The first half of parse, for the engines that can't give a run function:
+        (True, the result) if it is known, else (False, a state) and the result of struct must be given to exit.
+        """
+        if not struct.memoizable:
+            return False, None
+        if struct.first is not None and not struct.nullable:  # Fails without a table entry, see analysis
+            try:
+                char = code[index]
+            except IndexError:
+                return True, (None, index)
+            if char not in struct.first:
+                return True, (None, index)
+        reads = self.dependencies.reads(struct)
+        if reads:
+            key = (struct, index, *[namespace.get(name) for name in reads])
+        else:
+            key = (struct, index)
+        try:
+            entry = self.table.get(key)
+        except TypeError:  # Unhashable namespace value
+            key = (struct, index, *[_freeze(namespace.get(name)) for name in reads])
+            entry = self.table.get(key)
+        if entry is not None:
+            self.hits += 1
+            obj, end, writes = entry
+            if writes:
+                namespace.update(writes)
+            return True, (obj, end)
+        self.misses += 1
+        names = self.dependencies.writes(struct)
+        return False, (key, names, [namespace.get(name, _MISSING) for name in names])
+
+    def exit(self, state, namespace, result):
+        """Store the result of the struct given to enter, and return it"""
+        if state is None:
+            return result
+        key, names, before = state
+        obj, end = result
+        writes = {name: namespace[name] for name, old in zip(names, before)
+                  if namespace.get(name, _MISSING) is not old}
+        self.table[key] = obj, end, writes or None
+        return result
+
+    def abort(self, state):
+        """The struct given to enter raised an error, nothing is stored"""
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+    def __repr__(self):
+        return f"Memo(hits={self.hits}, misses={self.misses}, entries={len(self.table)}, pruned={self.pruned})"
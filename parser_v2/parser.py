@@ -1,22 +1,69 @@
 
-from parser_v2.struct import BasicStruct
-from parser_v2.token import Indexer
+from parser_v2.struct import BasicStruct, CutFailure
+from parser_v2.scope import Scope
+from parser_v2.token import Indexer, LineIndex, Token, line_text
+from parser_v2.byte_source import ByteSource
+from parser_v2.memo import Memo
+from parser_v2.profiler import Profiler
+from parser_v2.char_stream import NeedInput
+from parser_v2 import analysis, iterative
+
+from functools import partial
+
+ENGINES = ("interpreted", "compiled", "iterative")
 
-import code
 
 class Parser:
     __start__: str = "start"
+    __memoize__: bool = False
+    __engine__: str = "interpreted"
+    __token__: type = Token
+    __analysis__: analysis.Analysis = None  # Set when the class is created
 
-    def __init_subclass__(cls, start=None, **kwargs):
+    def __init_subclass__(cls, start=None, memoize=None, engine=None, token=None, **kwargs):
         super().__init_subclass__(**kwargs)
         cls.__start__ = start or cls.__start__
+        if memoize is not None:
+            cls.__memoize__ = memoize
+        if engine is not None:
+            cls.__engine__ = engine
+        if token is not None:
+            cls.__token__ = token
+        starter = getattr(cls, cls.__start__, None) if isinstance(cls.__start__, str) else cls.__start__
+        cls.__analysis__ = analysis.prepare(vars(cls), start=starter)
 
     def __new__(cls, code, start=None, index=0, /, **namespace):
         return cls._parse(code, start=start, namespace=namespace, index=index)
 
     @classmethod
-    def _parse(cls, code, start=None, namespace=None, index=0):
-        namespace = vars(cls) | (namespace or {})
+    def parse_prefix(cls, code, start=None, namespace=None, index=0, memo=None, engine=None, token=None,
+                     profiler=None):
+        """
+        Parse the code from index, without requiring it to go until the end.
+        Returns the result (None if start doesn't match) and the Indexer after it.
+        The structs advance on int offsets, the Indexer is only built for the result.
+        :param index: the offset to start from, or an Indexer (to share its LineIndex and its token type)
+        :param memo: a Memo to use for packrat parsing (its counters are updated),
+            True to use a new one, False to disable it. Defaults to the memoize argument of the class.
+        :param engine: "interpreted" to call the parse methods of the structs,
+            "compiled" to use the code generated by codegen, "iterative" to run the structs with an explicit stack
+            (see iterative, the nesting is not bounded by the recursion limit). Defaults to the engine argument
+            of the class.
+        :param token: the type of the matched fragments, Token or Span. Defaults to the token argument of the class.
+        :param profiler: a Profiler measuring the named structs during the parse
+        """
+        given = namespace or {}
+        namespace = Scope(vars(cls), given, dispatch=cls.__analysis__.dispatch)
+        if memo is None:
+            memo = cls.__memoize__
+        if memo is True:
+            memo = Memo()
+        if memo:
+            memo.start(cls, vars(cls) | given, given.keys())
+            namespace.memo = memo
+        if profiler is not None:
+            profiler.start(namespace.memo)
+            namespace.memo = memo = profiler
         start = start or cls.__start__
         if isinstance(start, str):
             starter = getattr(cls, start)
@@ -24,9 +71,37 @@ class Parser:
             starter = start
         else:
             raise TypeError(f"{start} is not a valid start")
-        if isinstance(index, int):
-            index = Indexer(code) + index
-        obj, index = starter.parse(namespace, index, code)
+        if isinstance(index, Indexer):
+            lines, token, index = index.lines, index.token, index.i
+        else:
+            lines, token = LineIndex(code), token or cls.__token__
+        namespace.token = partial(token, code, lines=lines)
+        namespace.lines = lines
+        engine = engine or cls.__engine__
+        if engine == "compiled":
+            from parser_v2 import codegen  # Imported when first used, for the startup time
+            run = codegen.get_compiled(cls).get(starter, starter.parse)
+        elif engine == "interpreted":
+            run = starter.parse
+        elif engine == "iterative":
+            run = partial(iterative.run, starter)
+        else:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+        try:
+            obj, end = run(namespace, index, code)
+        except CutFailure:  # No Any to catch it, the start struct failed
+            obj, end = None, index
+        finally:
+            if memo:
+                memo.clear()
+        return obj, Indexer(code, end, lines, token)
+
+    @classmethod
+    def _parse(cls, code, start=None, namespace=None, index=0, memo=None, engine=None, token=None, profiler=None):
+        """
+        Parse the whole code, see parse_prefix for the arguments.
+        """
+        obj, index = cls.parse_prefix(code, start, namespace, index, memo, engine, token, profiler)
         if index != len(code):
             e = SyntaxError(f"Unexpected token {code[index]!r}, line {index.line}, column {index.column}")
             e.lineno = index.line + 1
@@ -35,20 +110,44 @@ class Parser:
 
     parse = _parse
 
+    @classmethod
+    async def parse_async(cls, code, start=None, namespace=None, index=0, memo=None, engine=None, token=None,
+                          profiler=None):
+        """
+        Parse the whole code of an AsyncCharStream, awaiting its next input each time the parser needs more
+        characters (the parse is then started again). See parse_prefix for the arguments.
+        """
+        while True:
+            try:
+                return cls._parse(code, start, namespace, index, memo, engine, token, profiler)
+            except NeedInput:
+                await code.fill()
+
 def parse(parser, code, start=None, namespace=None, index=0, /, **ns):
     if not issubclass(parser, Parser):
         raise TypeError("Parser must be a subclass of Parser")
     return parser.parse(code, start=start, namespace=(namespace or {}) | ns, index=index)
 
-def parse_file(parser, path, start=None, namespace=None, index=0, /, **ns):
-    with open(path) as f:
-        content = f.read()
-        try:
-            return parse(parser, content, start=start, namespace=(namespace or {}) | ns, index=index)
-        except SyntaxError as e:
-            e.filename = path
-            e.text = content.split("\n")[e.lineno - 1]
-            raise
+def parse_file(parser, path, start=None, namespace=None, index=0, /, mapped=False, **ns):
+    """
+    :param mapped: parse the memory map of the file instead of its text: an ASCII file is parsed from its bytes
+        without being decoded (see ByteSource), the other files are read as UTF-8.
+        The map is closed once parsed, so the result can't hold Spans of it.
+    """
+    if mapped:
+        content = ByteSource.open(path)
+    else:
+        with open(path) as f:
+            content = f.read()
+    try:
+        return parse(parser, content, start=start, namespace=(namespace or {}) | ns, index=index)
+    except SyntaxError as e:
+        e.filename = path
+        e.text = line_text(content, e.lineno)
+        raise
+    finally:
+        if isinstance(content, ByteSource):
+            content.close()
 
 if __name__ == '__main__':
     class A(Parser):
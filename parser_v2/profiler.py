@@ -0,0 +1,161 @@
+"""
+Profiling of the named structs of a parse.
+
+The Profiler takes the place of the Memo on the Scope of the parse (and forwards to it if the parse is memoized),
+so it sees each call to a named struct: the structs set as attributes of a Parser.
+For each of them it counts the calls, the successes and the failures, measures the time spent in it
+including the structs it calls (cumulative) and excluding the named structs it calls (self),
+and the characters it consumed. The characters consumed by a call at an offset where the same struct was
+already called are counted as rescanned: this is the work redone after a backtracking (a memo hit is not).
+"""
+from time import perf_counter
+
+COLUMNS = ("calls", "successes", "failures", "self_time", "cumulative_time", "consumed", "rescanned")
+
+
+class Stats:
+    """The measures of one struct"""
+    __slots__ = ("name", *COLUMNS, "offsets", "active")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = self.successes = self.failures = 0
+        self.self_time = self.cumulative_time = 0.
+        self.consumed = self.rescanned = 0
+        self.offsets = set()  # The offsets the struct was called at during the current parse
+        self.active = 0  # The number of calls in progress, the recursive calls are not added to the cumulative time
+
+    def as_dict(self) -> dict:
+        return {"name": self.name} | {column: getattr(self, column) for column in COLUMNS}
+
+    def __repr__(self):
+        return f"Stats({', '.join(f'{key}={value!r}' for key, value in self.as_dict().items())})"
+
+
+class _Call:
+    """A call in progress"""
+    __slots__ = ("stats", "offset", "rescan", "memo_state", "start")
+
+    def __init__(self, stats, offset, rescan):
+        self.stats = stats
+        self.offset = offset
+        self.rescan = rescan
+        self.memo_state = None
+        self.start = perf_counter()
+
+
+class Profiler:
+    """
+    The measures of the named structs during the parses it is given to.
+    The same Profiler can be given to several parses, the measures are added.
+    """
+    def __init__(self):
+        self.stats = {}  # struct -> Stats
+        self.memo = None  # The Memo of the current parse, if it is memoized
+        self._children = []  # For each call in progress, the time spent in the named structs it called
+
+    def start(self, memo=None):
+        """Prepare the profiler for a parse, memoized by memo if given"""
+        self.memo = memo or None
+        self._children.clear()
+        for stats in self.stats.values():
+            stats.offsets.clear()
+
+    def clear(self):
+        if self.memo is not None:
+            self.memo.clear()
+
+    def cut(self, offset):
+        if self.memo is not None:
+            self.memo.cut(offset)
+
+    def parse(self, struct, namespace, index, code, run=None):
+        """Parse struct like the memo would (or struct._run without memo), and measure it"""
+        known, call = self.enter(struct, namespace, index, code)
+        if known:
+            return call
+        try:
+            result = (run or struct._run)(namespace, index, code)
+        except BaseException:
+            self.abort(call)
+            raise
+        return self.exit(call, namespace, result)
+
+    def enter(self, struct, namespace, index, code):
+        """The first half of parse, like Memo.enter"""
+        stats = self.stats.get(struct)
+        if stats is None:
+            stats = self.stats[struct] = Stats(struct.name)
+        offset = index
+        call = _Call(stats, offset, offset in stats.offsets)
+        stats.offsets.add(offset)
+        stats.calls += 1
+        stats.active += 1
+        self._children.append(0.)
+        if self.memo is not None:
+            try:
+                known, call.memo_state = self.memo.enter(struct, namespace, index, code)
+            except BaseException:
+                self.abort(call)
+                raise
+            if known:  # A memo hit is not rescanned
+                call.rescan = False
+                return True, self._finish(call, call.memo_state)
+        return False, call
+
+    def exit(self, call, namespace, result):
+        """Like Memo.exit"""
+        if self.memo is not None:
+            result = self.memo.exit(call.memo_state, namespace, result)
+        return self._finish(call, result)
+
+    def abort(self, call):
+        if self.memo is not None:
+            self.memo.abort(call.memo_state)
+        self._finish(call, (None, None))
+
+    def _finish(self, call, result):
+        elapsed = perf_counter() - call.start
+        stats = call.stats
+        stats.active -= 1
+        stats.self_time += elapsed - self._children.pop()
+        if not stats.active:
+            stats.cumulative_time += elapsed
+        if self._children:
+            self._children[-1] += elapsed
+        obj, end = result
+        if obj is None:  # Failed or raised an error
+            stats.failures += 1
+            return result
+        stats.successes += 1
+        consumed = end - call.offset
+        stats.consumed += consumed
+        if call.rescan:
+            stats.rescanned += consumed
+        return result
+
+    def results(self, sort="self_time") -> list[Stats]:
+        """The stats of the structs, the biggest first"""
+        return sorted(self.stats.values(), key=lambda stats: getattr(stats, sort), reverse=True)
+
+    def table(self, sort="self_time", limit=None) -> str:
+        """The results as a text table"""
+        rows = [(stats.name, str(stats.calls), str(stats.successes), str(stats.failures),
+                 f"{stats.self_time * 1000:.3f}", f"{stats.cumulative_time * 1000:.3f}",
+                 str(stats.consumed), str(stats.rescanned))
+                for stats in self.results(sort)[:limit]]
+        header = ("struct", "calls", "successes", "failures", "self (ms)", "cumulative (ms)", "consumed", "rescanned")
+        widths = [max(len(row[column]) for row in [header, *rows]) for column in range(len(header))]
+        lines = ["  ".join(cell.ljust(width) if column == 0 else cell.rjust(width)
+                           for column, (cell, width) in enumerate(zip(row, widths)))
+                 for row in [header, *rows]]
+        lines.insert(1, "-" * len(lines[0]))
+        return "\n".join(lines)
+
+    def to_json(self, sort="self_time", **kwargs) -> str:
+        """The results as a JSON list, times in seconds"""
+        import json
+        return json.dumps([stats.as_dict() for stats in self.results(sort)], **kwargs)
+
+    def __repr__(self):
+        return f"Profiler(structs={len(self.stats)}, calls={sum(stats.calls for stats in self.stats.values())})"
@@ -0,0 +1,46 @@
+class Scope(dict):
+    """
+    The namespace of a parse.
+    The dict itself only holds the dynamic variables (the ones given to the parse, set by UpdateNameSpace
+    or SaveAs), the other names are looked up in the static namespace, the grammar of the parser.
+    Entering an UpdateNameSpace copies the dynamic variables only, not the whole grammar.
+    It also carries what the structs need to build their values from the int offsets they advance on:
+    token, the function (offset, length) -> the fragment of the source, lines, the LineIndex of the source,
+    and dispatch, the dispatch tables of the Any of the parser (see analysis.build_dispatch).
+    """
+    __slots__ = ("static", "memo", "token", "lines", "dispatch")
+
+    def __init__(self, static, values=(), memo=None, token=None, lines=None, dispatch=None):
+        """
+        :param static: the grammar, never modified
+        :param values: the dynamic variables
+        :param memo: the Memo of the parse, or the Profiler wrapping it, if any
+        :param token: the function building the fragments, Token(code, offset, length) if not given
+        :param lines: the LineIndex of the source, for the positions of the fragments and the errors
+        :param dispatch: the dispatch of the Analysis of the parser, the Any build their tables alone if not given
+        """
+        super().__init__(values)
+        self.static = static
+        self.memo = memo
+        self.token = token
+        self.lines = lines
+        self.dispatch = dispatch
+
+    def __missing__(self, key):
+        return self.static[key]
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        return self.static.get(key, default)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.static
+
+    def __or__(self, other):
+        scope = Scope(self.static, self, self.memo, self.token, self.lines, self.dispatch)
+        scope.update(other)
+        return scope
+
+    def __repr__(self):
+        return f"Scope({dict.__repr__(self)})"
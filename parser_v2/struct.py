@@ -1,5 +1,6 @@
 from parser_v2 import var
-from parser_v2.token import Indexer
+from parser_v2.token import Indexer, Token, Span
+from parser_v2.byte_source import ByteSource
 
 def _get(val, namespace):
     if isinstance(val, var.Partial):
@@ -7,10 +8,41 @@ def _get(val, namespace):
     return val
 
 
+def _token(namespace, code, offset, length):
+    """The fragment of code matched from offset, built by the token function of the Scope of the parse"""
+    make = getattr(namespace, "token", None)
+    if make is None:  # A plain dict namespace
+        return Token(code, offset, length)
+    return make(offset, length)
+
+
+def _indexer(namespace, offset, code) -> Indexer:
+    """The Indexer of offset, giving its line and column to the error messages"""
+    return Indexer(code, offset, getattr(namespace, "lines", None))
+
+
 DBG_MODE = False
 
+
+class CutFailure(Exception):
+    """
+    Raised by a Sequence failing after its CUT: the innermost Any catches it and fails
+    without trying its other alternatives. Repeat, Not and Expected take it as a normal failure.
+    """
+    def __init__(self, struct, index):
+        super().__init__(struct, index)
+        self.struct = struct
+        self.index = index
+
+
 class BasicStruct:
     factory = None
+    memoizable = True
+    regex = None  # A fusion.Regex matching this struct at once, if it is regular
+    # Set by analysis.prepare: the FIRST set (None if unknown), if it can match nothing, the Analysis
+    first = None
+    nullable = True
+    analysis = None
 
     def __set_name__(self, owner, name):
         self.name = name
@@ -25,15 +57,34 @@ class BasicStruct:
             self.factory = factory
         return self
 
-    def _parse(self, namespace, index: "Indexer", code) -> (object | None, int):
+    @property
+    def follow(self) -> frozenset[str] | None:
+        """The FOLLOW set (None if unknown), computed by the Analysis the first time it is asked"""
+        return None if self.analysis is None else self.analysis.follow_sets[self]
+
+    def _parse(self, namespace, index: int, code) -> (object | None, int):
+        """The value parsed from the offset index (None if it doesn't match) and the offset after it"""
         raise NotImplementedError
 
     def _getargs(self, obj):
         return [obj]
 
-    def parse(self, namespace, index: "Indexer", code) -> (object | None, int):
+    def children(self) -> list["BasicStruct"]:
+        """The structs directly used by this one"""
+        return []
+
+    def parse(self, namespace, index: int, code) -> (object | None, int):
         if DBG_MODE:
             print(f"Parsing by {self.name if self.name else '?'}={self} started from {index}")
+        if self.name is not None:
+            memo = getattr(namespace, "memo", None)  # Set on the Scope of a memoized or profiled parse
+            if memo is not None:
+                return memo.parse(self, namespace, index, code)
+        return self._run(namespace, index, code)
+
+    def _run(self, namespace, index: int, code) -> (object | None, int):
+        if self.regex is not None and isinstance(code, (str, ByteSource)):
+            return self.regex.run(namespace, index, code)
         obj, index = self._parse(namespace, index, code)
         if obj is not None and self.factory is not None:
             obj = self.factory(*self._getargs(obj))
@@ -68,19 +119,25 @@ class BasicStruct:
             return super().__repr__()
 
 class Str(BasicStruct):
+    memoizable = False  # Matching a string is cheaper than a memo lookup
+
     def __init__(self, value, factory=None):
         self.value = value
         super().__init__(factory)
 
     def _parse(self, namespace, index, code) -> (object | None, int):
         string = _get(self.value, namespace)
+        if isinstance(string, Span):
+            string = string.text
         if not isinstance(string, str):
             raise TypeError(f"Expected str, got {type(string)}")
         if code.startswith(string, index):
-            tok = index.get_token(len(string))
-            return tok, index + len(string)
+            return _token(namespace, code, index, len(string)), index + len(string)
         return None, index
 
+    def children(self):
+        return [self.value] if isinstance(self.value, BasicStruct) else []
+
     def __str__(self):
         return f"{self.name or 'Str'}({self.value!r})"
 
@@ -103,12 +160,29 @@ class Any(Finalisable):
         super().__init__(factory)
 
     def _parse(self, namespace, index, code) -> (object | None, int):
-        for value in self.values:
-            value, idx = value.parse(namespace, index, code)
-            if value is not None:
-                return value, idx
+        try:  # The table of the parser, see analysis.build_dispatch
+            dispatch, fallback = namespace.dispatch[id(self)]
+        except (AttributeError, TypeError, KeyError):  # Not parsed by a Parser, or not in its grammar
+            from parser_v2.analysis import dispatch_of
+            dispatch, fallback = dispatch_of(self)
+        values = fallback
+        if dispatch is not None:
+            try:
+                values = dispatch.get(code[index], fallback)
+            except IndexError:
+                pass
+        try:
+            for value in values:
+                value, idx = value.parse(namespace, index, code)
+                if value is not None:
+                    return value, idx
+        except CutFailure:  # An alternative committed, the next ones are not tried
+            pass
         return None, index
 
+    def children(self):
+        return list(self.values)
+
     def __or__(self, other):
         if self.is_final:
             return super().__or__(other)
@@ -121,10 +195,15 @@ class Any(Finalisable):
 class Sequence(Finalisable):
     factory = tuple
     indexes = [slice(None, None, None)]
+    cut = None  # The number of values before the CUT, if there is one
 
     def __init__(self, *values, factory=None, indexes=None):
         super().__init__(factory=factory)
-        self.values = [_convert(value) for value in values]
+        values = [_convert(value) for value in values]
+        if CUT in values:  # The CUT gives no value, the indexes of the factory don't count it
+            self.cut = values.index(CUT)
+            values = [value for value in values if value is not CUT]
+        self.values = values
         self.is_final = factory is not None
         if indexes is not None:
             self.indexes = indexes
@@ -133,6 +212,8 @@ class Sequence(Finalisable):
         return [obj[i] for i in self.indexes]
 
     def _parse(self, namespace, index, code) -> (object | None, int):
+        if self.cut is not None:
+            return self._parse_cut(namespace, index, code)
         before_idx = index
         values = []
         for value in self.values:
@@ -142,10 +223,37 @@ class Sequence(Finalisable):
             values.append(value)
         return values, index
 
+    def _parse_cut(self, namespace, index, code) -> (object | None, int):
+        before_idx = index
+        values = []
+        for value in self.values[:self.cut]:
+            value, index = value.parse(namespace, index, code)
+            if value is None:
+                return None, before_idx
+            values.append(value)
+        memo = getattr(namespace, "memo", None)
+        if memo is not None:
+            memo.cut(before_idx)
+        for value in self.values[self.cut:]:
+            value, index = value.parse(namespace, index, code)
+            if value is None:
+                raise CutFailure(self, before_idx)
+            values.append(value)
+        return values, index
+
+    def items(self) -> list[BasicStruct]:
+        """The values, with the CUT at its place"""
+        if self.cut is None:
+            return list(self.values)
+        return [*self.values[:self.cut], CUT, *self.values[self.cut:]]
+
+    def children(self):
+        return list(self.values)
+
     def __add__(self, other):
         if self.is_final:
             return Seq(self, other)
-        return Sequence(*self.values, other)
+        return Sequence(*self.items(), other)
 
     def set_factory(self, factory, indexes=None):
         if indexes is not None:
@@ -156,7 +264,7 @@ class Sequence(Finalisable):
         return self.set_factory(None, indexes)
 
     def __str__(self):
-        return f"{self.name or 'Seq'}({', '.join(map(repr, self.values))})"
+        return f"{self.name or 'Seq'}({', '.join(map(repr, self.items()))})"
 
 Seq = Sequence
 
@@ -184,11 +292,17 @@ class Repeat(BasicStruct):
         while True:
             last_index = index
             if not first and self.join is not None:
-                join, index = self.join.parse(namespace, index, code)
+                try:
+                    join, index = self.join.parse(namespace, index, code)
+                except CutFailure:
+                    join = None
                 if join is None:
                     break
                 joins.append(join)
-            value, index = self.struct.parse(namespace, index, code)
+            try:
+                value, index = self.struct.parse(namespace, index, code)
+            except CutFailure:
+                value = None
             if value is None:
                 index = last_index
                 break
@@ -202,6 +316,12 @@ class Repeat(BasicStruct):
             return None, original_index
         return (values, joins), index
 
+    def children(self):
+        children = [self.struct]
+        if self.join is not None:
+            children.append(self.join)
+        return children + [bound for bound in (self.mini, self.maxi) if isinstance(bound, BasicStruct)]
+
     def _getargs(self, obj):
         if self.pass_joiners:
             return obj
@@ -229,16 +349,27 @@ class Expected(BasicStruct):
         super().__init__(factory)
 
     def _parse(self, namespace, index, code) -> (object | None, int):
-        value, index = self.struct.parse(namespace, index, code)
+        try:
+            value, index = self.struct.parse(namespace, index, code)
+        except CutFailure:
+            value = None
         if value is None:
-            e = self.etype(self.message.format(i=index, code=code, ns=namespace, line=index.line+1, col=index.column))
-            e.lineno = index.line + 1
-            # e.offset = index.column
-            # e.end_offset = -1
-            # e.end_lineno = index.line + 1
-            raise e
+            raise self.error(namespace, index, code)
         return value, index
 
+    def error(self, namespace, index, code) -> Exception:
+        """The error raised when the struct doesn't match at index"""
+        index = _indexer(namespace, index, code)
+        e = self.etype(self.message.format(i=index, code=code, ns=namespace, line=index.line+1, col=index.column))
+        e.lineno = index.line + 1
+        # e.offset = index.column
+        # e.end_offset = -1
+        # e.end_lineno = index.line + 1
+        return e
+
+    def children(self):
+        return [self.struct]
+
     def __str__(self):
         return f"{self.name or '!'}({self.struct!r})"
 
@@ -249,14 +380,20 @@ class Not(BasicStruct):
         super().__init__(factory)
 
     def _parse(self, namespace, index, code) -> (object | None, int):
-        value, _ = self.struct.parse(namespace, index, code)
+        try:
+            value, _ = self.struct.parse(namespace, index, code)
+        except CutFailure:
+            value = None
         right = index + self.increment
         if value is None and right <= len(code):
             if self.increment == 0:
                 return "", index
-            return index.get_token(self.increment), right
+            return _token(namespace, code, index, self.increment), right
         return None, index
 
+    def children(self):
+        return [self.struct]
+
     def __str__(self):
         return f"{self.name or '~'}({self.struct!r})"
 
@@ -270,6 +407,9 @@ class UpdateNameSpace(BasicStruct):
         namespace = lnamespace | {key: _get(val, lnamespace) for (key, val) in self.ns.items()}
         return self.struct.parse(namespace, index, code)
 
+    def children(self):
+        return [self.struct] + [val for val in self.ns.values() if isinstance(val, BasicStruct)]
+
     def __str__(self):
         return f"{self.name or 'UNS'}({self.struct!r}, {self.ns})"
 
@@ -287,10 +427,15 @@ class SaveAs(BasicStruct):
             namespace[self.vname] = value
         return value, index
 
+    def children(self):
+        return [self.struct]
+
     def __str__(self):
         return f"{self.name or 'SaveAs'}({self.struct!r}, {self.vname!r})"
 
 class End(BasicStruct):
+    memoizable = False
+
     def _parse(self, namespace, index, code) -> (object | None, int):
         if index == len(code):
             return True, index
@@ -301,6 +446,172 @@ class End(BasicStruct):
 
 END = End()
 
+class Operators(BasicStruct):
+    """
+    Binary operators between operands, parsed by precedence climbing in one loop.
+    levels is the precedence table, the tightest level first: for each one, its operators (str tried in order)
+    and its factory. The result is the same as nesting for each level
+    Sequence(upper, Repeat(Sequence(Any(*operators), upper.expect(message)))).set_factory(factory),
+    where upper is the previous level (the operand for the first one): a factory gets [first, [(operator, upper)...]].
+    The levels without operators give their first value as is, without calling their factory.
+    """
+    def __init__(self, operand, levels, message="Expected an operand after {op}", etype=SyntaxError, factory=None):
+        """
+        :param message: the error raised when an operator is not followed by an operand,
+            formatted like the one of Expected with op, the operator
+        """
+        self.operand = _convert(operand)
+        self.levels = [(tuple(operators), level_factory) for operators, level_factory in levels]
+        self.starts = frozenset(operator[0] for operators, _ in self.levels for operator in operators)
+        self.message = message
+        self.etype = etype
+        super().__init__(factory)
+
+    def _parse(self, namespace, index, code) -> (object | None, int):
+        return self.run_steps(namespace, index, code, self.operand.parse)
+
+    def run_steps(self, namespace, index, code, parse):
+        """The result of steps, the operands being parsed by the function parse"""
+        steps = self.steps(namespace, index, code)
+        try:
+            request = next(steps)
+            while True:
+                try:
+                    result = parse(namespace, request[2], code)
+                except CutFailure as e:
+                    request = steps.throw(e)
+                else:
+                    request = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    def steps(self, namespace, index, code):
+        """
+        A generator doing the parse: it yields (operand, namespace, index, True) to get the result of the operand
+        at index (as the iterative engine does), and returns the result of _parse
+        """
+        value, index = yield self.operand, namespace, index, True
+        if value is None:
+            return None, index
+        levels, starts, last = self.levels, self.starts, len(self.levels) - 1
+        if not levels:
+            return value, index
+        frames = [None] * len(levels)  # For the levels with operators: [first, [(operator, operand)...], operator]
+        level = 0
+        try:
+            char = code[index]
+        except IndexError:
+            char = ""
+        while True:
+            frame = frames[level]
+            if frame is not None:
+                frame[1].append((frame[2], value))
+            operator = None
+            if char and char in starts:
+                for operator in levels[level][0]:
+                    if code.startswith(operator, index):
+                        break
+                else:
+                    operator = None
+            if operator is not None:
+                if frame is None:
+                    frame = frames[level] = [value, [], None]
+                frame[2] = _token(namespace, code, index, len(operator))
+                index += len(operator)
+                try:
+                    value, end = yield self.operand, namespace, index, True
+                except CutFailure:
+                    value = None
+                if value is None:
+                    raise self.error(namespace, index, code, operator)
+                index = end
+                try:
+                    char = code[index]
+                except IndexError:
+                    char = ""
+                level = 0
+                continue
+            if frame is not None:
+                frames[level] = None
+                value = levels[level][1]([frame[0], frame[1]])
+            if level == last:
+                return value, index
+            level += 1
+
+    def error(self, namespace, index, code, operator) -> Exception:
+        """The error raised when operator is not followed by an operand at index"""
+        index = _indexer(namespace, index, code)
+        e = self.etype(self.message.format(i=index, code=code, ns=namespace, op=operator,
+                                           line=index.line + 1, col=index.column))
+        e.lineno = index.line + 1
+        return e
+
+    def children(self):
+        return [self.operand]
+
+    def __str__(self):
+        return f"{self.name or 'Operators'}({self.operand!r}, {[operators for operators, _ in self.levels]})"
+
+
+class Lexed(BasicStruct):
+    """
+    A struct read from the tokens of a lexer run before the parse, when they are given to it.
+    match(tokens, offset, *args) gives the end of the match at offset, False if the struct doesn't match there,
+    or None when the tokens can't tell: then (and when the parse has no tokens) fallback is parsed instead.
+    The matches of match must be the ones of fallback, and the factory must give from the matched Token
+    the value fallback gives.
+    """
+    def __init__(self, match, fallback, factory=None, args=(), tokens="tokens"):
+        """
+        :param args: the values passed to match after the offset, Vars are resolved in the namespace
+        :param tokens: the name of the variable holding the tokens
+        """
+        self.match = match
+        self.fallback = _convert(fallback)
+        self.args = tuple(args)
+        self.tokens = var.Var(tokens)
+        super().__init__(factory)
+
+    def _run(self, namespace, index, code) -> (object | None, int):
+        tokens = namespace.get(self.tokens.vname)
+        if tokens is not None:
+            if self.args:
+                end = self.match(tokens, index, *[_get(arg, namespace) for arg in self.args])
+            else:
+                end = self.match(tokens, index)
+            if end is False:
+                return None, index
+            if end is not None:
+                obj = _token(namespace, code, index, end - index)
+                if self.factory is not None:
+                    obj = self.factory(obj)
+                return obj, end
+        return self.fallback.parse(namespace, index, code)
+
+    def children(self):
+        return [self.tokens, self.fallback, *[arg for arg in self.args if isinstance(arg, BasicStruct)]]
+
+    def __str__(self):
+        return f"{self.name or 'Lexed'}({self.match.__name__}, {self.fallback!r})"
+
+
+class Cut(BasicStruct):
+    """
+    Put in a Sequence, commits it once the values before are matched: if the values after fail,
+    the innermost enclosing Any fails without trying its next alternatives,
+    and a memoized parse forgets the results before the start of the sequence.
+    Alone, it matches the empty string.
+    """
+    memoizable = False
+
+    def _parse(self, namespace, index, code) -> (object | None, int):
+        return "", index
+
+    def __str__(self):
+        return f"{self.name or 'CUT'}"
+
+CUT = Cut()
+
 def _convert(value) -> BasicStruct:
     if isinstance(value, BasicStruct):
         return value
@@ -1,28 +1,77 @@
+from bisect import bisect_right
 from functools import total_ordering
 
 
+class LineIndex:
+    """
+    The offsets of the line starts of a source, shared by all the Indexers and Tokens of a parse.
+    The source is scanned once, lazily, up to the greatest offset asked:
+    lines and columns are then found by bisection.
+    Lines are counted from 0 (or from first_line, for a part of a bigger source), columns from 1.
+    """
+    def __init__(self, code, first_line=0):
+        self.code = code
+        self.starts = [0]
+        self.scanned = 0
+        self.first_line = first_line
+
+    def _scan(self, end):
+        if end <= self.scanned:
+            return
+        end = min(end, len(self.code))  # A CharStream only has the characters read
+        pos = self.code.find("\n", self.scanned, end)  # Found in place, even in a ByteSource
+        while pos != -1:
+            self.starts.append(pos + 1)
+            pos = self.code.find("\n", pos + 1, end)
+        self.scanned = end
+
+    def _start(self, offset: int) -> int:
+        """The index in starts of the line of offset"""
+        self._scan(offset)
+        return bisect_right(self.starts, offset) - 1
+
+    def line(self, offset: int) -> int:
+        return self._start(offset) + self.first_line
+
+    def column(self, offset: int) -> int:
+        return offset - self.starts[self._start(offset)] + 1
+
+    def position(self, offset: int) -> tuple[int, int]:
+        k = self._start(offset)
+        return k + self.first_line, offset - self.starts[k] + 1
+
+    def edited(self, code, start: int) -> "LineIndex":
+        """The index of code, the source edited from the offset start: the lines found before are kept"""
+        lines = LineIndex(code, self.first_line)
+        lines.scanned = min(start, self.scanned)
+        lines.starts = self.starts[:bisect_right(self.starts, lines.scanned)]
+        return lines
+
+
 @total_ordering
 class Indexer:
+    __slots__ = ("code", "i", "lines", "token")
     shrort_repr = False
 
-    def __init__(self, code: str, index=0, line=0, column=1):
+    def __init__(self, code: str, index=0, lines: LineIndex = None, token: type = None):
+        """
+        :param token: the type of the matched fragments, Token (by default) or Span
+        """
         self.code = code
         self.i = index
-        self.line = line
-        self.column = column
+        self.lines = lines or LineIndex(code)
+        self.token = token or Token
+
+    @property
+    def line(self):
+        return self.lines.line(self.i)
 
-    def _add(self, i):
-        new_i = self.i + i
-        new_line = self.line + self.code[self.i:new_i].count('\n')
-        new_column = (self.column + i) if new_line == self.line else (new_i - self.code.rfind('\n', 0, new_i+1))
-        return new_i, new_line, new_column
+    @property
+    def column(self):
+        return self.lines.column(self.i)
 
     def __add__(self, other):
-        return Indexer(self.code, *self._add(other))
-    #
-    # def __iadd__(self, other):
-    #     self.i, self.line, self.column = self._add(other)
-    #     return self
+        return Indexer(self.code, self.i + other, self.lines, self.token)
 
     def __gt__(self, other):
         return self.i > getattr(other, 'i', other)
@@ -34,33 +83,43 @@ class Indexer:
         return self.i
 
     def get_token(self, length):
-        return Token(
-            self.line,
-            self.column,
-            self.i,
-            self.code,
-            length,
-            short_repr=self.shrort_repr
-        )
+        return self.token(self.code, self.i, length, lines=self.lines)
 
     def __repr__(self):
         return f"Indexer({self.i}, {self.line}, {self.column})"
 
-class Token(str):
-    def __new__(cls, start_line: int, start_column: int, offset: int, code: str, length: int, *, short_repr=False):
-        frag = code[offset:offset + length]
-        end_line = start_line + frag.count('\n')
-        end_column = start_column + length if end_line == start_line else length - frag.rfind('\n')
-        end_offset = offset + length
-        self = super().__new__(cls, frag)
-        self.start_line = start_line
-        self.start_column = start_column
-        self.end_line = end_line
-        self.end_column = end_column
-        self.offset = offset
-        self.end_offset = end_offset
 
-        self.short_repr = short_repr
+class _Position:
+    __slots__ = ()
+
+    @property
+    def start_line(self):
+        return self.lines.line(self.offset)
+
+    @property
+    def start_column(self):
+        return self.lines.column(self.offset)
+
+    @property
+    def end_line(self):
+        return self.lines.line(self.end_offset)
+
+    @property
+    def end_column(self):
+        return self.lines.column(self.end_offset)
+
+
+class Token(_Position, str):
+    """
+    A fragment of the source.
+    Its position (start_line, start_column, end_line, end_column) is computed when asked.
+    """
+    def __new__(cls, code: str, offset: int, length: int, *, lines: LineIndex = None, short_repr=None):
+        self = super().__new__(cls, code[offset:offset + length])
+        self.lines = lines or LineIndex(code)
+        self.offset = offset
+        self.end_offset = offset + length
+        self.short_repr = Indexer.shrort_repr if short_repr is None else short_repr
         return self
 
     def __repr__(self):
@@ -69,9 +128,72 @@ class Token(str):
         return f"Token({self.start_line}, {self.start_column}, {self.offset}, {super().__repr__()}, {len(self)})"
 
 
-# code = """
-# ABC
-# DEF
-# GHI
-# """
-# print(repr(Token(1, 1, 2, code, 3)))
+class Span(_Position):
+    """
+    A fragment of the source stored as its offsets, lighter than a Token.
+    Its text is only sliced when asked (str(span), span.text), but it compares and hashes like it,
+    so it can be matched against strings or used as a dict key.
+    Use join to get the text of several spans.
+    """
+    __slots__ = ("code", "offset", "end_offset", "lines")
+
+    def __init__(self, code: str, offset: int, length: int, *, lines: LineIndex = None):
+        self.code = code
+        self.offset = offset
+        self.end_offset = offset + length
+        self.lines = lines or LineIndex(code)
+
+    @property
+    def text(self) -> str:
+        return self.code[self.offset:self.end_offset]
+
+    __str__ = text.fget
+
+    def __len__(self):
+        return self.end_offset - self.offset
+
+    def __eq__(self, other):
+        if isinstance(other, Span):
+            return self.text == other.text
+        if isinstance(other, str):
+            return len(other) == len(self) and self.code.startswith(other, self.offset)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.text)
+
+    def __add__(self, other):
+        return self.text + other
+
+    def __radd__(self, other):
+        return other + self.text
+
+    def __format__(self, format_spec):
+        return format(self.text, format_spec)
+
+    def __repr__(self):
+        return f"Span({self.start_line}, {self.start_column}, {self.offset}, {self.text!r}, {len(self)})"
+
+
+def line_text(code, lineno: int) -> str:
+    """The text of the line lineno (counted from 1) of code, found by offset instead of splitting the whole code"""
+    start = 0
+    for _ in range(lineno - 1):
+        start = code.find("\n", start) + 1
+        if not start:
+            return ""
+    end = code.find("\n", start)
+    return code[start:end if end != -1 else len(code)]
+
+
+def join(parts) -> str:
+    """The text of a sequence of Tokens or Spans. Spans following each other in the source are sliced at once"""
+    if parts and isinstance(parts[0], Span):
+        first, end = parts[0], parts[0].end_offset
+        for part in parts[1:]:
+            if not isinstance(part, Span) or part.offset != end or part.code is not first.code:
+                break
+            end = part.end_offset
+        else:
+            return first.code[first.offset:end]
+    return "".join(map(str, parts))
@@ -1,35 +1,49 @@
-from parser_v2.struct import BasicStruct, _get
+from parser_v2.struct import BasicStruct, _get, _token
+from parser_v2.token import Span
 
 
 class Partial(BasicStruct):
+    memoizable = False  # The struct it resolves to is memoized instead
+
     def get(self, namespace):
         raise NotImplementedError
 
     def add(self, other):
-        return Transformer(lambda ns: self.get(ns) + _get(other, ns))
+        return Transformer(lambda ns: self.get(ns) + _get(other, ns), depends=(self, other))
 
     def mul(self, other):
-        return Transformer(lambda ns: self.get(ns) * _get(other, ns))
+        return Transformer(lambda ns: self.get(ns) * _get(other, ns), depends=(self, other))
 
     def ifelse(self, true, false):
-        return Transformer(lambda ns: _get(true, ns) if self.get(ns) else _get(false, ns))
+        return Transformer(lambda ns: _get(true, ns) if self.get(ns) else _get(false, ns), depends=(self, true, false))
 
     def _parse(self, namespace, index, code) -> (object | None, int):
         value = self.get(namespace)
+        if isinstance(value, Span):
+            value = value.text
         if isinstance(value, BasicStruct):
             return value.parse(namespace, index, code)
         elif isinstance(value, str):
             if code.startswith(value, index):
-                return index.get_token(len(value)), index + len(value)
+                return _token(namespace, code, index, len(value)), index + len(value)
             else:
                 return None, index
         raise TypeError(f"Value of {self} cannot be used to parse")
 
 class Transformer(Partial):
-    def __init__(self, transform):
+    def __init__(self, transform, depends=None):
+        """
+        :param transform: a function namespace -> value
+        :param depends: the values used by transform, if known. Needed by the memoization to know what the
+            transformer reads in the namespace, None means it may read anything.
+        """
         self.transform = transform
+        self.depends = depends
         super(Transformer, self).__init__()
 
+    def children(self):
+        return [value for value in self.depends or () if isinstance(value, BasicStruct)]
+
     def __str__(self):
         return f"{self.name or 'Transformer'}({self.transform!r})"
 
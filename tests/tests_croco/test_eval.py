@@ -1,7 +1,10 @@
+import dis
 import unittest
 from textwrap import dedent
 
 import croco
+from croco.parser import blocks, croco_compile, first_pass
+from croco.parser.incremental import _collect_nodes
 
 
 class TestEval(unittest.TestCase):
@@ -132,3 +135,31 @@ class TestEval(unittest.TestCase):
             "{1, 2, 3}": {1, 2, 3}
         }
         self.assert_list(tests)
+
+    def test_slots(self):
+        code = "for i in [1, (2, 3)]:\n    if i:\n        continue\n    a.b[i] = i + 1 < 2\n"
+        tree = croco.parser.crocoparser.parse(code)
+        nodes = []
+        _collect_nodes(first_pass.first_pass(tree, "test"), nodes, set())
+        self.assertEqual(len(nodes), 19)  # The collections of constants are folded
+        for node in nodes:
+            self.assertFalse(hasattr(node, "__dict__"), type(node).__name__)  # The attributes of the passes too
+        (continue_,) = [node for node in nodes if isinstance(node, blocks.Continue)]
+        self.assertIs(continue_.loop, tree.statements[0])
+        self.assertEqual(tree.filename, "test")
+
+    def test_folding(self):
+        for code, value, consts in [("60*60*24", 86400, (86400,)), ("1 < 2 <= 2 != 3", True, (True,)),
+                                    ("1 + 1.0 - 1", 1.0, (1.0,)), ("(1, 2 * 2.5), 1 == 1.0", ((1, 5.0), True), None),
+                                    ("2 ** 200 > 0", True, (2, 200, 0)), ("'ab' * 3000", "ab" * 3000, ("ab", 3000)),
+                                    ("1 << 2", 4, (4,)), ("'%s' % 1", "1", ("%s", 1))]:
+            with self.subTest(code=code):
+                compiled = croco_compile(code, mode="eval")
+                self.assertEqual(croco.run(code, mode="eval"), value)
+                self.assertEqual(type(croco.run(code, mode="eval")), type(value))
+                self.assertEqual(compiled.co_consts, consts or (value,))
+        self.assertRaises(ZeroDivisionError, croco.run, "1 / 0", mode="eval")  # Raised when it runs
+        self.assertRaises(TypeError, croco.run, "1 < 'a'", mode="eval")
+        code = croco_compile("for i in {1, 2}:\n    print(i * 2)\nfor j in [3, 4]:\n    print(j)\n")
+        self.assertEqual(code.co_consts[:3], (frozenset({1, 2}), 2, (3, 4)))
+        self.assertNotIn("BUILD_SET", [dis.opname[op] for op in code.co_code[::2]])
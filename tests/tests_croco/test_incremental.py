@@ -0,0 +1,53 @@
+import unittest
+from textwrap import dedent
+
+from croco.parser import crocoparser
+from croco.parser.incremental import IncrementalParse
+from croco.parser.lexer import tokenize
+
+CODE = dedent("""
+    a = 1
+    if a:
+        b = [1,
+             2]
+    else:
+        b = 3
+    for x in b:
+        print(x)
+    c = a + 2
+""")[1:]
+
+
+class TestIncremental(unittest.TestCase):
+    def assert_edits(self, edits):
+        parse = IncrementalParse(CODE)
+        code = CODE
+        for old, new in edits:
+            with self.subTest(old=old, new=new):
+                start = code.index(old)
+                block = parse.edit(start, start + len(old), new)
+                code = code[:start] + new + code[start + len(old):]
+                self.assertEqual(parse.code, code)
+                self.assertEqual(repr(block), repr(crocoparser.parse(code)))
+                expected = tokenize(code)
+                self.assertEqual([parse.tokens[k] for k in range(len(parse.tokens))],
+                                 [expected[k] for k in range(len(expected))])
+
+    def test_edits(self):
+        self.assert_edits([
+            ("1\n", "10\n"),
+            ("c = ", "d = 5\nc = "),  # A line added, the next items are moved
+            ("    b = 3\n", "    b = 4\n    b = 5\n"),
+            ("else:\n    b = 4\n    b = 5\n", ""),  # The if loses its else
+            ("for", "elif c:\n    b = 4\nfor"),
+            ("2]", "2,\n        3]"),
+            ("print(x)", "x"),
+            ("", "e = 1\n"),
+        ])
+
+    def test_error(self):
+        parse = IncrementalParse(CODE)
+        block = repr(parse.block)
+        self.assertRaises(SyntaxError, parse.edit, 0, 1, "(")
+        self.assertEqual((parse.code, repr(parse.block)), (CODE, block))
+        self.assertEqual(repr(parse.edit(len(CODE), len(CODE), "d = 1\n")), repr(crocoparser.parse(CODE + "d = 1\n")))
@@ -0,0 +1,111 @@
+import glob
+import os
+import tempfile
+import unittest
+from textwrap import dedent
+
+from croco.parser import crocoparser, croco_compile
+from croco.parser.lexer import tokenize, tokens_for, KIND_NAMES
+from parser_v2 import ByteSource
+
+CODE = dedent("""
+    a = 1.5 + .5  # comment
+    if a:
+        b = [1,
+          # inside
+             'x']
+
+            # deeper
+        c = \\
+      2
+    \tif c:
+    \t\td = "y"
+    e
+""")[1:]
+
+
+def kinds_and_texts(tokens):
+    return [(KIND_NAMES[kind], span.text) for kind, span in tokens]
+
+
+def dump(tokens):
+    return [tokens[k] for k in range(len(tokens))], list(tokens.indents())
+
+
+class TestLexer(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(kinds_and_texts(tokenize(CODE)), [
+            ("NAME", "a"), ("OP", "="), ("NUMBER", "1.5"), ("OP", "+"), ("NUMBER", ".5"), ("COMMENT", "# comment"),
+            ("NEWLINE", "\n"),
+            ("NAME", "if"), ("NAME", "a"), ("OP", ":"), ("NEWLINE", "\n"),
+            ("INDENT", "    "), ("NAME", "b"), ("OP", "="), ("OP", "["), ("NUMBER", "1"), ("OP", ","), ("NL", "\n"),
+            ("COMMENT", "# inside"), ("NL", "\n"), ("STRING", "'x'"), ("OP", "]"), ("NEWLINE", "\n"),
+            ("NL", "\n"), ("COMMENT", "# deeper"), ("NL", "\n"),
+            ("NAME", "c"), ("OP", "="), ("NUMBER", "2"), ("NEWLINE", "\n"),
+            ("NAME", "if"), ("NAME", "c"), ("OP", ":"), ("NEWLINE", "\n"),
+            ("INDENT", "\t"), ("NAME", "d"), ("OP", "="), ("STRING", '"y"'), ("NEWLINE", "\n"),
+            ("DEDENT", ""), ("DEDENT", ""), ("NAME", "e"), ("NEWLINE", "\n"),
+        ])
+        tokens = tokenize("if a:\n\t\tb")  # One INDENT per unit, the DEDENTs are added at the end
+        self.assertEqual([KIND_NAMES[kind] for kind, _ in tokens][-5:], ["INDENT", "INDENT", "NAME", "DEDENT", "DEDENT"])
+        self.assertEqual(tokens.at(len("if a:\n\t")), 5)
+        self.assertEqual(list(tokens.indents()), [(0, 0, 0), (6, 2, 8)])
+
+    def test_byte_source(self):
+        with open("examples/dichtomic_research.crc") as f:
+            example = f.read()
+        with tempfile.TemporaryDirectory() as directory:
+            for code in (CODE, example):
+                path = os.path.join(directory, "code.crc")
+                with open(path, "w", newline="") as f:
+                    f.write(code)
+                source = ByteSource.open(path)  # The memory map of the file
+                self.assertIsInstance(source, ByteSource)
+                self.assertEqual(dump(tokenize(source)), dump(tokenize(code)))
+                if code is example:
+                    self.assertEqual(croco_compile(source).co_code, croco_compile(code).co_code)
+                source.data.close()
+
+    def test_errors(self):
+        for code, message in [("a = 'b\n", "Unclosed quote line 1"), ("a)\n", "Unmatched ')' line 1"),
+                              ("f(a,\n", "Unclosed bracket at the end of the code, line 2"),
+                              ("a\n$", "Unexpected character '$' line 2"),
+                              ("(a \\\n)", "Unexpected line continuation in brackets line 1")]:
+            with self.subTest(code=code):
+                with self.assertRaises(SyntaxError) as error:
+                    tokenize(code)
+                self.assertEqual(error.exception.msg, message)
+                self.assertIsNone(tokens_for(code))
+        with self.assertRaises(SyntaxError) as error:  # The grammar gives the error
+            croco_compile("a = 'b\n")
+        self.assertEqual(error.exception.msg, "Unclosed quote '''")
+
+    def test_parse(self):
+        sources = [CODE.replace("    # deeper\n", ""), "x = (1,\n  # c\n 2.)\n", "if a:\n  b\n  c\n",
+                   "a # c\n   # d\n", "a = 1; b = 2;\nd\n", "if a:\n    b\n        c\n"]
+        for path in glob.glob("examples/*.crc") + ["testfile.crc"]:
+            with open(path) as f:
+                sources.append(f.read())
+        for code in sources:
+            for engine in ("interpreted", "compiled", "iterative"):
+                with self.subTest(code=code, engine=engine):
+                    try:
+                        expected = repr(crocoparser.parse(code, engine=engine))
+                    except SyntaxError as e:
+                        expected = repr(e)
+                    try:
+                        result = repr(crocoparser.parse(code, engine=engine, namespace={"tokens": tokenize(code)}))
+                    except SyntaxError as e:
+                        result = repr(e)
+                    self.assertEqual(result, expected)
+
+    def test_edited(self):
+        tokens, code = tokenize(CODE), CODE
+        for old, new in [("1.5", "1"), ("if a:", "if a and b:"), ("\n\n", "\n"), ("\ne\n", "\nf = (\n1)\n"),
+                         ("\t\td", "\t\tdd\n\t\td"), ("a = ", "x\na = "), ("'x'", "'x',\n'y'")]:
+            with self.subTest(old=old, new=new):
+                start = code.index(old)
+                code = code[:start] + new + code[start + len(old):]
+                tokens = tokens.edited(code, start, start + len(old), len(new))
+                self.assertEqual(dump(tokens), dump(tokenize(code)))
+        self.assertRaises(SyntaxError, tokens.edited, code + "(", len(code), len(code), 1)
@@ -0,0 +1,52 @@
+import glob
+import unittest
+from textwrap import dedent
+
+from croco.parser import crocoparser, croco_compile
+from croco.parser.lexer import tokenize
+from croco.parser.parallel import chunks, parse_parallel
+
+CODE = dedent("""
+    a = 1
+    if a:
+        b = [1,
+    2]
+    else:
+        b = 3
+    # comment
+    c = a + \\
+    2
+    for x in b:
+        print(x)
+
+    d = 'e'
+""")[1:]
+
+
+class TestParallel(unittest.TestCase):
+    def test_top_level(self):
+        starts = list(tokenize(CODE).top_level())
+        self.assertEqual([CODE[start:CODE.index("\n", start)] for start in starts],
+                         ["a = 1", "if a:", "c = a + \\", "for x in b:", "d = 'e'"])
+        self.assertEqual(chunks(tokenize(CODE), 4, min_chunk=5), [(0, 53), (53, 91), (91, len(CODE))])
+        self.assertEqual(chunks(tokenize(CODE), 4, min_chunk=10), [(0, 53), (53, len(CODE))])
+
+    def test_parse(self):
+        sources = [CODE]
+        for path in glob.glob("examples/*.crc") + ["testfile.crc"]:
+            with open(path) as f:
+                sources.append(f.read())
+        code = "\n".join(sources)
+        self.assertEqual(croco_compile(code, jobs=2).co_code, croco_compile(code).co_code)  # Too small to be split
+        code *= 3
+        self.assertEqual(repr(parse_parallel(code, jobs=2, min_chunk=100)), repr(crocoparser.parse(code)))
+
+    def test_errors(self):
+        code = CODE * 3 + "if a:\nb\n" + CODE
+        with self.assertRaises(SyntaxError) as expected:
+            crocoparser.parse(code)
+        with self.assertRaises(SyntaxError) as error:
+            parse_parallel(code, jobs=2, min_chunk=10)
+        self.assertEqual((error.exception.msg, error.exception.lineno),
+                         (expected.exception.msg, expected.exception.lineno))
+        self.assertEqual(list(tokenize("if a:\nb\n").top_level()), [0])  # The block of the if is missing
@@ -0,0 +1,29 @@
+import asyncio
+import unittest
+
+from croco.parser.repl import start_server
+
+
+class TestAsyncRepl(unittest.TestCase):
+    def test_sessions(self):
+        async def session(port, lines):
+            reader, writer = await asyncio.open_connection("localhost", port)
+            for line in lines:
+                writer.write(line.encode() + b"\n")
+                await asyncio.sleep(0.01)
+            writer.write_eof()
+            output = await reader.read()
+            writer.close()
+            return output.decode()
+
+        async def main():
+            server = await start_server()
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await asyncio.gather(session(port, ["x = 3", "", "x*2", ""]),
+                                            session(port, ["print(", "'hey')", "", "(", ""]))
+
+        first, second = asyncio.run(main())
+        self.assertEqual(first, ">>> ... >>> ... 6\n>>> ")
+        self.assertTrue(second.startswith(">>> ... ... hey\n>>> ... Traceback"), second)
+        self.assertTrue(second.endswith("SyntaxError: expected an expression\n>>> "), second)
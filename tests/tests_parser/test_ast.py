@@ -0,0 +1,36 @@
+import unittest
+
+from parser import *
+from parser.structure import Char, SequenceStruct, saved_as
+
+
+class Pair(ast.Node):
+    __slots__ = ("key", "value")
+
+
+class TestAst(unittest.TestCase):
+    def test_nodes(self):
+        parser = Parser()
+        number = saved_as(Repeat(Char(DIGITS), MINI1.count), "value")
+        sequence = SequenceStruct(saved_as(Char(LETTERS), "key"), "=", number)
+        tree, used = parser.parse("a=12", sequence)
+        self.assertEqual((type(tree).__name__, type(tree).__slots__, used), ("AST", ("key", "value"), 4))
+        self.assertIsInstance(tree, ast.Node)
+        self.assertFalse(hasattr(tree, "__dict__"))
+        self.assertEqual((tree.key, list(tree.value), tree["key"]), ("a", ["1", "2"], "a"))
+        self.assertEqual(repr(tree), repr(ast.AST(key="a", value=tree.value)))
+        self.assertIs(ast.node_class(("key", "value")), type(tree))
+
+        declared = SequenceStruct(saved_as(Char(LETTERS), "key"), "=", number, node=Pair)
+        tree, _ = parser.parse("b=3", declared)
+        self.assertEqual((type(tree), Pair._fields), (Pair, ("key", "value")))
+        self.assertEqual(tree.attrs, {"key": "b", "value": tree.value})
+        self.assertRaises(AttributeError, getattr, Pair(key="c"), "value")
+        self.assertIs(ast.node_class(("a-b",)), ast.AST)
+        self.assertIs(ast.node_class(("attrs",)), ast.AST)
+        self.assertEqual(parser.parse("c", SequenceStruct(saved_as(Char(LETTERS), "class")))[0]["class"], "c")
+
+    def test_list(self):
+        items = ast.List([1, 2], name="n")
+        self.assertEqual((list(items), items.name, items.attrs), ([1, 2], "n", {"name": "n", "__items__": [1, 2]}))
+        self.assertFalse(hasattr(items, "__dict__"))
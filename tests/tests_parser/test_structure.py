@@ -0,0 +1,54 @@
+import unittest
+
+from parser import *
+from parser.structure import BasicStruct, Char, FirstStruct, SequenceStruct, StructGetter, saved_as
+
+
+class Upper(BasicStruct):
+    """A structure written for slices, defining only extract"""
+    def extract(self, tokens, struct_map):
+        if tokens and tokens[0].char.isupper():
+            return tokens[0].char, 1
+        return None, 0
+
+
+def get_parser(*letters):
+    parser = Parser()
+    Structure(Repeat(Char(DIGITS), MINI1.count), "number", parser=parser)
+    item = FirstStruct(StructGetter("number"), SequenceStruct("(", saved_as(StructGetter("list"), "inner"), ")"),
+                       *letters)
+    items = Repeat(SequenceStruct(saved_as(item, "item"), Char(",") * (0, 1), sep=[" "]), MINI0.count)
+    Structure(items, "list", parser=parser)
+    end = Char(";", excluded=True, noescape=True) * (0, 1)
+    parser.majorstruct = SequenceStruct(saved_as(StructGetter("list"), "list"), saved_as(end, "end"))
+    return parser
+
+
+def simplify(tree):
+    """The items of the list of a tree, as lists of digits, letters and sublists"""
+    items = []
+    for part in tree:
+        item = part.item
+        if isinstance(item, str):
+            items.append(item)
+        elif isinstance(item, ast.List):
+            items.append("".join(item))
+        else:
+            items.append(simplify(item.inner))
+    return items
+
+
+class TestStructure(unittest.TestCase):
+    def test_extract(self):
+        parser = get_parser(Upper())
+        tree, used = parser.parse(r"1, (A 23),B\;")
+        self.assertEqual((simplify(tree.list), list(tree.end), used), (["1", ["A", "23"], "B"], [";"], 12))
+        self.assertEqual(parser.parse("1;")[1], 1)  # The end is any character but an unescaped ;
+        self.assertEqual(String("ab").extract_at(parser._lex("xab"), 1, {}), ("ab", 2))
+        self.assertEqual(String("ab").extract(parser._lex("xab"), {}), (None, 0))
+
+    def test_long_input(self):
+        parser = get_parser()
+        code = "12, (3, 4), " * 2000  # The structures move an offset instead of copying the tokens
+        tree, used = parser.parse(code)
+        self.assertEqual((len(simplify(tree.list)), used), (4000, len(code)))
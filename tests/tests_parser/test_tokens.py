@@ -0,0 +1,17 @@
+import unittest
+from array import array
+
+from parser._tokens import CharToken, CharTokens, tokennify
+
+
+class TestTokens(unittest.TestCase):
+    def test_tokennify(self):
+        tokens = tokennify(r"a\bc\\", {"\\"})
+        self.assertIsInstance(tokens, CharTokens)
+        self.assertEqual((tokens.text, list(tokens.escaped)), ("abc\\", [0, 1, 0, 1]))
+        self.assertEqual(tokens, [CharToken("a"), CharToken("b", True), CharToken("c"), CharToken("\\", True)])
+        self.assertEqual((tokens[1], tokens[-1].char, len(tokens)), (CharToken("b", True), "\\", 4))
+        self.assertEqual(tokens[1:3], CharTokens("bc", tokens.escaped[1:3]))
+        self.assertEqual(tokennify("a]b", {"]", "^"}), CharTokens("ab", array("B", [0, 1])))
+        self.assertEqual(tokennify("ab", frozenset()), CharTokens("ab"))
+        self.assertRaises(Exception, tokennify, "ab\\", {"\\"})
@@ -0,0 +1,57 @@
+import unittest
+
+from parser_v2 import *
+from parser_v2 import analysis
+
+
+class TestAnalysis(unittest.TestCase):
+    def test_sets(self):
+        class A(Parser):
+            number = Repeat(Any(*"01"), mini=1)
+            spaces = Str(" ") * REPEAT
+            __start__ = pair = Sequence("(", number, spaces, Repeat(number, join=","), ")")
+
+        self.assertEqual((A.number.first, A.number.nullable), (frozenset("01"), False))
+        self.assertEqual((A.spaces.first, A.spaces.nullable), (frozenset(" "), True))
+        self.assertIsNone(Sequence(Var("x"), "a").first)
+        self.assertEqual(A.pair.follow, frozenset([analysis.END_OF_INPUT]))
+        self.assertEqual(A.number.follow, frozenset(" 01,)"))
+        self.assertEqual(A.spaces.follow, frozenset("01)"))
+        self.assertEqual(A.__analysis__.hazards, [])
+
+    def test_shared_dispatch(self):
+        item = Any(Sequence(Var("x"), "!"), Var("x"), Str("z"))
+
+        class A(Parser):
+            x = Str("a")
+            __start__ = item
+
+        class B(Parser):
+            x = Str("b")
+            __start__ = item
+
+        for engine in ("interpreted", "compiled", "iterative"):
+            with self.subTest(engine=engine):
+                self.assertEqual(A.parse("a", engine=engine), "a")
+                self.assertEqual(B.parse("b", engine=engine), "b")
+                self.assertEqual(A.parse("z", engine=engine), "z")
+                self.assertRaises(SyntaxError, A.parse, "b", engine=engine)
+                self.assertEqual(A.parse("b", engine=engine, namespace={"x": Str("b")}), "b")
+                self.assertEqual(A.parse("b!", engine=engine, namespace={"x": Str("b")}), ("b", "!"))
+        self.assertIsNot(A.__analysis__.dispatch, B.__analysis__.dispatch)
+        self.assertEqual(A.__analysis__.dispatch[id(item)][1], tuple(item.values[:2]))  # Tried in order
+
+    def test_hazards(self):
+        class A(Parser):
+            word = Repeat(Any(*"abcdefi"), mini=1)
+            keyword = Any("if", "else")
+            spaces = Str(" ") * REPEAT
+            __start__ = line = Sequence(Any(keyword, word), Any("=", "=="), spaces * REPEAT)
+
+        kinds = [(hazard.kind, hazard.struct) for hazard in A.__analysis__.hazards]
+        self.assertEqual(len(kinds), 3)
+        self.assertIn(("nullable-loop", A.line.values[2]), kinds)
+        self.assertIn(("shadowed", A.line.values[0]), kinds)  # "iffy" is cut after "if"
+        self.assertIn(("shadowed", A.line.values[1]), kinds)  # "==" is never matched
+        self.assertIn("3 hazard(s)", A.__analysis__.report())
+        self.assertIn("word: first={'a', 'b', 'c', 'd', 'e', 'f', 'i'} follow={'='}", A.__analysis__.report())
@@ -1,19 +1,54 @@
 import unittest
 
-from parser_v2.struct import Str, Any
-from parser_v2.token import Indexer
+from parser_v2.analysis import dispatch_of
+from parser_v2.struct import Str, Any, Repeat, Not
+from parser_v2.token import Indexer, Span, join
 
 class TestBasic(unittest.TestCase):
     def test_str(self):
         struct = Str("abc")
         for code in (" abc", "ab", ""):
-            self.assertEqual(struct.parse({}, Indexer(code), code), (None, 0))
+            self.assertEqual(struct.parse({}, 0, code), (None, 0))
         for code in ("abc", "abcde"):
-            self.assertEqual(struct.parse({}, Indexer(code), code), ("abc", 3))
+            self.assertEqual(struct.parse({}, 0, code), ("abc", 3))
 
     def test_any(self):
         struct = Any("abc", "def")
         for code in (" abc", "ab", "deabc"):
-            self.assertEqual(struct.parse({}, Indexer(code), code), (None, 0))
+            self.assertEqual(struct.parse({}, 0, code), (None, 0))
         for code in ("abc", "def", "abcde", "defgh"):
-            self.assertEqual(struct.parse({}, Indexer(code), code), (code[:3], 3))
+            self.assertEqual(struct.parse({}, 0, code), (code[:3], 3))
+
+    def test_any_dispatch(self):
+        struct = Any("ab", Repeat("x", mini=1), "a", Not("b", increment=0), "b")
+        for code, expected in (("ab", ("ab", 2)), ("ac", ("a", 1)), ("xx", (["x", "x"], 2)), ("b", ("b", 1)),
+                               ("c", ("", 0)), ("", ("", 0))):
+            with self.subTest(code=code):
+                self.assertEqual(struct.parse({}, 0, code), expected)
+        dispatch, fallback = dispatch_of(struct)
+        self.assertEqual(set(dispatch), set("axb"))
+        self.assertEqual(fallback, (struct.values[3],))
+
+    def test_positions(self):
+        code = "ab\ncde\n\nf"
+        index = Indexer(code)
+        for offset, line, column in ((0, 0, 1), (2, 0, 3), (3, 1, 1), (6, 1, 4), (7, 2, 1), (8, 3, 1), (9, 3, 2)):
+            with self.subTest(offset=offset):
+                self.assertEqual(((index + offset).line, (index + offset).column), (line, column))
+        token = (index + 1).get_token(4)
+        self.assertEqual(token, "b\ncd")
+        self.assertEqual((token.start_line, token.start_column, token.end_line, token.end_column), (0, 2, 1, 3))
+        self.assertEqual((token.offset, token.end_offset), (1, 5))
+
+    def test_span(self):
+        code = "ab\ncd"
+        index = Indexer(code, token=Span)
+        spans = [(index + i).get_token(1) for i in range(5)]
+        self.assertEqual(spans[0], "a")
+        self.assertEqual({spans[1]: 1}["b"], 1)
+        self.assertEqual(str(spans[3]), "c")
+        self.assertEqual(f"{spans[4]}!", "d!")
+        self.assertEqual((spans[3].start_line, spans[3].start_column), (1, 1))
+        self.assertEqual(join(spans), code)
+        self.assertEqual(join([spans[0], spans[3]]), "ac")
+        self.assertEqual(Any("ab", "cd").parse({}, index, code), ("ab", 2))
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from parser_v2 import *
+
+
+class Lines(Parser, token=Span):
+    word = Any(*"abcdefgh\u00e9") * MINI_1
+    line = Repeat(Sequence(word, Repeat(" ")).set_factory(lambda v: join(v[0])))
+    __start__ = Sequence(Repeat(line, join="\n"), END.expect("Unexpected character"), factory=lambda v: v[0])
+
+
+class TestByteSource(unittest.TestCase):
+    def test_parse(self):
+        code = "ab cd\n\nefg h"
+        source = ByteSource(code.encode())
+        self.assertIsNotNone(Lines.word.regex)
+        self.assertEqual((source[1], source[3:5], source.find("\n", 6), source.startswith("cd", 3)), ("b", "cd", 6, True))
+        for engine in ("interpreted", "compiled"):
+            with self.subTest(engine=engine):
+                self.assertEqual(Lines.parse(source, engine=engine), Lines.parse(code, engine=engine))
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.txt")
+            for content, expected in [(b"ab\ncd", ByteSource), (b"ab\r\ncd", str), ("ab\ncd\u00e9".encode(), str)]:
+                with self.subTest(content=content):
+                    with open(path, "wb") as f:
+                        f.write(content)
+                    source = ByteSource.open(path)
+                    self.assertIsInstance(source, expected)  # The other files are decoded
+                    if expected is ByteSource:
+                        with source:
+                            self.assertEqual(source[:2], "ab")
+                        self.assertTrue(source.data.closed)
+                        self.assertRaises(ValueError, source.__getitem__, 0)
+                    self.assertEqual(parse_file(Lines, path, mapped=True) == [["ab"], ["cd"]], content.isascii())
+            with open(path, "w") as f:
+                f.write("ab\ncd\nef 0\ngh")
+            for mapped in (False, True):
+                with self.subTest(mapped=mapped):
+                    with self.assertRaises(SyntaxError) as context:
+                        parse_file(Lines, path, mapped=mapped)
+                    self.assertEqual((context.exception.lineno, context.exception.text), (3, "ef 0"))
@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+
+from parser_v2 import *
+
+
+def stream(*inputs, chunk_size=None):
+    inputs = iter([*inputs, None])
+    stream = CharStream(inputs.__next__)
+    if chunk_size is not None:
+        stream.chunk_size = chunk_size
+    return stream
+
+
+class TestCharStream(unittest.TestCase):
+    def test_access(self):
+        for chunk_size in (1, 4096):
+            with self.subTest(chunk_size=chunk_size):
+                s = stream("ab", "", "cd\n", "e", chunk_size=chunk_size)
+                self.assertEqual(s[1], "b")
+                self.assertEqual(len(s), 2)  # Nothing more is read
+                self.assertEqual(s[1:4], "b")  # Slices only see what was read
+                self.assertFalse(s.startswith("ax", 0))
+                self.assertEqual(len(s), 2)  # The mismatch was found without reading
+                self.assertTrue(s.startswith("bcd", 1))
+                self.assertEqual((s[0:5], s[-1], s.find("cd"), s.find("bc", 0, 2), s.find("\n", 4)), ("abcd\n", "\n", 2, -1, 4))
+                self.assertEqual((s[5], s[6], len(s), s.buffer), ("e", "", 6, "abcd\ne"))
+                self.assertFalse(s.startswith("ef", 5))
+
+    def test_parse(self):
+        class A(Parser):
+            line = Repeat(Not(Str("\n")), factory=join)
+            __start__ = Repeat(line, join="\n") + END
+
+        self.assertEqual(A(stream("line1\n", "li", "ne2")), (["line1", "line2"], True))
+
+    def test_async(self):
+        class A(Parser):
+            line = Repeat(Not(Str("\n")), factory=join)
+            __start__ = Repeat(line, join="\n") + END
+
+        async def session(inputs):
+            inputs = iter(inputs)
+
+            async def ask_input():
+                await asyncio.sleep(0)
+                return next(inputs, None)
+
+            return await A.parse_async(AsyncCharStream(ask_input))
+
+        async def main():
+            return await asyncio.gather(session(["a\n", "b"]), session(["c", "d\ne\n"]))
+
+        self.assertEqual(asyncio.run(main()), [(["a", "b"], True), (["cd", "e", ""], True)])
@@ -0,0 +1,103 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from parser_v2 import *
+from parser_v2 import codegen
+
+
+class JsonParser(Parser):
+    _spaces = Any(*" \t\n\r") * REPEAT
+    string = (Str('"') + ~Str('"') * REPEAT + Str('"').expect("Expected end of string"))\
+        .set_factory(lambda v: "".join(v[1]))
+    number = Repeat(Any(*"0123456789"), mini=1, factory=lambda chars: int("".join(chars)))
+    pair = (_spaces + string + _spaces + Str(":") + Var("value")).set_factory(lambda v: (v[1], v[4]))
+    object = (Str("{") + pair*(0, None, ",") + Str("}").expect("Expected end of object"))\
+        .set_factory(lambda v: dict(v[1]))
+    list = (Str("[") + Var("value")*(0, None, ",") + Str("]").expect("Expected end of list"))\
+        .set_factory(lambda v: v[1])
+    keyword = Any("true", "false", "null")
+    __start__ = value = (_spaces + Any(string, number, object, list, keyword) + _spaces).set_factory(lambda v: v[1])
+
+
+class IndentParser(Parser):
+    indent = 0
+    INDENT = Str(" ") * Var("indent")
+    WORD = Repeat(Not(Any(*":\n")), mini=1, factory="".join)
+    LINE = (INDENT + WORD
+            + (Str(":\n") + UNS(Var("BLOCK"), indent=Var("indent").add(1))).set_factory(lambda v: v[1]) * OPT
+            ).set_factory(lambda v: [v[1]] + v[2])
+    BLOCK = Repeat(LINE, mini=1, join="\n")
+    __start__ = BLOCK
+
+
+def run(parser, code, **kwargs):
+    try:
+        return "ok", repr(parser.parse(code, **kwargs))
+    except Exception as e:
+        return type(e), str(e), getattr(e, "lineno", None)
+
+
+class TestCodegen(unittest.TestCase):
+    def assertSameResults(self, parser, codes):
+        for code in codes:
+            for memo in (False, True):
+                with self.subTest(code=code, memo=memo):
+                    expected = run(parser, code, memo=memo, engine="interpreted")
+                    self.assertEqual(run(parser, code, memo=memo, engine="compiled"), expected)
+                    self.assertEqual(run(parser, code, memo=memo, engine="iterative"), expected)
+
+    def test_json(self):
+        self.assertSameResults(JsonParser, [
+            '{"a" : 1, "b":2 }', '[1, [2, [true, null]], {"c": "d"}]', ' "abc" ', "[1, 2", '{"a": 1', '"abc',
+            "[1,]", "", "12 3",
+        ])
+
+    def test_indents(self):
+        self.assertSameResults(IndentParser, ["a:\n b:\n  c\n d\ne", "a:\n  b", "a:\nb", "a\n\nb", ":"])
+
+    def test_croco(self):
+        from croco.parser.syntax import crocoparser
+        path = Path(__file__).parents[2] / "examples" / "dichtomic_research.crc"
+        self.assertSameResults(crocoparser, [
+            path.read_text(), "a.b(1)[2] = 3", "a = [1, 2", "if a:\nb", "x = 'abc", "1 +", "if 1:\n        a",
+            "a = 1\nif a = 4:\n    b\n",
+        ])
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            compiled = codegen.compile_grammar(JsonParser, directory)
+            files = list(Path(directory).iterdir())
+            self.assertEqual(len(files), 1)
+            self.assertIn(compiled.digest, files[0].name)
+            again = codegen.compile_grammar(JsonParser, directory)
+            self.assertEqual(again.digest, compiled.digest)
+            self.assertEqual(list(Path(directory).iterdir()), files)
+            files[0].write_text(f"# Edited\n{compiled.source}")
+            loaded = codegen.compile_grammar(JsonParser, directory)
+            self.assertEqual(loaded.source, files[0].read_text())  # Loaded without generating the code again
+        self.assertEqual(codegen.compile_grammar(JsonParser, False).source, compiled.source)
+
+        def digest(*values):
+            class A(Parser):
+                __start__ = Repeat(Any(*values), mini=1)
+            return codegen.compile_grammar(A, False).digest
+
+        self.assertEqual(digest("a", "b"), digest("a", "b"))
+        self.assertNotEqual(digest("a", "b"), digest("a", "c"))
+
+    def test_broken_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            compiled = codegen.compile_grammar(JsonParser, directory)
+            path = Path(directory) / f"{JsonParser.__name__}_{compiled.digest}.py"
+            source = compiled.source
+            for broken in [source[:len(source) // 2], source.rsplit(codegen.END, 1)[0], ""]:
+                path.write_text(broken)
+                again = codegen.compile_grammar(JsonParser, directory)
+                self.assertEqual(set(again.functions), set(compiled.functions))
+                self.assertEqual(path.read_text(), compiled.source)
+                self.assertEqual([file.name for file in Path(directory).iterdir() if file.is_file()], [path.name])
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            JsonParser.parse("1", engine="jit")
@@ -0,0 +1,46 @@
+import itertools
+import unittest
+
+from parser_v2 import *
+from parser_v2 import analysis, fusion
+
+
+def grammars():
+    digit = Any(*"01")
+    yield "repeat", digit * MINI_1
+    yield "backtrack", Sequence(digit * REPEAT, "1")
+    yield "choice", Any("0", "01", "1" + digit, "a")
+    yield "joined", Repeat(Any("0", "11"), mini=2, maxi=3, join="a")
+    yield "joiners", Repeat(digit, join=Any("a", "aa")).set_factory(lambda values, joins: (values, joins),
+                                                                      pass_joiners=True)
+    yield "optional", Sequence(Str("a") * OPT, Not(Any("1", END)), Not("a", increment=0), END)
+    yield "lines", (Str("a") + Not(Any(END, "\n")) * REPEAT).set_factory(lambda v: (v[0], "".join(v[1])))
+    yield "factory", (digit * MINI_1).set_factory(lambda v: None if len(v) == 2 else join(v))
+
+
+class TestFusion(unittest.TestCase):
+    def test_regular(self):
+        self.assertTrue(fusion.is_regular(Any(*"01") * REPEAT))
+        self.assertFalse(fusion.is_regular(Var("x") * REPEAT))
+        self.assertFalse(fusion.is_regular(Any(*"01").set_factory(int) * REPEAT))
+        self.assertFalse(fusion.is_regular(Str("a") * REPEAT * REPEAT))  # Nullable items
+        self.assertFalse(fusion.is_regular(SaveAs("a", "x")))
+
+    def test_same_results(self):
+        codes = ["".join(chars) for n in range(5) for chars in itertools.product("01a\n", repeat=n)]
+        for (name, fused), (_, interpreted) in zip(grammars(), grammars()):
+            fusion.fuse(analysis.walk([fused]))
+            self.assertIsNotNone(fused.regex, name)
+            for code in codes:
+                for start in {0, min(1, len(code))}:
+                    with self.subTest(name=name, code=code, start=start):
+                        self.assertEqual(repr(fused.parse({}, start, code)),
+                                         repr(interpreted.parse({}, start, code)))
+
+    def test_parser(self):
+        class A(Parser):
+            __start__ = word = Any(*"abc") * MINI_1
+
+        self.assertIsNotNone(A.word.regex)
+        self.assertEqual(A("abca"), list("abca"))
+        self.assertEqual(A.parse(CharStream(iter(["ab", "c", None]).__next__)), list("abc"))
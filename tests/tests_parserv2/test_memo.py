@@ -0,0 +1,80 @@
+import unittest
+
+from parser_v2 import *
+
+
+class TestMemo(unittest.TestCase):
+    def test_backtracking(self):
+        class A(Parser, memoize=True):
+            number = Repeat(Any(*"0123456789"), mini=1, factory=lambda v: int("".join(v)))
+            __start__ = Any(
+                (number + "+" + number).set_factory(lambda v: v[0] + v[2]),
+                (number + "-" + number).set_factory(lambda v: v[0] - v[2]),
+                number,
+            )
+
+        memo = Memo()
+        self.assertEqual(A.parse("12+3", memo=memo), 15)
+        self.assertEqual(A.parse("12-3", memo=memo), 9)
+        self.assertEqual(A.parse("12", memo=memo), 12)
+        self.assertEqual(memo.hits, 1 + 2)
+        self.assertEqual(len(memo.table), 0)
+        self.assertEqual(A("12-3"), 9)
+
+    def test_same_result(self):
+        class A(Parser):
+            _spaces = Any(*" \n") * REPEAT
+            item = Var("list") | Repeat(Not(Any(*"[], \n")), mini=1, factory="".join)
+            element = (_spaces + item + _spaces).set_factory(lambda v: v[1])
+            list = (Str("[") + _spaces + element * (0, None, ",") + Str("]").expect("Expected ]"))\
+                .set_factory(lambda v: v[2])
+            __start__ = Any((list + _spaces + "!").set_factory(lambda v: ("!", v[0])), list)
+
+        code = "[a, [b, [c, d]], [ ], e]"
+        for memo in (False, True):
+            with self.subTest(memo=memo):
+                self.assertEqual(A.parse(code, memo=memo), ["a", ["b", ["c", "d"]], [], "e"])
+                self.assertEqual(A.parse(code + " !", memo=memo), ("!", ["a", ["b", ["c", "d"]], [], "e"]))
+                with self.assertRaises(SyntaxError):
+                    A.parse("[a, [b]", memo=memo)
+
+    def test_namespace_dependencies(self):
+        class IndentParser(Parser, memoize=True):
+            indent = 0
+            INDENT = Str(" ") * Var("indent")
+            WORD = Repeat(Not(Any(*":\n")), mini=1, factory="".join)
+            LINE = (INDENT + WORD
+                    + (Str(":\n") + UNS(Var("BLOCK"), indent=Var("indent").add(1))).set_factory(lambda v: v[1]) * OPT
+                    ).set_factory(lambda v: [v[1]] + v[2])
+            BLOCK = Repeat(LINE, mini=1, join="\n")
+            __start__ = BLOCK
+
+        code = "a:\n b:\n  c\n d\ne"
+        self.assertEqual(IndentParser(code), [["a", [["b", [["c"]]], ["d"]]], ["e"]])
+        self.assertEqual(IndentParser.parse(code, memo=False), IndentParser(code))
+
+    def test_saved_variables(self):
+        class QuoteParser(Parser, memoize=True):
+            quote = SaveAs(Any(*"'\""), "q")
+            string = (quote + (~Var("q")) * REPEAT + Var("q")).set_factory(lambda v: "".join(v[1]))
+            __start__ = Any(
+                (string + "!").set_factory(lambda v: v[0] + "!"),
+                (string + Var("q")).set_factory(lambda v: v[0] + v[1]),
+            )
+
+        memo = Memo()
+        self.assertEqual(QuoteParser.parse("'ab''", memo=memo), "ab'")
+        self.assertEqual(QuoteParser.parse('"ab""', memo=memo), 'ab"')
+        self.assertEqual(memo.hits, 2)
+
+    def test_cut(self):
+        class A(Parser, memoize=True):
+            name = Repeat(Any(*"abc"), mini=1, factory=join)
+            line = Any(Sequence(name, "=", CUT, name, "\n", factory=lambda v: (v[0], v[2])), Sequence(name, "\n"))
+            __start__ = line * MINI_1
+
+        memo = Memo()
+        code = "a=b\nc\n" * 100
+        self.assertEqual(A.parse(code, memo=memo), [("a", "b"), ("c", "\n")] * 100)
+        self.assertGreater(memo.pruned, 0)
+        self.assertRaises(SyntaxError, A.parse, "a=\n")
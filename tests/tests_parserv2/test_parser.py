@@ -1,6 +1,8 @@
+import sys
 import unittest
 
 from parser_v2 import *
+from parser_v2.struct import BasicStruct
 
 
 class TestParser(unittest.TestCase):
@@ -94,3 +96,128 @@ bbb:
         # from json import dumps
         # print(dumps(r, indent=4))
         # print(r)
+
+    def test_scope(self):
+        class A(Parser):
+            name = Any(*"abc")
+            inner = UNS((SaveAs(Var("name"), "saved") + Var("saved")).set_factory(join), name=Any(*"xyz"))
+            __start__ = (SaveAs(name, "saved") + Var("saved") + inner + Var("saved")).set_factory(join)
+
+        self.assertEqual(A("aaxxa"), "aaxxa")
+        self.assertRaises(SyntaxError, A, "aaxxx")
+        self.assertEqual(A("aaxxa", name=Any(*"0a")), "aaxxa")
+        self.assertNotIn("saved", vars(A))
+
+        scope = Scope({"a": 1, "b": 2}, {"b": 3})
+        child = scope | {"c": 4}
+        child["d"] = 5
+        self.assertEqual((child["a"], child["b"], child["c"], child.get("d"), child.get("e", 6)), (1, 3, 4, 5, 6))
+        self.assertIn("a", child)
+        self.assertNotIn("c", scope)
+        self.assertEqual(scope.static, {"a": 1, "b": 2})
+
+    def test_offsets(self):
+        seen = []
+
+        class Offset(BasicStruct):
+            def _parse(self, namespace, index, code):
+                seen.append(index)
+                return "", index
+
+        class A(Parser):
+            word = Repeat(Any(*"ab\n"), mini=1)
+            __start__ = Sequence(Offset(), word, Offset(), Expected(Any("a", END), "Line {line} {i.line} {i.column}"))
+
+        for engine in ("interpreted", "compiled", "iterative"):
+            with self.subTest(engine=engine):
+                seen.clear()
+                value, end = A.parse_prefix("ab\nb", engine=engine)  # The Indexer is built for the result only
+                self.assertEqual((end.i, end.line, end.column), (4, 1, 2))
+                self.assertEqual(seen, [0, 4])
+                self.assertIs(type(seen[1]), int)
+                value, end = A.parse_prefix("ba", index=Indexer("ba", token=Span) + 1, engine=engine)
+                self.assertIsInstance(value[1][0], Span)
+                with self.assertRaises(SyntaxError) as error:
+                    A.parse("a\nb$", engine=engine)
+                self.assertEqual(error.exception.msg, "Line 2 1 2")
+
+    def test_cut(self):
+        class A(Parser):
+            word = Repeat(Any(*"abcfix"), mini=1, factory=join)
+            keyword = Sequence("if", CUT, " ", word, factory=lambda v: ("if", v[2]))
+            __start__ = (Any(keyword, word) + Repeat(Sequence(",", CUT, word), factory=len)).set_factory(tuple)
+
+        self.assertEqual(A("if a"), (("if", "a"), 0))
+        self.assertEqual(A("abc,a,b"), ("abc", 2))
+        self.assertRaises(SyntaxError, A, "ifa")  # word is not tried after the cut
+        self.assertRaises(SyntaxError, A, "a,b,")  # A Repeat stops before its failed item
+        self.assertEqual(A.parse("if a", engine="compiled"), (("if", "a"), 0))
+        self.assertRaises(SyntaxError, A.parse, "ifa", engine="compiled")
+        self.assertEqual(str(Sequence("a", CUT) + "b"), "Seq(Str('a'), CUT, Str('b'))")
+
+    def test_iterative(self):
+        class A(Parser, engine="iterative"):
+            atom = Any(Sequence("(", CUT, Var("expr"), ")", factory=lambda v: [v[1]]), "1")
+            expr = Repeat(atom, mini=1, join="+", factory=lambda atoms: atoms)
+
+        depth = 5 * sys.getrecursionlimit()
+        code = "(" * depth + "1+1" + ")" * depth + "+1"
+        self.assertRaises(RecursionError, A.parse, code, start="expr", engine="interpreted")
+        for memo in (False, True):
+            with self.subTest(memo=memo):
+                tree, last = A.parse(code, start="expr", memo=memo)
+                nested = 0
+                while tree != ["1", "1"]:
+                    (tree,) = tree  # An atom holding an expr, or an expr of one atom
+                    nested += 1
+                self.assertEqual((nested, last), (2 * depth - 1, "1"))
+        self.assertRaises(SyntaxError, A.parse, "((1)", start="expr")
+        profiler = Profiler()
+        self.assertEqual(A.parse("(1)+1", start="expr", profiler=profiler), [[["1"]], "1"])
+        self.assertEqual((profiler.stats[A.expr].calls, profiler.stats[A.atom].calls), (2, 3))
+
+        class B(Parser):  # A cut failing in a later item stops the Repeat, not its parent
+            statement = Any(Sequence("if", CUT, "(x)"), "x")
+            __start__ = Sequence(Repeat(statement), Repeat(Any(*"fi=")), factory=lambda v: (len(v[0]), len(v[1])))
+
+        for code in ("xif=", "if(x)xif", "xxif(x)if"):
+            with self.subTest(code=code):
+                self.assertEqual(B.parse(code, engine="iterative"), B.parse(code, engine="interpreted"))
+
+    def test_operators(self):
+        class A(Parser):
+            atom = Any(Sequence("(", Var("expr"), ")", factory=lambda v: v[1]),
+                       Repeat(Any(*"0123456789"), mini=1, factory=join))
+            expr = Operators(atom, [(["**"], tuple), ("*/", tuple), ("+-", tuple), (["<=", "<"], list)],
+                             message="Expected an operand after {op} line {line}")
+            __start__ = expr
+
+        for engine in ("interpreted", "compiled", "iterative"):
+            with self.subTest(engine=engine):
+                self.assertEqual(A.parse("1", engine=engine), "1")
+                self.assertEqual(A.parse("1+2*3**4-5", engine=engine),
+                                 ("1", [("+", ("2", [("*", ("3", [("**", "4")]))])), ("-", "5")]))
+                self.assertEqual(A.parse("(1+2)*3<4", engine=engine),
+                                 [(("1", [("+", "2")]), [("*", "3")]), [("<", "4")]])
+                with self.assertRaises(SyntaxError) as error:
+                    A.parse("1+2*)", engine=engine)
+                self.assertEqual((error.exception.msg, error.exception.lineno),
+                                 ("Expected an operand after * line 1", 1))
+        self.assertEqual(str(Operators("1", [("+", None)])), "Operators(Str('1'), [('+',)])")
+
+    def test_lexed(self):
+        def match_word(tokens, offset):
+            return tokens.get(offset)  # The end of the word starting at offset, or None
+
+        class A(Parser):
+            word = Lexed(match_word, Repeat(Any(*"abc"), mini=1, factory=lambda v: "chars"), factory=lambda t: "token")
+            __start__ = Repeat(word, join=" ")
+
+        for engine in ("interpreted", "compiled", "iterative"):
+            with self.subTest(engine=engine):
+                self.assertEqual(A.parse("ab c", engine=engine), ["chars", "chars"])
+                self.assertEqual(A.parse("ab c", engine=engine, namespace={"tokens": {0: 2}}), ["token", "chars"])
+                self.assertEqual(A.parse("ab c", engine=engine, memo=True, namespace={"tokens": {0: 2, 3: 4}}),
+                                 ["token", "token"])
+                self.assertRaises(SyntaxError, A.parse, "ab c", engine=engine, namespace={"tokens": {0: False}})
+        self.assertEqual(A.word.first, frozenset("abc"))  # Analysed like its fallback
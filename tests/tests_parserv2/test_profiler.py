@@ -0,0 +1,38 @@
+import json
+import unittest
+
+from parser_v2 import *
+
+
+class A(Parser):
+    number = Repeat(Any(*"0123456789"), mini=1, factory=join)
+    __start__ = expr = Any(Sequence(number, "+", Var("expr")), number)
+
+
+class TestProfiler(unittest.TestCase):
+    def test_counts(self):
+        for memo in (False, True):
+            for engine in ("interpreted", "compiled"):
+                with self.subTest(memo=memo, engine=engine):
+                    profiler = Profiler()
+                    A.parse("12+3", profiler=profiler, memo=memo, engine=engine)
+                    expr, number = profiler.stats[A.expr], profiler.stats[A.number]
+                    self.assertEqual((expr.calls, expr.successes, expr.failures), (2, 2, 0))
+                    self.assertEqual(expr.consumed, 4 + 1)
+                    # The second alternative parses the last number again, unless it is memoized
+                    self.assertEqual((number.calls, number.successes, number.failures), (3, 3, 0))
+                    self.assertEqual((number.consumed, number.rescanned), (2 + 1 + 1, 0 if memo else 1))
+                    self.assertLessEqual(expr.self_time, expr.cumulative_time)
+
+    def test_reports(self):
+        profiler = Profiler()
+        A.parse("1+2", profiler=profiler)
+        self.assertRaises(SyntaxError, A.parse, "1+", profiler=profiler)
+        self.assertEqual(profiler.stats[A.expr].failures, 1)
+        table = profiler.table(sort="calls").splitlines()
+        self.assertTrue(table[0].startswith("struct"))
+        self.assertTrue(table[2].startswith("number"))
+        results = json.loads(profiler.to_json())
+        self.assertEqual({result["name"] for result in results}, {"expr", "number"})
+        self.assertEqual(results[0].keys(), {"name", "calls", "successes", "failures", "self_time",
+                                             "cumulative_time", "consumed", "rescanned"})